@@ -0,0 +1,539 @@
+#!/usr/bin/env python
+'''benchmark_mmtf.py
+
+Benchmarks for the decoding, dataframe, and interaction hot paths of mmtfPyspark.
+
+The benchmarks run locally without network access. They use the sample
+files in resources/files and synthetic large structures that are created
+by tiling 4HHB on a grid until the requested number of atoms is reached.
+Mappers and interaction calculators are called directly on (structureId, structure)
+tuples, so the timings do not include Spark scheduling overhead.
+
+Results are appended to a history file (one JSON record per run, tagged
+with the git commit), so that runs can be compared across commits.
+
+Usage
+-----
+Run all benchmarks and record the results::
+
+    python benchmarks/benchmark_mmtf.py
+
+Run only the codec and to_pandas benchmarks on a 100k atom structure::
+
+    python benchmarks/benchmark_mmtf.py --cases codec to_pandas --sizes 100000
+
+Measure the start-up time of a fresh Python worker (imports and the
+first decoded structure, including Numba compilation or cache loading)::
+
+    python benchmarks/benchmark_mmtf.py --cases startup --backend numba
+
+Compare with the most recent run of another commit and fail if any
+benchmark is more than 25% slower::
+
+    python benchmarks/benchmark_mmtf.py --compare 1f9a894 --threshold 1.25
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import argparse
+import copy
+import datetime
+import gzip
+import json
+import math
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import timeit
+import msgpack
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from mmtfPyspark.utils import MmtfStructure, codec, mmtfCodec
+from mmtfPyspark.utils.codec import Codec
+from mmtfPyspark.interactions import InteractionFilter
+from mmtfPyspark.interactions.interaction_extractor import LigandInteractionFingerprint, \
+    PolymerInteractionFingerprint
+from mmtfPyspark.interactions.interaction_extractor_pd import AsymmetricUnitInteractions, \
+    BioAssemblyInteractions
+from mmtfPyspark.mappers import StructureToPolymerChains, StructureToBioassembly
+
+FILE_DIR = os.path.join(ROOT_DIR, 'resources', 'files')
+SAMPLE_FILES = ['1STP.mmtf', '4HHB.mmtf.gz', '1J6T.mmtf.gz']
+DEFAULT_HISTORY = os.path.join(ROOT_DIR, 'benchmarks', 'results', 'history.jsonl')
+DEFAULT_SIZES = [25000, 1000000]
+
+# number of structures in the bulk decoding benchmarks
+BULK_SIZE = 16
+
+# spacing between tiles of a synthetic structure (Angstrom)
+TILE_SPACING = 10.0
+
+# number of models of the synthetic NMR ensemble
+ENSEMBLE_MODELS = 20
+
+LEVELS = ['chain', 'group', 'atom', 'coord']
+
+# code that is timed in a new Python process, like a freshly started Spark worker
+STARTUP_CASES = [
+    ('startup.python', 'pass'),
+    ('startup.import', 'import mmtfPyspark'),
+    ('startup.import_utils', 'from mmtfPyspark.utils import MmtfStructure'),
+    ('startup.import_reader', 'from mmtfPyspark.io import mmtfReader'),
+    ('startup.first_decode', 'import gzip, msgpack\n'
+                             'from mmtfPyspark.utils import MmtfStructure\n'
+                             'with gzip.open({path!r}, "rb") as f:\n'
+                             '    MmtfStructure(msgpack.unpackb(f.read(), raw=False)).coords'),
+]
+
+
+# ----------------------------------------------------------------------------
+# Input data
+# ----------------------------------------------------------------------------
+
+def read_sample(file_name):
+    '''Returns the msgpack encoded data of a sample file'''
+    path = os.path.join(FILE_DIR, file_name)
+    if file_name.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def tile_structure(data, num_atoms, structure_id='TILE', models=False):
+    '''Creates a synthetic structure by tiling a single-model structure on
+    a cubic grid until it contains at least num_atoms atoms. Each tile is
+    translated, so that tiles do not overlap, and receives new chain ids.
+    If models is True, each tile is a model with the original coordinates
+    and chain ids instead, like an NMR ensemble.
+
+    Parameters
+    ----------
+    data : dict
+       unpacked msgpack data of a single-model structure (e.g. 4HHB)
+    num_atoms : int
+       minimum number of atoms of the synthetic structure
+    structure_id : str
+       structure id of the synthetic structure
+    models : bool
+       if True, create a multi-model structure
+
+    Returns
+    -------
+    dict
+       unpacked msgpack data of the synthetic structure
+    '''
+    if data['numModels'] != 1:
+        raise ValueError("Only single-model structures can be tiled")
+
+    tiles = max(1, math.ceil(num_atoms / data['numAtoms']))
+    n_atoms, n_groups, n_chains = data['numAtoms'], data['numGroups'], data['numChains']
+
+    decoder = Codec()
+    decoded = {}
+    codecs = {}
+    for field_name, value in data.items():
+        if isinstance(value, bytes):
+            codec_type, length, param, _ = mmtfCodec.parse_header(value)
+            codecs[field_name] = (codec_type, param)
+            decoded[field_name] = decoder.decode_array(value)
+
+    tiled = dict(data)
+    tiled['entityList'] = copy.deepcopy(data['entityList'])
+    tiled['bioAssemblyList'] = copy.deepcopy(data['bioAssemblyList'])
+    tiled['structureId'] = structure_id
+    tiled['numAtoms'] = n_atoms * tiles
+    tiled['numGroups'] = n_groups * tiles
+    tiled['numChains'] = n_chains * tiles
+    tiled['numBonds'] = data['numBonds'] * tiles
+    tiled['numModels'] = tiles if models else 1
+    tiled['chainsPerModel'] = [n_chains] * tiles if models else [n_chains * tiles]
+    tiled['groupsPerChain'] = list(data['groupsPerChain']) * tiles
+    tiled['ncsOperatorList'] = []
+
+    # translate each tile to a point on a cubic grid
+    coords = np.column_stack([decoded[f] for f in ('xCoordList', 'yCoordList', 'zCoordList')])
+    size = coords.max(axis=0) - coords.min(axis=0) + TILE_SPACING
+    n = math.ceil(tiles ** (1.0 / 3.0))
+    grid = np.array([(i % n, (i // n) % n, i // (n * n)) for i in range(tiles)])
+    offsets = np.repeat(grid * size * (not models), n_atoms, axis=0)
+    coords = np.tile(coords, (tiles, 1)) + offsets
+
+    arrays = {'xCoordList': coords[:, 0], 'yCoordList': coords[:, 1], 'zCoordList': coords[:, 2],
+              'atomIdList': np.arange(1, n_atoms * tiles + 1, dtype=np.int32)}
+
+    if 'bondAtomList' in decoded:
+        bond_atoms = decoded['bondAtomList'].astype(np.int32)
+        arrays['bondAtomList'] = np.concatenate([bond_atoms + t * n_atoms for t in range(tiles)])
+
+    chain_ids = [c if models else _tile_chain_id(c, t) for t in range(tiles) for c in decoded['chainIdList']]
+    chain_names = [c if models else _tile_chain_id(c, t) for t in range(tiles) for c in decoded['chainNameList']]
+    arrays['chainIdList'] = chain_ids
+    arrays['chainNameList'] = chain_names
+
+    for field_name, values in decoded.items():
+        if field_name not in arrays:
+            arrays[field_name] = np.tile(values, tiles)
+
+    for field_name, values in arrays.items():
+        codec_type, param = codecs[field_name]
+        tiled[field_name] = mmtfCodec.encode_array(values, codec_type, param)
+
+    for entity in tiled['entityList']:
+        entity['chainIndexList'] = [i + t * n_chains for t in range(tiles) for i in entity['chainIndexList']]
+
+    for assembly in tiled['bioAssemblyList']:
+        for transform in assembly['transformList']:
+            transform['chainIndexList'] = [i + t * n_chains for t in range(tiles)
+                                           for i in transform['chainIndexList']]
+
+    return tiled
+
+
+def _tile_chain_id(chain_id, tile):
+    '''Returns a unique chain id (max. 4 characters) for a chain in a tile'''
+    if tile == 0:
+        return chain_id
+    return chain_id[:1] + np.base_repr(tile, 36).rjust(3, '0')[-3:]
+
+
+def load_structures(sizes):
+    '''Returns a list of (name, msgpack bytes) with the sample files and synthetic structures'''
+    structures = [(f.split('.')[0], read_sample(f)) for f in SAMPLE_FILES]
+
+    template = msgpack.unpackb(read_sample('4HHB.mmtf.gz'), raw=False)
+    for size in sizes:
+        tiled = tile_structure(template, size)
+        data = msgpack.packb(tiled, use_bin_type=True)
+        structures.append((f"4HHBx{tiled['numAtoms']}", data))
+
+    ensemble = tile_structure(template, template['numAtoms'] * ENSEMBLE_MODELS, models=True)
+    structures.append((f'4HHBm{ENSEMBLE_MODELS}', msgpack.packb(ensemble, use_bin_type=True)))
+
+    return structures
+
+
+# ----------------------------------------------------------------------------
+# Benchmark cases
+# ----------------------------------------------------------------------------
+
+class Case(object):
+    '''A benchmark case
+
+    Parameters
+    ----------
+    name : str
+       name of the benchmark
+    setup : function
+       function(data) that returns the argument of func, not timed
+    func : function
+       function that is timed
+    max_atoms : int
+       skip structures with more atoms (None: no limit)
+    '''
+
+    def __init__(self, name, setup, func, max_atoms=None):
+        self.name = name
+        self.setup = setup
+        self.func = func
+        self.max_atoms = max_atoms
+
+
+def _codec_cases():
+    # field used as a representative input for each codec type
+    fields = {2: 'secStructList', 4: 'groupTypeList', 5: 'chainIdList', 6: 'insCodeList',
+              8: 'atomIdList', 9: 'occupancyList', 10: 'xCoordList'}
+    cases = []
+    for codec_type in sorted(mmtfCodec.codec_dict):
+        field_name = fields[codec_type]
+        codec_class = mmtfCodec.codec_dict[codec_type]
+
+        def setup_decode(data, field_name=field_name):
+            header = mmtfCodec.parse_header(msgpack.unpackb(data, raw=False)[field_name])
+            return header[3], header[1], header[2]
+
+        def setup_encode(data, field_name=field_name):
+            encoded = msgpack.unpackb(data, raw=False)[field_name]
+            return Codec().decode_array(encoded), mmtfCodec.parse_header(encoded)[2]
+
+        cases.append(Case(f'codec.type{codec_type}.decode', setup_decode,
+                          lambda a, codec_class=codec_class: codec_class.decode(*a)))
+        cases.append(Case(f'codec.type{codec_type}.encode', setup_encode,
+                          lambda a, codec_class=codec_class: codec_class.encode(*a)))
+
+    # bulk decoding of a field of many structures
+    setup_bulk = lambda data: [msgpack.unpackb(data, raw=False)] * BULK_SIZE
+    cases.append(Case('codec.bulk.decode_field', setup_bulk, lambda a: Codec().decode_field(a, 'xCoordList')))
+    cases.append(Case('codec.bulk.decode_array', setup_bulk,
+                      lambda a: [Codec().decode_array(d['xCoordList']) for d in a]))
+    return cases
+
+
+def _structure_cases():
+    unpack = lambda data: msgpack.unpackb(data, raw=False)
+    return [
+        Case('structure.unpack', lambda data: data, unpack),
+        Case('structure.init', unpack, lambda d: MmtfStructure(d)),
+        Case('structure.init_lazy', lambda data: data, lambda d: MmtfStructure(d)),
+        Case('structure.calc_indices', unpack, lambda d: MmtfStructure(d).calc_indices()),
+        Case('structure.coords', unpack, lambda d: MmtfStructure(d).coords),
+        Case('structure.to_pandas', unpack, lambda d: MmtfStructure(d, True).to_pandas()),
+        Case('structure.to_pandas_categories', unpack, lambda d: MmtfStructure(d, True).to_pandas(use_categories=True)),
+        Case('structure.to_group_pandas', unpack, lambda d: MmtfStructure(d, True).to_group_pandas()),
+        Case('structure.pickle', lambda data: MmtfStructure(unpack(data)), lambda s: pickle.loads(pickle.dumps(s))),
+        Case('structure.first_model.coords', unpack, lambda d: MmtfStructure(d, True).coords),
+        Case('structure.first_model.lists', unpack, _decode_lists),
+    ]
+
+
+def _decode_lists(data):
+    '''Decodes the per-atom, per-group, and bond lists of the first model'''
+    structure = MmtfStructure(data, True)
+    for name in ['b_factor_list', 'occupancy_list', 'atom_id_list', 'alt_loc_list', 'group_id_list',
+                 'sec_struct_list', 'ins_code_list', 'sequence_index_list', 'bond_atom_list', 'bond_order_list']:
+        getattr(structure, name)
+    return structure
+
+
+def _structure_tuple(data):
+    # structures are read with first_model=True, as usual for interaction calculations
+    structure = MmtfStructure(msgpack.unpackb(data, raw=False), True)
+    structure.to_pandas()
+    return (structure.structure_id, structure)
+
+
+def _interaction_cases(max_atoms):
+    cases = []
+
+    ligand_filter = InteractionFilter(distanceCutoff=4.0, minInteractions=1)
+    ligand_filter.set_query_groups(False, ['HOH'])
+    ligand_filter.set_target_groups(False, ['HOH'])
+
+    for level in ['group', 'chain']:
+        fingerprint = LigandInteractionFingerprint(ligand_filter, level)
+        cases.append(Case(f'interactions.ligand.{level}', _structure_tuple, fingerprint, max_atoms))
+
+        fingerprint = PolymerInteractionFingerprint(ligand_filter, True, False, level)
+        cases.append(Case(f'interactions.polymer.{level}', _structure_tuple, fingerprint, max_atoms))
+
+    query = "group_name != 'HOH'"
+    for level in LEVELS:
+        extractor = AsymmetricUnitInteractions(query, query, 4.0, True, False, level)
+        cases.append(Case(f'interactions_pd.asym.{level}', _structure_tuple, extractor, max_atoms))
+
+        extractor = BioAssemblyInteractions(query, query, 4.0, True, False, 1, level)
+        cases.append(Case(f'interactions_pd.bio.{level}', _structure_tuple, extractor, max_atoms))
+
+    return cases
+
+
+def _mapper_cases(max_atoms):
+    return [
+        Case('mappers.polymer_chains', _structure_tuple, StructureToPolymerChains(), max_atoms),
+        Case('mappers.bioassembly', _structure_tuple, StructureToBioassembly(), max_atoms),
+    ]
+
+
+def get_cases(max_atoms):
+    '''Returns all benchmark cases'''
+    return _codec_cases() + _structure_cases() + _interaction_cases(max_atoms) + _mapper_cases(max_atoms)
+
+
+# ----------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------
+
+def run(cases, structures, repeat, min_time):
+    '''Runs the benchmarks and returns a dictionary of
+    "case/structure" -> timing statistics in seconds'''
+    results = {}
+    for case in cases:
+        for name, data in structures:
+            num_atoms = MmtfStructure(data).num_atoms
+            if case.max_atoms is not None and num_atoms > case.max_atoms:
+                continue
+
+            key = f'{case.name}/{name}'
+            try:
+                arg = case.setup(data)
+                timer = timeit.Timer(lambda: case.func(arg))
+                number = _calibrate(timer, min_time)
+                times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+            except Exception as e:
+                results[key] = {'error': f'{type(e).__name__}: {e}'}
+                print(f'{key:60s} ERROR {type(e).__name__}: {e}')
+                continue
+
+            results[key] = {'min': min(times), 'median': float(np.median(times)),
+                            'repeat': repeat, 'number': number, 'atoms': num_atoms}
+            print(f'{key:60s} {min(times) * 1000:12.3f} ms')
+
+    return results
+
+
+def run_startup(cases, repeat, backend):
+    '''Runs the start-up benchmarks, each in a new Python process, and returns
+    a dictionary of "case/process" -> timing statistics in seconds. The first
+    (untimed) run of each case populates the Numba cache.'''
+    env = dict(os.environ, MMTF_CODEC_BACKEND=backend,
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get('PYTHONPATH')])))
+    path = os.path.join(FILE_DIR, '4HHB.mmtf.gz')
+
+    results = {}
+    for name, code in cases:
+        key = f'{name}/process'
+        command = [sys.executable, '-c', code.format(path=path)]
+        times = []
+        try:
+            for i in range(repeat + 1):
+                start = timeit.default_timer()
+                subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                times.append(timeit.default_timer() - start)
+        except subprocess.CalledProcessError as e:
+            message = e.stderr.decode().strip().splitlines()[-1:]
+            results[key] = {'error': message[0] if message else str(e)}
+            print(f'{key:60s} ERROR {results[key]["error"]}')
+            continue
+
+        times = times[1:]
+        results[key] = {'min': min(times), 'median': float(np.median(times)),
+                        'repeat': repeat, 'number': 1}
+        print(f'{key:60s} {min(times) * 1000:12.3f} ms')
+
+    return results
+
+
+def _calibrate(timer, min_time):
+    '''Returns the number of loops, so that a single repeat takes at least min_time'''
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1000:
+            return number
+        number *= 10
+
+
+def get_commit():
+    '''Returns the short git commit hash of the working tree, with a "+" if it has local changes'''
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                        cwd=ROOT_DIR).decode().strip()
+        return commit + ('+' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save(history, record):
+    '''Appends a benchmark record to the history file'''
+    os.makedirs(os.path.dirname(os.path.abspath(history)), exist_ok=True)
+    with open(history, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def load(history, commit):
+    '''Returns the results of a commit from the history file. If a commit
+    has been benchmarked several times, the most recent result of each
+    benchmark is used.'''
+    if not os.path.exists(history):
+        return None
+
+    match = None
+    with open(history) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['commit'].rstrip('+').startswith(commit):
+                if match is None:
+                    match = record
+                else:
+                    match['results'].update(record['results'])
+    return match
+
+
+def compare(baseline, results, threshold):
+    '''Prints the ratio of the current and baseline timings and returns the
+    keys of benchmarks that are slower than threshold * baseline'''
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline['results'].get(key)
+        if base is None or 'min' not in base or 'min' not in result:
+            continue
+        ratio = result['min'] / base['min']
+        flag = ''
+        if ratio > threshold:
+            regressions.append(key)
+            flag = '  <-- regression'
+        print(f'{key:60s} {base["min"] * 1000:12.3f} -> {result["min"] * 1000:12.3f} ms  x{ratio:5.2f}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for mmtfPyspark hot paths')
+    parser.add_argument('--cases', nargs='*', default=None,
+                        help='run only cases whose name starts with one of these prefixes')
+    parser.add_argument('--sizes', nargs='*', type=int, default=DEFAULT_SIZES,
+                        help='number of atoms of the synthetic structures')
+    parser.add_argument('--max-atoms', type=int, default=50000,
+                        help='largest structure used for the interaction and mapper benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='number of repeats')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='minimum duration of a repeat in seconds')
+    parser.add_argument('--backend', default=None, help='codec backend (numpy or numba)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='history file with the results of all runs')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to the history file')
+    parser.add_argument('--compare', default=None, help='commit to compare the results with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown factor that is reported as a regression')
+    args = parser.parse_args(argv)
+
+    if args.backend is not None:
+        codec.set_backend(args.backend)
+
+    cases = get_cases(args.max_atoms)
+    startup_cases = STARTUP_CASES
+    if args.cases:
+        cases = [c for c in cases if c.name.startswith(tuple(args.cases))]
+        startup_cases = [c for c in startup_cases if c[0].startswith(tuple(args.cases))]
+
+    results = run_startup(startup_cases, args.repeat, codec.get_backend().name)
+    if cases:
+        structures = load_structures(args.sizes)
+        results.update(run(cases, structures, args.repeat, args.min_time))
+
+    record = {'commit': get_commit(),
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'backend': codec.get_backend().name,
+              'machine': platform.machine(),
+              'results': results}
+
+    baseline = None
+    if args.compare:
+        baseline = load(args.history, args.compare)
+
+    if not args.no_save:
+        save(args.history, record)
+
+    if args.compare:
+        if baseline is None:
+            print('No results found for commit:', args.compare)
+            return 1
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) slower than x{args.threshold}')
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,15 @@
-from . import datasets, filters, interactions, io, mappers, ml, utils, webfilters, webservices
+import importlib
+
+# subpackages are imported on first use, so that Spark workers only load the
+# modules (and dependencies such as pyspark.ml, pandas, or requests) they need
+__all__ = ['datasets', 'filters', 'interactions', 'io', 'mappers', 'ml', 'utils', 'webfilters', 'webservices']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,4 +1,4 @@
-from . import advancedSearchDataset, customReportService, dataset_utils, dbPtmDataset, dbSnpDataset, drugBankDataset, g2sDataset, jpredDataset, myVariantDataset, \
+from . import advancedSearchDataset, atomExtractor, customReportService, dataset_utils, dbPtmDataset, dbSnpDataset, drugBankDataset, g2sDataset, jpredDataset, myVariantDataset, \
     pdbjMineDataset, pdbPtmDataset, pdbToUniProt, polymerSequenceExtractor, secondaryStructureElementExtractor, \
     secondaryStructureExtractor, secondaryStructureSegmentExtractor, swissModelDataset, uniProt
 from .groupInteractionExtractor import groupInteractionExtractor
@@ -0,0 +1,140 @@
+#!/user/bin/env python
+'''atomExtractor.py:
+
+Creates a dataset with one row per atom from a set of structures.
+The per-atom arrays of each structure are transferred to Spark as Arrow
+record batches (see pyspark.sql.DataFrame.mapInPandas), which avoids
+creating a Python Row object for each atom. The structures are sent to the
+Python workers in batches of at most STRUCTURES_PER_BATCH structures (see
+:func:`limit_structures_per_batch <mmtfPyspark.utils.structurePartitioner.limit_structures_per_batch>`).
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import pickle
+import numpy as np
+import pandas as pd
+from pyspark.sql import SparkSession
+from pyspark.sql.types import StructType, StructField, StringType, FloatType, \
+    DoubleType, IntegerType, LongType, BooleanType, BinaryType
+from mmtfPyspark.utils import MmtfStructure
+from mmtfPyspark.utils.structurePartitioner import limit_structures_per_batch
+
+# Spark data types of numpy data types, strings are stored as objects or unicode
+_SPARK_TYPES = {np.dtype(np.float32): FloatType(),
+                np.dtype(np.float64): DoubleType(),
+                np.dtype(np.int32): IntegerType(),
+                np.dtype(np.int64): LongType(),
+                np.dtype(np.bool_): BooleanType(),
+                np.dtype(np.object_): StringType(),
+                np.dtype(np.str_): StringType()}
+
+# Spark data types of the atom columns defined in MmtfStructure.atom_cols
+ATOM_COLUMN_TYPES = {c: _SPARK_TYPES[np.dtype(MmtfStructure.atom_col_dtypes[c])] for c in MmtfStructure.atom_cols}
+
+# default columns, same as MmtfStructure.to_pandas()
+DEFAULT_COLUMNS = ['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc',
+                   'x', 'y', 'z', 'o', 'b', 'element', 'polymer']
+
+
+def structures_to_atom_dataframe(structures, cols=None):
+    '''Returns a dataset with one row per atom. The first column
+    "structure_id" contains the key of the structure in the input RDD,
+    followed by the selected atom columns.
+
+    The structures are pickled and processed in Arrow record batches of at
+    most :data:`STRUCTURES_PER_BATCH <mmtfPyspark.utils.structurePartitioner.STRUCTURES_PER_BATCH>`
+    structures, to bound the memory of the Python workers. This lowers
+    spark.sql.execution.arrow.maxRecordsPerBatch of the Spark session.
+
+    Parameters
+    ----------
+    structures : pythonRDD
+       a set of PDB structures
+    cols : list, optional
+       atom columns (keys of MmtfStructure.atom_cols), default: the columns
+       returned by MmtfStructure.to_pandas()
+
+    Returns
+    -------
+    dataset
+       dataset with one row per atom
+
+    Raises
+    ------
+    ValueError
+       unknown atom column
+
+    Examples
+    --------
+    Write the atoms of all structures to a Parquet file
+
+    >>> pdb = mmtfReader.read_sequence_file(path)
+    >>> df = structures_to_atom_dataframe(pdb, cols=['chain_id', 'group_name', 'atom_name', 'x', 'y', 'z'])
+    >>> df.write.parquet('atoms.parquet')
+    '''
+    if cols is None:
+        cols = DEFAULT_COLUMNS
+    else:
+        unknown = [c for c in cols if c not in ATOM_COLUMN_TYPES]
+        if unknown:
+            raise ValueError("Unknown atom column(s): " + ", ".join(unknown))
+        cols = list(cols)
+
+    spark = SparkSession.builder.getOrCreate()
+    limit_structures_per_batch(spark)
+
+    input_schema = StructType([StructField("structure_id", StringType(), False),
+                               StructField("structure", BinaryType(), False)])
+
+    rows = structures.map(lambda t: (t[0], bytearray(pickle.dumps(t[1], pickle.HIGHEST_PROTOCOL))))
+    df = spark.createDataFrame(rows, input_schema)
+
+    return df.mapInPandas(lambda batches: _to_atom_batches(batches, cols), get_schema(cols))
+
+
+def get_schema(cols=None):
+    '''Returns the schema of the atom dataset
+
+    Parameters
+    ----------
+    cols : list, optional
+       atom columns, default: the columns returned by MmtfStructure.to_pandas()
+
+    Returns
+    -------
+    StructType
+       schema of the atom dataset
+    '''
+    if cols is None:
+        cols = DEFAULT_COLUMNS
+
+    fields = [StructField("structure_id", StringType(), False)]
+    fields += [StructField(c, ATOM_COLUMN_TYPES[c], True) for c in cols]
+    return StructType(fields)
+
+
+def _to_atom_batches(batches, cols):
+    '''Converts batches of pickled structures to pandas dataframes with one
+    row per atom. String columns are returned as categoricals, which are
+    expanded from the chain, group and group type level values without
+    creating a string for each atom.'''
+    for batch in batches:
+        for structure_id, data in zip(batch['structure_id'], batch['structure']):
+            structure = pickle.loads(data)
+
+            columns = {'structure_id': pd.Categorical.from_codes(np.zeros(structure.num_atoms, dtype=np.int8),
+                                                                 categories=[structure_id])}
+            for c in cols:
+                if c in MmtfStructure.encoded_cols:
+                    columns[c] = structure.get_categorical(c)
+                elif MmtfStructure.atom_col_dtypes[c] is np.str_:
+                    vocabulary, codes = np.unique(getattr(structure, MmtfStructure.atom_cols[c]), return_inverse=True)
+                    columns[c] = pd.Categorical.from_codes(codes, categories=vocabulary.astype(np.object_))
+                else:
+                    columns[c] = getattr(structure, MmtfStructure.atom_cols[c])
+
+            yield pd.DataFrame(columns)
@@ -1,3 +1,6 @@
+# cost assigned to filters that do not declare a cost attribute
+DEFAULT_FILTER_COST = 100
+
 from .rWork import RWork
 from .rFree import RFree
 from .resolution import Resolution
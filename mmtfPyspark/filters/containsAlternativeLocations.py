@@ -14,6 +14,8 @@ __status__ = "Done"
 
 class ContainsAlternativeLocations(object):
 
+    cost = 40
+
     def __call__(self, t):
         structure = t[1]
 
@@ -32,6 +32,8 @@ class ContainsDProteinChain(object):
        if true, only return entries that are exclusively contain D-protein chains
     '''
 
+    cost = 20
+
     def __init__(self, exclusive=False):
         self.filter = ContainsPolymerChainType([
             ContainsPolymerChainType.D_PEPTIDE_LINKING,
@@ -41,6 +41,8 @@ class ContainsDSaccharideChain(object):
 
     '''
 
+    cost = 20
+
     def __init__(self, exclusive=False):
         self.filter = ContainsPolymerChainType([
             ContainsPolymerChainType.D_SACCHARIDE,
@@ -29,6 +29,8 @@ class ContainsDnaChain(object):
        if true, only return entries that contain Dna chains
     '''
 
+    cost = 20
+
     def __init__(self, exclusive=False):
         self.filter = ContainsPolymerChainType(ContainsPolymerChainType.DNA_LINKING, exclusive)
 
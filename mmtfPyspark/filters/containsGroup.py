@@ -27,6 +27,8 @@ class ContainsGroup(object):
        list of group names
     '''
 
+    cost = 20
+
     def __init__(self, *args):
         groups = [a for a in args]
         self.groupQuery = set(groups)
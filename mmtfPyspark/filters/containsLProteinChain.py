@@ -31,6 +31,8 @@ class ContainsLProteinChain(object):
        if true, only return entries that are exclusively contain L-protein chains
     '''
 
+    cost = 20
+
     def __init__(self, exclusive=False):
         self.filter = ContainsPolymerChainType([
             ContainsPolymerChainType.L_PEPTIDE_LINKING,
@@ -49,6 +49,8 @@ class ContainsPolymerChainType(object):
     OTHER = "OTHER"
     SACCHARIDE = "SACCHARIDE"
 
+    cost = 20
+
     def __init__(self, monomer_type, exclusive=False):
         if type(monomer_type) == str:
             monomer_type = monomer_type.split(',')
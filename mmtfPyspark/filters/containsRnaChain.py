@@ -29,6 +29,8 @@ class ContainsRnaChain(object):
        if true, only return entries that contain RNA chains
     '''
 
+    cost = 20
+
     def __init__(self, exclusive=False):
         self.filter = ContainsPolymerChainType(
             ContainsPolymerChainType.RNA_LINKING, exclusive)
@@ -62,6 +62,8 @@ class ContainsSequenceRegex(object):
        The regular expression of protein sequence
     '''
 
+    cost = 10
+
     def __init__(self, regularExpression):
         self.regex = regularExpression
 
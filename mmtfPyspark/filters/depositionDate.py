@@ -16,6 +16,9 @@ from dateutil.parser import parse
 
 class DepositionDate(object):
 
+    header_only = True
+    cost = 3
+
     def __init__(self, startdate, enddate):
         '''This filter return True if the deposition date of this structure is
         within the specified range
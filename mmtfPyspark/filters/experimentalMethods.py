@@ -41,6 +41,9 @@ class ExperimentalMethods(object):
     THEORETICAL_MODEL = "THEORETICAL MODEL"
     X_RAY_DIFFRACTION = "X-RAY DIFFRACTION"
 
+    header_only = True
+    cost = 2
+
     def __init__(self, *experimentalMethods):
         self.experimental_methods = experimentalMethods
 
@@ -10,6 +10,8 @@ __email__ = "marshuang80@gmail.com"
 __version__ = "0.2.0"
 __status__ = "done"
 
+from mmtfPyspark.filters import DEFAULT_FILTER_COST
+
 
 class NotFilter(object):
     '''Constructor takes another filter as input
@@ -25,5 +27,13 @@ class NotFilter(object):
     def __init__(self, filter_function):
         self.filter = filter_function
 
+    @property
+    def header_only(self):
+        return getattr(self.filter, 'header_only', False)
+
+    @property
+    def cost(self):
+        return getattr(self.filter, 'cost', DEFAULT_FILTER_COST)
+
     def __call__(self, t):
         return not self.filter(t)
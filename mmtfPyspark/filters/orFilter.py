@@ -10,6 +10,8 @@ __email__ = "marshuang80@gmail.com"
 __version__ = "0.2.0"
 __status__ = "done"
 
+from mmtfPyspark.filters import DEFAULT_FILTER_COST
+
 
 class OrFilter(object):
     '''Constructor takes another filter as input
@@ -26,5 +28,13 @@ class OrFilter(object):
         self.filter1 = filter1
         self.filter2 = filter2
 
+    @property
+    def header_only(self):
+        return getattr(self.filter1, 'header_only', False) and getattr(self.filter2, 'header_only', False)
+
+    @property
+    def cost(self):
+        return getattr(self.filter1, 'cost', DEFAULT_FILTER_COST) + getattr(self.filter2, 'cost', DEFAULT_FILTER_COST)
+
     def __call__(self, t):
         return self.filter1(t) or self.filter2(t)
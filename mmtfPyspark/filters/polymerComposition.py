@@ -37,6 +37,8 @@ class PolymerComposition(object):
     DNA_STD_NUCLEOTIDES = ["DA", "DC", "DG", "DT"]
     RNA_STD_NUCLEOTIDES = ["A", "C", "G", "U"]
 
+    cost = 20
+
     def __init__(self, monomer_type, exclusive=False):
         if type(monomer_type) == str:
             monomer_type = monomer_type.split(",")
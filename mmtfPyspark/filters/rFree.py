@@ -28,6 +28,9 @@ class RFree(object):
        The upper bound r_free value
     '''
 
+    header_only = True
+    cost = 1
+
     def __init__(self, minRfree, maxRfree):
         self.min_Rfree = minRfree
         self.max_Rfree = maxRfree
@@ -24,6 +24,9 @@ class RWork(object):
        The upper bound r_work value
     '''
 
+    header_only = True
+    cost = 1
+
     def __init__(self, minRwork, maxRwork):
         self.min_Rwork = minRwork
         self.max_Rwork = maxRwork
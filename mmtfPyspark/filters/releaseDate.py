@@ -16,6 +16,9 @@ from dateutil.parser import parse
 
 class ReleaseDate(object):
 
+    header_only = True
+    cost = 3
+
     def __init__(self, startDate, endDate):
         '''This filter retuns true if the release date for the structure is
         within the specified range.
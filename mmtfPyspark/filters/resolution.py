@@ -28,6 +28,9 @@ class Resolution(object):
        The upper bound resolution
 
     '''
+    header_only = True
+    cost = 1
+
     def __init__(self, minResolution, maxResolution):
         self.min_Resolution = minResolution
         self.max_Resolution = maxResolution
@@ -40,6 +40,8 @@ class SecondaryStructure(object):
        exclusive flag [False]
     '''
 
+    cost = 30
+
     def __init__(self, helixFractionMin=0.0, helixFractionMax=1.0,
                  sheetFractionMin=0.0, sheetFractionMax=1.0,
                  coilFractionMin=0.0, coilFractionMax=1.0, exclusive=False):
@@ -539,6 +539,25 @@ class InteractionFilter(object):
 
         return group in self._prohibitedTargetGroups
 
+    def is_prohibited_target_group_np(self, groups):
+        '''Returns True if the specified groups must not occur in an interactions.
+
+        Parameters
+        ----------
+        groups : ndarray
+           groups to be checked
+
+        Returns
+        -------
+        ndarray
+           True if group is prohibited else False
+        '''
+
+        if self._prohibitedTargetGroups is None:
+            return np.full(groups.shape, False, dtype=bool)
+
+        return np.in1d(groups, list(self._prohibitedTargetGroups)).reshape(groups.shape)
+
     def is_query_element_np(self, elements):
         '''Returns True if the specified elements matches the query conditions.
 
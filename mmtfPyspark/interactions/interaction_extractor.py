@@ -221,7 +221,7 @@ class LigandInteractionFingerprint:
         # Stack coordinates into an nx3 array
         # TODO add this to ColumnarStructure
         #c = np.stack((arrays.get_x_coords(), arrays.get_y_coords(), arrays.get_z_coords()), axis=-1)
-        c = np.stack((structure.x_coord_list, structure.y_coord_list, structure.z_coord_list), axis=-1)
+        c = structure.coords
         # Apply ligand mask to ligand data
         c_ligand = c[lig]
 
@@ -259,18 +259,18 @@ class LigandInteractionFingerprint:
             if self.level == 'chain':
                 row = Row(structure_id + "." + pc[i],  # structureChainId
                           lg[j],  # queryLigandId
-                          lc[j].item(),  # queryLigandChainId
+                          str(lc[j]),  # queryLigandChainId
                           ln[j],  # queryLigandNumber
-                          pc[i].item()  # targetChainId
+                          str(pc[i])  # targetChainId
                           )
                 rows.add(row)
             elif self.level == 'group':
                 row = Row(structure_id + "." + pc[i],  # structureChainId
                           lg[j],  # queryLigandId
-                          lc[j].item(),  # queryLigandChainId
+                          str(lc[j]),  # queryLigandChainId
                           ln[j],  # queryLigandNumber
                           pg[i],  # targetGroupId
-                          pc[i].item(),  # targetChainId
+                          str(pc[i]),  # targetChainId
                           pn[i],  # targetGroupNumber
                           ps[i].item(),  # sequenceIndex
                           structure.entity_list[pt[i]]['sequence']  # sequence
@@ -279,11 +279,11 @@ class LigandInteractionFingerprint:
             elif self.level == 'atom':
                 row = Row(structure_id + "." + pc[i],  # structureChainId
                           lg[j],  # queryLigandId
-                          lc[j].item(),  # queryLigandChainId
+                          str(lc[j]),  # queryLigandChainId
                           ln[j],  # queryLigandNumber
                           la[j],  # queryAtomName
                           pg[i],  # targetGroupId
-                          pc[i].item(),  # targetChainId
+                          str(pc[i]),  # targetChainId
                           pn[i],  # targetGroupNumber
                           pa[i],  # targetAtomName
                           dis,  # distance
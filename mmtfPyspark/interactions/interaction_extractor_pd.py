@@ -9,28 +9,32 @@ __author__ = "Peter W Rose"
 __version__ = "0.3.6"
 __status__ = "experimental"
 
+import pickle
 from pyspark.sql import SparkSession
 from pyspark.sql.types import *
-from mmtfPyspark.utils import ColumnarStructure
+from mmtfPyspark.utils import ColumnarStructure, crystalSymmetry
+from mmtfPyspark.utils.structurePartitioner import limit_structures_per_batch
 import numpy as np
+import pandas as pd
 from scipy.spatial import cKDTree
 
 
 class InteractionExtractorPd(object):
 
     @staticmethod
-    def get_interactions(structure, distance_cutoff=4.0, query=None, target=None, inter=True, intra=False, bio=1, level='group'):
+    def get_interactions(structure, distance_cutoff=4.0, query=None, target=None, inter=True, intra=False, bio=1,
+                         level='group', crystal=False):
         '''Return a dataframe of pairwise interactions
 
         The dataframe contains some or all of the following columns depending on the specified level.
         - structureChainId - pdbId.chainName of interacting chain
         - q_chain_name -  chain name of the query
-        - q_trans - id of bio assembly transformation applied to query
+        - q_trans - id of bio assembly transformation applied to query (symmetry code for crystal contacts)
         - q_group_name - id of the query group (residue) from the PDB chemical component dictionary
         - q_group_number - group number of the query group (residue) including insertion code (e.g. 101A)
         - q_atom_name - atom name of the query atom
         - t_chain_name" - chain name of the target
-        - t_trans - id of bio assembly transformation applied to target
+        - t_trans - id of bio assembly transformation applied to target (symmetry code for crystal contacts)
         - t_group_name - id of the target group (residue) from the PDB chemical component dictionary
         - t_group_number - group number of the target group (residue) including insertion code (e.g. 101A)
         - t_atom_name - atom name of the target atom
@@ -38,6 +42,11 @@ class InteractionExtractorPd(object):
         - q_x, q_y, q_z - coordinates of query atoms
         - t_x, t_y, t_z - coordinates of target atoms
 
+        The structures are pickled and processed in Arrow record batches of at most
+        STRUCTURES_PER_BATCH (mmtfPyspark.utils.structurePartitioner) structures, to bound
+        the memory of the Python workers. This lowers spark.sql.execution.arrow.maxRecordsPerBatch
+        of the Spark session.
+
         Parameters
         ----------
         structure : mmtf structure
@@ -48,6 +57,10 @@ class InteractionExtractorPd(object):
         intra: calculate intramolecular interactions if True
         bio : biological assembly number: None for asymmetric unit or 1, 2, ... for bio assembly
         level : 'chain', 'group', 'atom', or 'coord' granularity level at which to aggregate results
+        crystal : calculate the interactions between the asymmetric unit (query) and its symmetry mates in the
+                  crystal lattice (target) if True, bio is ignored. The symmetry mates are identified by symmetry
+                  codes, e.g., 2565 is symmetry operator 2 followed by a translation along b
+                  (see mmtfPyspark.utils.crystalSymmetry.get_symmetry_mates), the asymmetric unit is 1555.
 
         Returns
         -------
@@ -56,10 +69,13 @@ class InteractionExtractorPd(object):
         '''
 
         # find all interactions
-        if bio is None:
-            rows = structure.flatMap(AsymmetricUnitInteractions(query, target, distance_cutoff, inter, intra, level))
+        if crystal:
+            bio = 0
+            extractor = CrystalContactInteractions(query, target, distance_cutoff, inter, intra, level)
+        elif bio is None:
+            extractor = AsymmetricUnitInteractions(query, target, distance_cutoff, inter, intra, level)
         else:
-            rows = structure.flatMap(BioAssemblyInteractions(query, target, distance_cutoff, inter, intra, bio, level))
+            extractor = BioAssemblyInteractions(query, target, distance_cutoff, inter, intra, bio, level)
 
         # TODO consider adding parameters
         # only hetero or homo interactions
@@ -67,10 +83,17 @@ class InteractionExtractorPd(object):
         # seq=True -> add sequence index, sequence
         # geom=True -> add distance, order parameters([q3,q4,q5,q6]
 
-        # Convert RDD of rows to a dataset using a schema
+        # The interactions of each structure are transferred to Spark as
+        # Arrow record batches (see pyspark.sql.DataFrame.mapInPandas)
         spark = SparkSession.builder.getOrCreate()
+        limit_structures_per_batch(spark)
+        input_schema = StructType([StructField("structure_id", StringType(), False),
+                                   StructField("structure", BinaryType(), False)])
+        data = structure.map(lambda t: (t[0], bytearray(pickle.dumps(t[1], pickle.HIGHEST_PROTOCOL))))
+        df = spark.createDataFrame(data, input_schema)
+
         schema = InteractionExtractorPd._get_schema(level, bio)
-        return spark.createDataFrame(rows, schema)
+        return df.mapInPandas(lambda batches: _to_interaction_batches(batches, extractor), schema)
 
     @staticmethod
     def _get_schema(level, bio):
@@ -132,6 +155,10 @@ class AsymmetricUnitInteractions:
         self.level = level
 
     def __call__(self, t):
+        return _to_rows(self.get_batch(t))
+
+    def get_batch(self, t):
+        """Return the interactions of a structure as a dictionary of column name -> array, or None"""
         structure_id = t[0]
 
         # Get a pandas dataframe representation of the structure
@@ -141,7 +168,7 @@ class AsymmetricUnitInteractions:
         df = structure.to_pandas()
 
         if df is None:
-            return []
+            return None
 
         # Apply query filter
         if self.query is None:
@@ -150,7 +177,7 @@ class AsymmetricUnitInteractions:
             q = df.query(self.query)
 
         if q is None or q.shape[0] == 0:
-            return []
+            return None
 
         # Apply target filter
         if self.target is None:
@@ -162,37 +189,22 @@ class AsymmetricUnitInteractions:
             t = df.query(self.target)
 
         if t is None or t.shape[0] == 0:
-            return []
-
-        # group by chain ids
-        q_chains = q.groupby('chain_id')
-        t_chains = t.groupby('chain_id')
-
-        rows = list()
-
-        # Find interactions between pairs of chains
-        for q_chain in q_chains.groups.keys():
-            qt = q_chains.get_group(q_chain).reset_index(drop=True)
-
-            for t_chain in t_chains.groups.keys():
-
-                # exclude intra interactions (same chain id)
-                if not self.intra and q_chain == t_chain:
-                    continue
-
-                if not self.inter and q_chain != t_chain:
-                    continue
-
-                tt = t_chains.get_group(t_chain).reset_index(drop=True)
-
-                # Stack coordinates into an nx3 array
-                cq = np.column_stack((qt['x'].values, qt['y'].values, qt['z'].values)).copy()
-                ct = np.column_stack((tt['x'].values, tt['y'].values, tt['z'].values)).copy()
-
-                rows += _calc_interactions(structure_id, qt, tt, cq, ct, self.level,
-                                           self.distance_cutoff, None, -1, -1)
+            return None
+
+        # Select nx3 coordinate arrays (the dataframe index is the atom index)
+        coords = structure.coords
+        qc = coords[q.index.values]
+        if t is q:
+            tc = qc
+            q = t = q.reset_index(drop=True)
+        else:
+            tc = coords[t.index.values]
+            q = q.reset_index(drop=True)
+            t = t.reset_index(drop=True)
 
-        return rows
+        # Find all interactions with a single distance search and classify them by chain
+        return _calc_interactions(structure_id, q, t, qc, tc, self.level, self.distance_cutoff,
+                                  None, -1, -1, self.inter, self.intra)
 
 
 class BioAssemblyInteractions:
@@ -207,22 +219,30 @@ class BioAssemblyInteractions:
         self.level = level
 
     def __call__(self, t):
+        return _to_rows(self.get_batch(t))
+
+    def get_batch(self, t):
+        """Return the interactions of a structure as a dictionary of column name -> array, or None"""
         structure_id = t[0]
 
         if self.bio < 1:
             raise ValueError('bio assembly number must be >= 1, was:', self.bio)
 
-        # if the specified bio assembly does not exist, return an empty list
+        # if the specified bio assembly does not exist, there are no interactions
         if len(t[1].bio_assembly) < self.bio:
-            return []
+            return None
 
-        #structure = ColumnarStructure(t[1])
-        structure = t[1]
+        transforms = self.get_transforms(t[1])
+        return self._calc_copy_interactions(structure_id, t[1], transforms, transforms)
+
+    def _calc_copy_interactions(self, structure_id, structure, q_transforms, t_transforms):
+        """Return the interactions between the query chains transformed by q_transforms
+        and the target chains transformed by t_transforms"""
 
         # Get a pandas dataframe representation of the structure
         df = structure.to_pandas()
         if df is None:
-            return []
+            return None
 
         # Apply query filter
         if self.query is None:
@@ -231,7 +251,7 @@ class BioAssemblyInteractions:
             q = df.query(self.query)
 
         if q is None or q.shape[0] == 0:
-            return []
+            return None
 
         # Apply target filter
         if self.target is None:
@@ -243,68 +263,56 @@ class BioAssemblyInteractions:
             t = df.query(self.target)
 
         if t is None or t.shape[0] == 0:
-            return []
+            return None
+
+        coords = structure.coords
 
         # Group by chain ids
         q_chains = q.groupby('chain_id')
         t_chains = t.groupby('chain_id')
 
-        rows = list()
-
-        # Find interactions between pairs of chains in bio assembly
-        transforms = self.get_transforms(structure)
-        for q_transform in transforms:
-            qindex = q_transform[0]  # transformation id
-            qchain = q_transform[1]  # chain id
-
-            if qchain in q_chains.groups.keys():
-                qt = q_chains.get_group(qchain).reset_index(drop=True)
-            else:
-                continue
-
-            # Stack coordinates into an nx3 array
-            cq = np.column_stack((qt['x'].values, qt['y'].values, qt['z'].values)).copy()
-            # Create transformation matrix
-            qmat = np.array(q_transform[2]).reshape((4, 4))
-
-            # Apply bio assembly transformations
-            #   apply rotation
-            cqt = np.matmul(cq, qmat[0:3, 0:3])
-            #   apply translation
-            cqt += qmat[3, 0:3].transpose()
-
-            for t_transform in transforms:
-                tindex = t_transform[0]
-                tchain = t_transform[1]
-
-                # exclude intra interactions (same transformation and same chain id)
-                if not self.intra and qindex == tindex and qchain == tchain:
-                    continue
+        # Create the chain copies of the bio assembly. The transformed coordinates of
+        # each copy are calculated once, and only for copies that are involved in interactions.
+        q_copies = _get_chain_copies(q_transforms, q_chains, coords)
+        if t is q and t_transforms is q_transforms:
+            t_copies = q_copies
+        else:
+            t_copies = _get_chain_copies(t_transforms, t_chains, coords)
 
-                if not self.inter and qindex != tindex and qchain != tchain:
-                    continue
+        if len(q_copies) == 0 or len(t_copies) == 0:
+            return None
 
-                if tchain in t_chains.groups.keys():
-                    tt = t_chains.get_group(tchain).reset_index(drop=True)
-                else:
-                    continue
+        # Only pairs of chain copies whose bounding spheres are within the distance cutoff can interact
+        q_centers = np.array([copy.center for copy in q_copies])
+        t_centers = np.array([copy.center for copy in t_copies])
+        q_radii = np.array([copy.radius for copy in q_copies])
+        t_radii = np.array([copy.radius for copy in t_copies])
+        center_distances = np.linalg.norm(q_centers[:, np.newaxis, :] - t_centers[np.newaxis, :, :], axis=2)
+        candidates = np.nonzero(center_distances <= q_radii[:, np.newaxis] + t_radii + self.distance_cutoff)
 
-                # Stack coordinates into an nx3 array
-                ct = np.column_stack((tt['x'].values, tt['y'].values, tt['z'].values)).copy()
+        batches = list()
 
-                # Get a 4x4 transformation matrix
-                tmat = np.array(t_transform[2]).reshape((4, 4))
+        # Find interactions between pairs of chains in bio assembly
+        for q_copy, t_copy in zip(candidates[0], candidates[1]):
+            q_copy = q_copies[q_copy]
+            t_copy = t_copies[t_copy]
+            qindex = q_copy.index  # transformation id
+            tindex = t_copy.index
+
+            # exclude intra interactions (same transformation and same chain id)
+            if not self.intra and qindex == tindex and q_copy.chain_id == t_copy.chain_id:
+                continue
 
-                # Apply bio assembly transformations
-                #   apply rotation
-                ctt = np.matmul(ct, tmat[0:3, 0:3])
-                #   apply translation
-                ctt += tmat[3, 0:3].transpose()
+            if not self.inter and qindex != tindex and q_copy.chain_id != t_copy.chain_id:
+                continue
 
-                rows += _calc_interactions(structure_id, qt, tt, cqt, ctt, self.level,
-                                           self.distance_cutoff, self.bio, qindex, tindex)
+            batch = _calc_interactions(structure_id, q_copy.atoms, t_copy.atoms, q_copy.coords, t_copy.coords,
+                                       self.level, self.distance_cutoff, self.bio, qindex, tindex,
+                                       tree_q=q_copy.tree, tree_t=t_copy.tree)
+            if batch is not None:
+                batches.append(batch)
 
-        return rows
+        return _concat_batches(batches)
 
     def get_transforms(self, col):
         """Return a dictionary of transformation index, chain indices/transformation matrices for given bio assembly"""
@@ -317,75 +325,228 @@ class BioAssemblyInteractions:
         return trans
 
 
-def _calc_interactions(structure_id, q, t, qc, tc, level, distance_cutoff, bio, qindex, tindex):
-    """Calculate distances between the two atom sets"""
-    tree_q = cKDTree(qc)
-    tree_t = cKDTree(tc)
-    sparse_dm = tree_t.sparse_distance_matrix(tree_q, max_distance=distance_cutoff, output_type='dict')
+class _ChainCopy(object):
+    """A chain of a bio assembly transformed by one of the assembly operators.
+    The bounding sphere is transformed when the copy is created, the coordinates
+    and the KD-tree are transformed and built on first use."""
+
+    def __init__(self, index, chain_id, atoms, coords, center, radius, matrix):
+        self.index = index
+        self.chain_id = chain_id
+        self.atoms = atoms
+        self.matrix = matrix
+        rotation = matrix[0:3, 0:3]
+        self.center = np.matmul(center, rotation) + matrix[3, 0:3]
+        # the largest singular value bounds the scaling of the rotation matrix
+        self.radius = radius * np.linalg.norm(rotation, 2)
+        self._coords = coords
+        self._transformed_coords = None
+        self._tree = None
+
+    @property
+    def coords(self):
+        if self._transformed_coords is None:
+            # Apply bio assembly transformations
+            #   apply rotation
+            coords = np.matmul(self._coords, self.matrix[0:3, 0:3])
+            #   apply translation
+            coords += self.matrix[3, 0:3].transpose()
+            self._transformed_coords = coords
+        return self._transformed_coords
 
-    # Add interactions to rows.
-    # There are redundant interactions when aggregating the results at the 'chain' and 'group' level,
-    # since multiple atoms in a group may be involved in interactions.
-    # Therefore we use a set of rows to store only unique interactions.
-    if level == 'atom' or level == 'coord':
-        rows = list()
-    else:
-        rows = set()
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(self.coords)
+        return self._tree
 
-    for ind, dis in sparse_dm.items():
-        # exclude self interactions (this can happen if the query and target criteria overlap)
-        if dis < 0.001:
-            continue
 
-        i = ind[0]  # polymer target atom index
-        j = ind[1]  # polymer query atom index
+class CrystalContactInteractions(BioAssemblyInteractions):
+    """Calculates the interactions between the asymmetric unit (query) and
+    its symmetry mates in the crystal lattice (target)"""
 
-        tr = t.iloc[[i]]
-        qr = q.iloc[[j]]
+    # the asymmetric unit in the symmetry code notation (symmetry operator 1, no lattice translation)
+    ASYMMETRIC_UNIT = 1555
 
-        qcid = qr['chain_id'].item()
-        tcid = tr['chain_id'].item()
+    def __init__(self, query, target, distance_cutoff, inter, intra, level):
+        super().__init__(query, target, distance_cutoff, inter, intra, 0, level)
 
-        qgn = qr['group_number'].item()
-        tgn = tr['group_number'].item()
+    def get_batch(self, t):
+        """Return the interactions of a structure as a dictionary of column name -> array, or None"""
+        structure_id = t[0]
+        structure = t[1]
 
-        if bio is None:
-            # exclude interactions within the same chain and group
-            if qcid == tcid and qgn == tgn:
-                continue
-        else:
-            # exclude interactions within the same chain, transform, and group
-            if qindex == tindex and qcid == tcid and qgn == tgn:
-                continue
+        # crystal contacts are only defined for structures determined from crystals
+        methods = structure.experimental_methods or []
+        if structure.unit_cell is None or \
+                not any('DIFFRACTION' in method or 'CRYSTALLOGRAPHY' in method for method in methods):
+            return None
+
+        # Select the symmetry mates that can be within the distance cutoff of the asymmetric unit
+        coords = structure.coords
+        if len(coords) == 0:
+            return None
+        center = coords.mean(axis=0, dtype=np.float64)
+        radius = np.sqrt(np.max(np.sum((coords - center) ** 2, axis=1)))
+        try:
+            mates = crystalSymmetry.get_symmetry_mates(structure.space_group, structure.unit_cell,
+                                                       center, radius, self.distance_cutoff)
+        except ValueError:
+            # unknown space group or symmetry mates beyond the range of the symmetry codes
+            return None
+
+        if len(mates) == 0:
+            return None
+
+        chain_ids = list(dict.fromkeys(structure.chain_id_list))
+        q_transforms = [(self.ASYMMETRIC_UNIT, chain_id, np.identity(4)) for chain_id in chain_ids]
+        t_transforms = [(code, chain_id, matrix) for code, matrix in mates for chain_id in chain_ids]
+
+        return self._calc_copy_interactions(structure_id, structure, q_transforms, t_transforms)
+
+
+def _get_chain_copies(transforms, chains, coords):
+    """Return the copies of the chains in a bio assembly"""
+    copies = list()
+    spheres = dict()
+    for index, chain_id, matrix in transforms:
+        if chain_id not in chains.groups:
+            continue
 
-        # add query data to a row
-        id = structure_id + "." + tr['chain_name'].item()
-        row = (id, qr['chain_name'].item(),)
-        if bio is not None:
-            row += (qindex,)
-        if level != 'chain':
-            row += (qgn, qr['group_name'].item(),)
-            if level == 'atom' or level == 'coord':
-                row += (qr['atom_name'].item(),)
+        # Calculate the atoms, coordinates, and bounding sphere of a chain once
+        if chain_id not in spheres:
+            # Select nx3 coordinate array (the dataframe index is the atom index)
+            chain_coords = coords[chains.groups[chain_id].values]
+            center = chain_coords.mean(axis=0, dtype=np.float64)
+            radius = np.sqrt(np.max(np.sum((chain_coords - center) ** 2, axis=1)))
+            atoms = chains.get_group(chain_id).reset_index(drop=True)
+            spheres[chain_id] = (atoms, chain_coords, center, radius)
+
+        # Get a 4x4 transformation matrix
+        matrix = np.array(matrix).reshape((4, 4))
+        copies.append(_ChainCopy(index, chain_id, *spheres[chain_id], matrix))
+
+    return copies
+
+
+def _calc_interactions(structure_id, q, t, qc, tc, level, distance_cutoff, bio, qindex, tindex,
+                       inter=True, intra=True, tree_q=None, tree_t=None):
+    """Calculate distances between the two atom sets and return the interactions
+    as a dictionary of column name -> array, or None if there are no interactions.
+    If inter (intra) is False, interactions between different chains (within the same chain) are excluded.
+    Prebuilt KD-trees of the coordinates can be passed in with tree_q and tree_t."""
+    if tree_t is None:
+        tree_t = cKDTree(tc)
+    if tree_q is None:
+        tree_q = tree_t if qc is tc else cKDTree(qc)
+    pairs = tree_t.sparse_distance_matrix(tree_q, max_distance=distance_cutoff, output_type='ndarray')
+
+    i = pairs['i']  # target atom indices
+    j = pairs['j']  # query atom indices
+    dis = pairs['v']
+
+    # exclude self interactions (this can happen if the query and target criteria overlap)
+    mask = dis >= 0.001
+
+    if not inter or not intra or bio is None or qindex == tindex:
+        same_chain = q['chain_id'].values[j] == t['chain_id'].values[i]
+        if not intra:
+            mask &= ~same_chain
+        if not inter:
+            mask &= same_chain
+
+        # exclude interactions within the same chain and group
+        # (for bio assemblies, only within the same transformation)
+        if bio is None or qindex == tindex:
+            mask &= ~same_chain | (q['group_number'].values[j] != t['group_number'].values[i])
+
+    i = i[mask]
+    j = j[mask]
+    dis = dis[mask]
 
-        # add target data to a row
-        row += (tr['chain_name'].item(),)
-        if bio is not None:
-            row += (tindex,)
-        if level != 'chain':
-            row += (tgn, tr['group_name'].item(),)
-            if level == 'atom' or level == 'coord':
-                row += (tr['atom_name'].item(), dis,)
-                if level == 'coord':
-                    row += (qc[j][0].item(), qc[j][1].item(), qc[j][2].item(),
-                            tc[i][0].item(), tc[i][1].item(), tc[i][2].item(),)
-  
-        # add row
+    # There are redundant interactions when aggregating the results at the 'chain' and 'group' level,
+    # since multiple atoms in a group may be involved in interactions.
+    # Therefore we only keep the first pair of atoms for each unique pair of chains or groups.
+    if level == 'chain':
+        cols = ['chain_id']
+    elif level == 'group':
+        cols = ['chain_id', 'group_number', 'group_name']
+    else:
+        cols = None
+
+    if cols is not None and len(i) > 0:
+        q_keys = _get_keys(q, cols)
+        t_keys = _get_keys(t, cols)
+        _, unique = np.unique(q_keys[j] * (t_keys.max() + 1) + t_keys[i], return_index=True)
+        i = i[unique]
+        j = j[unique]
+
+    if len(i) == 0:
+        return None
+
+    # add query data to a batch
+    t_chain_name = t['chain_name'].values[i]
+    batch = {'structure_chain_id': structure_id + "." + t_chain_name,
+             'q_chain_name': q['chain_name'].values[j]}
+    if bio is not None:
+        batch['q_trans'] = np.full(len(j), qindex)
+    if level != 'chain':
+        batch['q_group_number'] = q['group_number'].values[j]
+        batch['q_group_name'] = q['group_name'].values[j]
         if level == 'atom' or level == 'coord':
-            # for these levels, we use a list
-            rows.append(row)
-        else:
-            # for the group or chain level we use a set to remove redundant info
-            rows.add(row)
-
-    return list(rows)
+            batch['q_atom_name'] = q['atom_name'].values[j]
+
+    # add target data to a batch
+    batch['t_chain_name'] = t_chain_name
+    if bio is not None:
+        batch['t_trans'] = np.full(len(i), tindex)
+    if level != 'chain':
+        batch['t_group_number'] = t['group_number'].values[i]
+        batch['t_group_name'] = t['group_name'].values[i]
+        if level == 'atom' or level == 'coord':
+            batch['t_atom_name'] = t['atom_name'].values[i]
+            batch['distance'] = dis
+            if level == 'coord':
+                batch['q_x'] = qc[j, 0]
+                batch['q_y'] = qc[j, 1]
+                batch['q_z'] = qc[j, 2]
+                batch['t_x'] = tc[i, 0]
+                batch['t_y'] = tc[i, 1]
+                batch['t_z'] = tc[i, 2]
+
+    return batch
+
+
+def _get_keys(df, cols):
+    """Return integer keys for the unique combinations of the values in the specified columns"""
+    keys = np.zeros(df.shape[0], dtype=np.int64)
+    for col in cols:
+        codes, uniques = pd.factorize(df[col].values)
+        keys = keys * len(uniques) + codes
+    return np.unique(keys, return_inverse=True)[1]
+
+
+def _concat_batches(batches):
+    """Concatenate a list of batches into a single batch, or None if the list is empty"""
+    if len(batches) == 0:
+        return None
+    if len(batches) == 1:
+        return batches[0]
+    return {col: np.concatenate([batch[col] for batch in batches]) for col in batches[0]}
+
+
+def _to_rows(batch):
+    """Convert a batch to a list of row tuples"""
+    if batch is None:
+        return []
+    return list(zip(*[values.tolist() for values in batch.values()]))
+
+
+def _to_interaction_batches(batches, extractor):
+    """Calculate the interactions of batches of pickled structures and
+    return them as pandas dataframes"""
+    for batch in batches:
+        for structure_id, data in zip(batch['structure_id'], batch['structure']):
+            interactions = extractor.get_batch((structure_id, pickle.loads(data)))
+            if interactions is not None:
+                yield pd.DataFrame(interactions)
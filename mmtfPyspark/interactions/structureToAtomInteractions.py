@@ -12,7 +12,7 @@ __status__ = "done"
 
 from mmtfPyspark.interactions import InteractionFilter, AtomInteraction, InteractionCenter
 from mmtfPyspark.utils import ColumnarStructureX
-from mmtfPyspark.utils import DistanceBox
+from mmtfPyspark.utils import CellList
 import numpy as np
 
 
@@ -48,169 +48,168 @@ class StructureToAtomInteractions(object):
         if len(queryAtomIndices) == 0:
             return interactions
 
-        # Add atom (indices) on grid for rapid indexing of atom neighbors on a
-        # grid based on a cutoff distance
-        box = self._get_distance_box(arrays)
-
-        for queryAtomIndex in queryAtomIndices:
-            # find interactions of query atom specified by atom index
-            interaction = self._get_interactions(arrays, queryAtomIndex, box)
+        # find the interactions of all query atoms that are within the given
+        # limits of interactions
+        for interaction in self._get_interactions(arrays, queryAtomIndices):
             interaction.set_structure_id(structureId)
 
-            # only add interations that are within the given limits of interations
-            if interaction.get_num_interactions() >= self.filter.get_min_interactions() \
-                    and interaction.get_num_interactions() <= self.filter.get_max_interactions():
-
-                # return interactions as either pairs or all interaction of
-                # one atom as a row
-                if self.pairwise:
-                    interactions += interaction.get_pair_interactions_as_rows()
-                else:
-                    multiInteract = interaction.get_multiple_interactions_as_row(
-                        self.filter.get_max_interactions())
-                    interactions += multiInteract
+            # return interactions as either pairs or all interaction of
+            # one atom as a row
+            if self.pairwise:
+                interactions += interaction.get_pair_interactions_as_rows()
+            else:
+                multiInteract = interaction.get_multiple_interactions_as_row(
+                    self.filter.get_max_interactions())
+                interactions += multiInteract
 
         return interactions
 
-    def _get_interactions(self, arrays, queryAtomIndex, box):
-        '''Get the interacting neighbors of an atom in a structure
+    def _get_interactions(self, arrays, queryAtomIndices):
+        '''Get the interacting neighbors of the query atoms in a structure.
+
+        The neighbors of all query atoms are found in a single batched search
+        on a cell list of the target atoms. The neighbors of each query atom
+        are visited in the same order as in a DistanceBox: an interaction
+        with a prohibited group, a partially occupied atom or an atom with a
+        high normalized B-factor results in an empty AtomInteraction, unless
+        the query atom already has more than the maximum number of
+        interactions. AtomInteractions are only created for query atoms with
+        a number of interactions within the given limits.
 
         Parameters
         ----------
         arrays : columnarStructure
            structure in columnarStructure format
-        queryAtomIndex : int
-           the index of the querying atom
-        box : distanceBox
-           the distance box of the query atom
+        queryAtomIndices : list
+           the indices of the query atoms
 
         Returns
         -------
-        AtomInteraction
-           an AtomInteraction class with interacting neighbors
+        list
+           AtomInteractions with interacting neighbors
         '''
-        interaction = AtomInteraction()
-
-        # get the x,y,z coordinates of the structure
-        x = arrays.get_x_coords()
-        y = arrays.get_y_coords()
-        z = arrays.get_z_coords()
-
-        # get the query atom coordinates
-        qx = x[queryAtomIndex]
-        qy = y[queryAtomIndex]
-        qz = z[queryAtomIndex]
+        queryAtomIndices = np.asarray(queryAtomIndices)
+        numQueries = len(queryAtomIndices)
+        minInteractions = self.filter.get_min_interactions()
+        maxInteractions = self.filter.get_max_interactions()
 
         # get required information of the columnarStructure
+        coords = np.column_stack((arrays.get_x_coords(), arrays.get_y_coords(), arrays.get_z_coords()))
         atomToGroupIndices = arrays.get_atom_to_group_indices()
-        occupancies = arrays.get_occupancies()
-        normalizedbFactors = arrays.get_normalized_b_factors()
+        occupancies = np.asarray(arrays.get_occupancies())
+        normalizedbFactors = np.asarray(arrays.get_normalized_b_factors())
         groupNames = arrays.get_group_names()
 
-        # record query atom info
-        queryCenter = InteractionCenter(arrays, queryAtomIndex)
-        interaction.set_center(queryCenter)
-
-        # Retrieve atom indices of atoms that lay within grid cubes that are
-        # within cutoff distance of the query atom
-        cutoffDistanceSq = self.filter.get_distance_cutoff() ** 2
-
-        # Retrieve atom indices of atoms that lay within grid cubes
-        # that are within cutoff distance of the query atom
-        neighborIndices = box.get_neighbors(np.array([qx, qy, qz]))
-        # TEST: flattern neighborIndices
-        if type(neighborIndices[0]) == list:
-            neighborIndices = [
-                n for neighbors in neighborIndices for n in neighbors]
-
-        # determine and record interactions with neighbor atoms
-        for neighborIndex in neighborIndices:
-
-            # exclude self interactions with a group
-            if atomToGroupIndices[neighborIndex] == atomToGroupIndices[queryAtomIndex]:
+        # Retrieve atom indices of target atoms that lay within grid cubes
+        # that are within cutoff distance of the query atoms
+        targetAtomIndices, cells = self._get_cell_list(arrays, coords)
+        indptr, neighborIndices = cells.get_neighbors(coords[queryAtomIndices])
+        neighborIndices = targetAtomIndices[neighborIndices]
+        queries = np.repeat(np.arange(numQueries), np.diff(indptr))
+
+        # exclude self interactions with a group
+        mask = atomToGroupIndices[neighborIndices] != atomToGroupIndices[queryAtomIndices[queries]]
+
+        # check if interactions are within distance cutoff
+        d = coords[queryAtomIndices[queries]] - coords[neighborIndices]
+        distSq = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1] + d[:, 2] * d[:, 2]
+        mask &= distSq.astype(np.float64) <= self.filter.get_distance_cutoff() ** 2
+
+        neighborIndices = neighborIndices[mask]
+        queries = queries[mask]
+
+        # Exclude interactions with undesired groups and
+        # atoms with partial occupancy (< 1.0)
+        excluded = self.filter.is_prohibited_target_group_np(groupNames[neighborIndices]) \
+            | (self.filter.get_normalized_b_factor_cutoff() < normalizedbFactors[neighborIndices]) \
+            | (occupancies[neighborIndices] < 1.0)
+
+        # rank of each neighbor among the valid neighbors of its query atom
+        rank = np.cumsum(~excluded)
+        starts = np.searchsorted(queries, np.arange(numQueries))
+        rank -= np.append(0, rank)[starts][queries]
+
+        # the search terminates early once the number of interactions exceeds
+        # the limit, excluded neighbors before that result in an empty interaction
+        empty = np.zeros(numQueries, dtype=bool)
+        empty[queries[excluded & (rank <= maxInteractions)]] = True
+        mask = ~excluded & (rank <= maxInteractions + 1) & ~empty[queries]
+
+        neighborIndices = neighborIndices[mask]
+        counts = np.bincount(queries[mask], minlength=numQueries)
+        offsets = np.append(0, np.cumsum(counts))
+
+        # only create interactions that are within the given limits of interactions
+        interactions = []
+        for i in np.nonzero((counts >= minInteractions) & (counts <= maxInteractions))[0]:
+            if empty[i]:
+                # return an empty atom interaction
+                interactions.append(AtomInteraction())
                 continue
 
-            # check if interaction is within distance cutoff
-            dx = qx - x[neighborIndex]
-            dy = qy - y[neighborIndex]
-            dz = qz - z[neighborIndex]
-            distSq = dx * dx + dy * dy + dz * dz
-
-            if distSq <= cutoffDistanceSq:
-                # Exclude interactions with undesired groups and
-                # atoms with partial occupancy (< 1.0)
-                if self.filter.is_prohibited_target_group(groupNames[neighborIndex]) \
-                        or self.filter.get_normalized_b_factor_cutoff() < normalizedbFactors[neighborIndex] \
-                        or occupancies[neighborIndex] < float(1.0):
+            # record query atom info
+            interaction = AtomInteraction()
+            interaction.set_center(InteractionCenter(arrays, queryAtomIndices[i]))
 
-                    # return an empty atom interaction
-                    return AtomInteraction()
+            # add interacting atom info
+            for neighborIndex in neighborIndices[offsets[i]:offsets[i + 1]]:
+                interaction.add_neighbor(InteractionCenter(arrays, neighborIndex))
 
-                # add interacting atom info
-                neighbor = InteractionCenter(arrays, neighborIndex)
-                interaction.add_neighbor(neighbor)
+            interactions.append(interaction)
 
-                # terminate early if the number of interactions exceeds limit
-                if interaction.get_num_interactions() > self.filter.get_max_interactions():
-                    return interaction
-
-        return interaction
+        return interactions
 
-    def _get_distance_box(self, arrays):
-        '''Add atom indices on grid for rapid indexing of atom neighbors on a
-        grid based on a cutoff distance
+    def _get_cell_list(self, arrays, coords):
+        '''Add target atoms to a cell list for rapid indexing of atom neighbors
+        on a grid based on a cutoff distance
 
         Parameters
         ----------
         arrays : columnarStructure
            structure in columnarStructure format
+        coords : ndarray
+           atom coordinates
+
+        Returns
+        -------
+        tuple
+           indices of the target atoms and the cell list of the target atoms
         '''
 
         # Get required data
-        x = arrays.get_x_coords()
-        y = arrays.get_y_coords()
-        z = arrays.get_z_coords()
         elements = arrays.get_elements()
         groupNames = arrays.get_group_names()
 
-        box = DistanceBox(self.filter.get_distance_cutoff())
-        for i in range(arrays.get_num_atoms()):
-            if self.filter.is_target_group(groupNames[i]) \
-                    and self.filter.is_target_element(elements[i]):
-
-                newPoint = np.array([x[i], y[i], z[i]])
-                box.add_point(newPoint, i)
+        targetAtomIndices = np.nonzero(self.filter.is_target_group_np(groupNames)
+                                       & self.filter.is_target_element_np(elements))[0]
 
-        return box
+        return targetAtomIndices, CellList(coords[targetAtomIndices], self.filter.get_distance_cutoff())
 
     def _get_query_atom_indices(self, arrays):
-        '''Returns a list of indices to query atoms in the structure
+        '''Returns the indices of query atoms in the structure
 
         Parameters
         ----------
         arrays : columnarStructure
            structure in columnarStructure format
+
+        Returns
+        -------
+        ndarray
+           indices of the query atoms
         '''
 
         # Get required data
         groupNames = arrays.get_group_names()
         elements = arrays.get_elements()
-        groupStartIndices = arrays.get_group_to_atom_indices()
-        occupancies = arrays.get_occupancies()
-        normalizedbFactors = arrays.get_normalized_b_factors()
+        occupancies = np.asarray(arrays.get_occupancies())
+        normalizedbFactors = np.asarray(arrays.get_normalized_b_factors())
 
         # Find atoms that match the query criteria and exlcued atoms with
         # partial occupancy
-        indices = []
-        for i in range(arrays.get_num_groups()):
-
-            start = groupStartIndices[i]
-            end = groupStartIndices[i + 1]
-
-            if self.filter.is_query_group(groupNames[start]):
-                indices += [j for j in range(start, end)
-                            if self.filter.is_query_element(elements[j])
-                            and normalizedbFactors[j] < self.filter.get_normalized_b_factor_cutoff()
-                            and occupancies[j] >= 1.0]
+        mask = self.filter.is_query_group_np(groupNames) \
+            & self.filter.is_query_element_np(elements) \
+            & (normalizedbFactors < self.filter.get_normalized_b_factor_cutoff()) \
+            & (occupancies >= 1.0)
 
-        return indices
+        return np.nonzero(mask)[0]
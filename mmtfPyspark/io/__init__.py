@@ -1 +1 @@
-from . import mmtfReader, mmtfWriter
+from . import mmtfDownloader, mmtfIndex, mmtfParquet, mmtfReader, mmtfWriter
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+'''mmtfDownloader.py
+
+Downloads MMTF files from the MMTF web services (or a mirror) with pooled
+HTTP connections, a bounded number of concurrent requests, retries with
+exponential backoff, and an optional persistent local cache.
+
+If a cache directory is set, downloaded files are stored gzip compressed in the cache directory, keyed
+by format and structure id, e.g. <cache dir>/full/hh/4HHB.mmtf.gz, so that
+repeated downloads never hit the network. The cache directory uses the
+layout of a local MMTF mirror and can be read with
+:func:`read_mmtf_files <mmtfPyspark.io.mmtfReader.read_mmtf_files>`.
+
+The base URL and the cache directory are set with :func:`set_base_url`
+and :func:`set_cache_dir`, or with the environment variables MMTF_BASE_URL
+and MMTF_DOWNLOAD_CACHE. The settings of the driver are used by the Spark
+tasks that download the files, so on a cluster the cache directory must
+be writable on all worker nodes, e.g., a shared file system. Downloads are
+not cached by default. Files that cannot be written to the cache are
+still returned.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import gzip
+import os
+import tempfile
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = 'https://mmtf.rcsb.org/v1.0/'
+
+# maximum number of concurrent requests (and pooled connections) per task
+MAX_CONNECTIONS = 8
+# number of retries of failed requests, the n-th retry waits BACKOFF_FACTOR * 2^(n-1) seconds
+RETRIES = 5
+BACKOFF_FACTOR = 0.5
+# timeout of a request in seconds
+TIMEOUT = 60
+
+_base_url = os.environ.get('MMTF_BASE_URL', DEFAULT_BASE_URL)
+_cache_dir = os.environ.get('MMTF_DOWNLOAD_CACHE') or None
+
+# HTTP sessions (connection pools) of this process
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_base_url():
+    '''Returns the base URL of the MMTF web services
+
+    Returns
+    -------
+    str
+       base URL
+    '''
+    return _base_url
+
+
+def set_base_url(base_url):
+    '''Sets the base URL of the MMTF web services, e.g., a local mirror. The
+    files are downloaded from <base url>/full/<id> and <base url>/reduced/<id>.
+
+    Parameters
+    ----------
+    base_url : str
+       base URL, None: default MMTF web services
+    '''
+    global _base_url
+    _base_url = base_url if base_url is not None else DEFAULT_BASE_URL
+
+
+def get_cache_dir():
+    '''Returns the directory of the download cache
+
+    Returns
+    -------
+    str
+       cache directory, None if downloads are not cached
+    '''
+    return _cache_dir
+
+
+def set_cache_dir(cache_dir):
+    '''Sets the directory of the download cache
+
+    Parameters
+    ----------
+    cache_dir : str
+       cache directory, None: downloads are not cached
+    '''
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def get_url(pdb_id, reduced=False, base_url=None):
+    '''Returns the URL of an MMTF file
+
+    Parameters
+    ----------
+    pdb_id : str
+       structure id
+    reduced : bool
+       if True, returns the URL of the reduced representation
+    base_url : str, optional
+       base URL, defaults to :func:`get_base_url`
+
+    Returns
+    -------
+    str
+       URL
+    '''
+    base_url = base_url or _base_url
+    return base_url.rstrip('/') + ('/reduced/' if reduced else '/full/') + pdb_id
+
+
+def get_cache_path(pdb_id, reduced=False, cache_dir=None):
+    '''Returns the path of an MMTF file in the download cache
+
+    Parameters
+    ----------
+    pdb_id : str
+       structure id
+    reduced : bool
+       if True, returns the path of the reduced representation
+    cache_dir : str, optional
+       cache directory, defaults to :func:`get_cache_dir`
+
+    Returns
+    -------
+    str
+       path of the gzip compressed MMTF file
+    '''
+    cache_dir = cache_dir or _cache_dir
+    pdb_id = pdb_id.upper()
+    return os.path.join(cache_dir, 'reduced' if reduced else 'full', pdb_id[1:3].lower(), pdb_id + '.mmtf.gz')
+
+
+class MmtfDownloader(object):
+    '''Downloads MMTF files with pooled connections, concurrent requests,
+    retries, and an optional local cache. The downloader is serialized to the Spark
+    tasks with its settings, the HTTP connection pool is created once per
+    Python process.
+
+    Parameters
+    ----------
+    reduced : bool, optional
+       if True, download the reduced representation
+    base_url : str, optional
+       base URL, defaults to :func:`get_base_url`
+    cache_dir : str, optional
+       cache directory, defaults to :func:`get_cache_dir`, None: no cache
+    max_connections : int, optional
+       maximum number of concurrent requests
+    retries : int, optional
+       number of retries of failed requests
+    backoff_factor : float, optional
+       backoff factor of the retries in seconds
+
+    Examples
+    --------
+    >>> downloader = MmtfDownloader()
+    >>> for pdb_id, data in downloader.fetch_all(['1STP', '4HHB']):
+    ...     structure = MmtfStructure(data)
+    '''
+
+    def __init__(self, reduced=False, base_url=None, cache_dir=None, max_connections=MAX_CONNECTIONS,
+                 retries=RETRIES, backoff_factor=BACKOFF_FACTOR):
+        self.reduced = reduced
+        self.base_url = base_url or get_base_url()
+        self.cache_dir = cache_dir if cache_dir is not None else get_cache_dir()
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    def fetch(self, pdb_id):
+        '''Returns the msgpack encoded data of a structure from the cache,
+        or downloads it
+
+        Parameters
+        ----------
+        pdb_id : str
+           structure id
+
+        Returns
+        -------
+        bytes
+           msgpack encoded MMTF data, None if the structure does not exist
+
+        Raises
+        ------
+        requests.HTTPError
+           the download failed after all retries
+        '''
+        cache_path = get_cache_path(pdb_id, self.reduced, self.cache_dir) if self.cache_dir else None
+        if cache_path is not None and os.path.exists(cache_path):
+            with gzip.open(cache_path, 'rb') as f:
+                return f.read()
+
+        response = self._get_session().get(get_url(pdb_id, self.reduced, self.base_url), timeout=TIMEOUT)
+        if response.status_code == 404:
+            warnings.warn(f"{pdb_id} is not a valid pdbId")
+            return None
+        response.raise_for_status()
+
+        # the content is decompressed if the server sets the gzip content encoding,
+        # static file servers may return the gzip file as is
+        data = response.content
+        if data[:2] == b'\x1f\x8b':
+            data = gzip.decompress(data)
+
+        if cache_path is not None:
+            try:
+                _write_cache(cache_path, data)
+            except OSError as e:
+                warnings.warn(f"{pdb_id} could not be cached: {e}")
+
+        return data
+
+    def fetch_all(self, pdb_ids):
+        '''Returns the msgpack encoded data of structures, downloaded with
+        up to max_connections concurrent requests
+
+        Parameters
+        ----------
+        pdb_ids : iterable
+           structure ids
+
+        Returns
+        -------
+        iterator
+           (structure id, data) tuples in the order of the structure ids,
+           data is None if the structure does not exist
+        '''
+        pdb_ids = list(pdb_ids)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_connections, len(pdb_ids)))) as executor:
+            yield from zip(pdb_ids, executor.map(self.fetch, pdb_ids))
+
+    def _get_session(self):
+        key = (self.max_connections, self.retries, self.backoff_factor)
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                retry = Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                              status_forcelist=(429, 500, 502, 503, 504), allowed_methods=['GET'],
+                              raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.headers['Accept-Encoding'] = 'gzip'
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[key] = session
+        return session
+
+
+def _write_cache(cache_path, data):
+    '''Writes a gzip compressed file to the cache. The file is renamed after
+    it has been written, so that concurrent readers never see partial files.'''
+    directory = os.path.dirname(cache_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(gzip.compress(data, 6))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
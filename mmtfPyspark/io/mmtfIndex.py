@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+'''mmtfIndex.py: Methods to build and use a structure id index for
+MMTF-Hadoop sequence files.
+
+The index is a sidecar file that maps each structure id to the part file,
+byte offset, and length of its record. With an index, a list of structures
+can be read by seeking directly to the requested records instead of
+streaming through the entire sequence file.
+
+By default, the index is stored as a tab-separated file named
+``_mmtf_index.tsv`` in the sequence file directory. Hadoop ignores files
+that start with an underscore, so the index does not interfere with
+reading the sequence file.
+
+The index records the size and modification time of each part file. If
+the part files are replaced or updated after the index was built, the
+index is no longer used (see :func:`has_index`) until it is rebuilt.
+
+Example
+-------
+>>> mmtfIndex.build_index(mmtfReader.get_mmtf_full_path())
+>>> pdb = mmtfReader.read_full_sequence_file(pdbId=['1STP', '4HHB'])
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import os
+import struct
+from pyspark.sql import SparkSession
+
+INDEX_FILE_NAME = "_mmtf_index.tsv"
+
+# Hadoop SequenceFile constants
+_SEQ_MAGIC = b'SEQ'
+_SYNC_ESCAPE = -1
+_SYNC_SIZE = 16
+
+
+def build_index(path, index_path=None):
+    '''Builds a structure id index for an MMTF-Hadoop sequence file.
+    The part files are indexed in parallel.
+
+    Parameters
+    ----------
+    path : str
+       path to the MMTF-Hadoop sequence file directory (e.g. MMTF_FULL or MMTF_REDUCED)
+    index_path : str, optional
+       path of the index file, default: <path>/_mmtf_index.tsv
+
+    Returns
+    -------
+    int
+       number of indexed structures
+
+    Raises
+    ------
+    Exception
+       file path does not exist
+    ValueError
+       sequence file uses Hadoop compression and cannot be indexed
+    '''
+    if not os.path.exists(path):
+        raise Exception("file path does not exist")
+
+    if index_path is None:
+        index_path = get_index_path(path)
+
+    spark = SparkSession.builder.getOrCreate()
+    sc = spark.sparkContext
+
+    part_files = get_part_files(path)
+    part_file_stats = get_part_file_stats(path)
+    num_slices = max(1, len(part_files))
+    entries = sc.parallelize(part_files, num_slices) \
+                .flatMap(lambda f: index_part_file(path, f)) \
+                .collect()
+
+    with open(index_path, 'w') as f:
+        for part_file in part_files:
+            size, mtime = part_file_stats[part_file]
+            f.write(f"#{part_file}\t{size}\t{mtime}\n")
+        for structure_id, part_file, offset, length in entries:
+            f.write(f"{structure_id}\t{part_file}\t{offset}\t{length}\n")
+
+    return len(entries)
+
+
+def read_index(path, index_path=None):
+    '''Reads the structure id index of an MMTF-Hadoop sequence file
+
+    Parameters
+    ----------
+    path : str
+       path to the MMTF-Hadoop sequence file directory
+    index_path : str, optional
+       path of the index file, default: <path>/_mmtf_index.tsv
+
+    Returns
+    -------
+    dict
+       structure id -> (part file, byte offset, record length)
+    '''
+    if index_path is None:
+        index_path = get_index_path(path)
+
+    index = {}
+    with open(index_path, 'r') as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            structure_id, part_file, offset, length = line.rstrip('\n').split('\t')
+            index[structure_id] = (part_file, int(offset), int(length))
+
+    return index
+
+
+def get_index_path(path):
+    '''Returns the default location of the index file for a sequence file directory'''
+    return os.path.join(path, INDEX_FILE_NAME)
+
+
+def read_index_part_files(path, index_path=None):
+    '''Reads the part files of a sequence file directory at the time the
+    index was built
+
+    Parameters
+    ----------
+    path : str
+       path to the MMTF-Hadoop sequence file directory
+    index_path : str, optional
+       path of the index file, default: <path>/_mmtf_index.tsv
+
+    Returns
+    -------
+    dict
+       part file -> (size in bytes, modification time in ns)
+    '''
+    if index_path is None:
+        index_path = get_index_path(path)
+
+    part_files = {}
+    with open(index_path, 'r') as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            part_file, size, mtime = line[1:].rstrip('\n').split('\t')
+            part_files[part_file] = (int(size), int(mtime))
+
+    return part_files
+
+
+def has_index(path, index_path=None):
+    '''Returns True if an index file exists for the sequence file directory,
+    and the part files have not been changed since the index was built'''
+    if index_path is None:
+        index_path = get_index_path(path)
+    return os.path.isfile(index_path) and read_index_part_files(path, index_path) == get_part_file_stats(path)
+
+
+def get_part_files(path):
+    '''Returns the sorted names of the part files in a sequence file directory.
+    Hidden files (starting with '.' or '_') are skipped, as in Hadoop.'''
+    return sorted(f for f in os.listdir(path)
+                  if not f.startswith(('.', '_')) and os.path.isfile(os.path.join(path, f)))
+
+
+def get_part_file_stats(path):
+    '''Returns the size and modification time (ns) of the part files in a
+    sequence file directory as a dictionary part file -> (size, mtime)'''
+    stats = {}
+    for part_file in get_part_files(path):
+        stat = os.stat(os.path.join(path, part_file))
+        stats[part_file] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def index_part_file(path, part_file):
+    '''Returns a list of (structure id, part file, offset, length) tuples for
+    all records in a part file of an uncompressed Hadoop sequence file
+
+    Parameters
+    ----------
+    path : str
+       path to the sequence file directory
+    part_file : str
+       name of the part file
+
+    Returns
+    -------
+    list
+       index entries
+    '''
+    entries = []
+    with open(os.path.join(path, part_file), 'rb') as f:
+        sync = _read_header(f)
+
+        while True:
+            offset = f.tell()
+            record_length = _read_int(f)
+            if record_length is None:
+                break
+
+            if record_length == _SYNC_ESCAPE:
+                if f.read(_SYNC_SIZE) != sync:
+                    raise ValueError("Invalid sync marker in " + part_file)
+                offset = f.tell()
+                record_length = _read_int(f)
+
+            key_length = _read_int(f)
+            key = _decode_text(f.read(key_length))
+            f.seek(record_length - key_length, os.SEEK_CUR)
+
+            entries.append((key, part_file, offset, f.tell() - offset))
+
+    return entries
+
+
+def read_records(path, entries):
+    '''Reads the specified records from a sequence file directory. Each part
+    file is opened once and the records are read in the order of their offsets.
+
+    Parameters
+    ----------
+    path : str
+       path to the sequence file directory
+    entries : iterable
+       (part file, offset, length) tuples
+
+    Returns
+    -------
+    generator
+       (structure id, value) tuples, with the value as it was stored in the
+       sequence file (i.e., gzipped msgpack data for MMTF-Hadoop files)
+    '''
+    entries = sorted(entries)
+    f = None
+    current_file = None
+    try:
+        for part_file, offset, length in entries:
+            if part_file != current_file:
+                if f is not None:
+                    f.close()
+                f = open(os.path.join(path, part_file), 'rb')
+                current_file = part_file
+
+            f.seek(offset)
+            yield _decode_record(f.read(length))
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _read_header(f):
+    '''Reads the header of a sequence file and returns the sync marker'''
+    if f.read(3) != _SEQ_MAGIC:
+        raise ValueError("Not a Hadoop sequence file: " + f.name)
+
+    f.read(1)  # version
+    _read_string(f)  # key class
+    _read_string(f)  # value class
+    compressed = f.read(1) != b'\x00'
+    block_compressed = f.read(1) != b'\x00'
+    if compressed or block_compressed:
+        raise ValueError("Compressed Hadoop sequence files are not supported: " + f.name)
+
+    num_metadata = _read_int(f)
+    for _ in range(2 * num_metadata):
+        _read_string(f)
+
+    return f.read(_SYNC_SIZE)
+
+
+def _decode_record(record):
+    '''Decodes a sequence file record with a Text key and a BytesWritable value'''
+    record_length, key_length = struct.unpack('>ii', record[:8])
+    key = _decode_text(record[8:8 + key_length])
+    value_offset = 8 + key_length
+    value_length = struct.unpack('>i', record[value_offset:value_offset + 4])[0]
+    value = record[value_offset + 4:value_offset + 4 + value_length]
+    return (key, value)
+
+
+def _decode_text(data):
+    '''Decodes a serialized org.apache.hadoop.io.Text'''
+    length, size = _decode_vint(data)
+    return data[size:size + length].decode('utf-8')
+
+
+def _decode_vint(data):
+    '''Decodes a Hadoop variable length integer. Returns the value and the
+    number of bytes used.'''
+    first = struct.unpack('b', data[0:1])[0]
+    if first >= -112:
+        return first, 1
+
+    negative = first < -120
+    size = (-119 - first) if negative else (-111 - first)
+    value = 0
+    for b in data[1:size]:
+        value = (value << 8) | b
+    if negative:
+        value = ~value
+    return value, size
+
+
+def _read_int(f):
+    data = f.read(4)
+    if len(data) < 4:
+        return None
+    return struct.unpack('>i', data)[0]
+
+
+def _read_string(f):
+    '''Reads a serialized org.apache.hadoop.io.Text from a file'''
+    first = f.read(1)
+    length, size = _decode_vint(first + f.read(_vint_size(first) - 1))
+    return f.read(length).decode('utf-8')
+
+
+def _vint_size(first):
+    b = struct.unpack('b', first)[0]
+    if b >= -112:
+        return 1
+    return (-119 - b) if b < -120 else (-111 - b)
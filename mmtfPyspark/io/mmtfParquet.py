@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+'''mmtfParquet.py
+
+Columnar layout of MMTF structures for Parquet files. Each structure is
+stored as one row. Header fields are stored as typed columns, and each
+encoded MMTF array (e.g. xCoordList, bFactorList, groupTypeList) is stored
+unchanged in its own binary column. Nested fields (groupList, entityList,
+bioAssemblyList, ncsOperatorList) are stored as msgpack encoded binary columns.
+
+Because each field is a separate column, Spark only reads the columns that
+are needed (column pruning), and filters on header columns, e.g. resolution
+or releaseYear, are pushed down to the Parquet reader.
+
+See :func:`write_parquet_file() <mmtfPyspark.io.mmtfWriter.write_parquet_file>` and
+:func:`read_parquet_file() <mmtfPyspark.io.mmtfReader.read_parquet_file>`.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import msgpack
+from pyspark.sql.types import StructType, StructField, StringType, FloatType, \
+    IntegerType, ArrayType, BinaryType
+
+# typed header columns: MMTF field name -> Spark data type
+HEADER_FIELDS = [('structureId', StringType()),
+                 ('mmtfVersion', StringType()),
+                 ('mmtfProducer', StringType()),
+                 ('title', StringType()),
+                 ('depositionDate', StringType()),
+                 ('releaseDate', StringType()),
+                 ('experimentalMethods', ArrayType(StringType())),
+                 ('resolution', FloatType()),
+                 ('rFree', FloatType()),
+                 ('rWork', FloatType()),
+                 ('spaceGroup', StringType()),
+                 ('unitCell', ArrayType(FloatType())),
+                 ('numBonds', IntegerType()),
+                 ('numAtoms', IntegerType()),
+                 ('numGroups', IntegerType()),
+                 ('numChains', IntegerType()),
+                 ('numModels', IntegerType()),
+                 ('groupsPerChain', ArrayType(IntegerType())),
+                 ('chainsPerModel', ArrayType(IntegerType()))]
+
+# derived column that can be used to partition the data set
+RELEASE_YEAR = 'releaseYear'
+
+# nested fields stored as msgpack encoded binary columns
+NESTED_FIELDS = ['groupList', 'entityList', 'bioAssemblyList', 'ncsOperatorList']
+
+# encoded MMTF arrays stored as binary columns
+ARRAY_FIELDS = ['xCoordList', 'yCoordList', 'zCoordList', 'bFactorList',
+                'occupancyList', 'altLocList', 'atomIdList',
+                'groupIdList', 'groupTypeList', 'secStructList', 'insCodeList',
+                'sequenceIndexList', 'chainIdList', 'chainNameList',
+                'bondAtomList', 'bondOrderList']
+
+# columns that are always read, since they are required to create an MmtfStructure
+REQUIRED_COLUMNS = [name for name, _ in HEADER_FIELDS]
+
+# columns that can be selected when reading a Parquet file
+OPTIONAL_COLUMNS = NESTED_FIELDS + ARRAY_FIELDS
+
+
+def get_schema():
+    '''Returns the Spark schema of the MMTF Parquet format
+
+    Returns
+    -------
+    StructType
+       schema with one row per structure
+    '''
+    fields = [StructField(name, data_type, True) for name, data_type in HEADER_FIELDS]
+    fields.append(StructField(RELEASE_YEAR, IntegerType(), True))
+    fields += [StructField(name, BinaryType(), True) for name in OPTIONAL_COLUMNS]
+    return StructType(fields)
+
+
+def to_row(structure_id, structure):
+    '''Returns a tuple with the column values of a structure in the order of
+    :func:`get_schema`
+
+    Parameters
+    ----------
+    structure_id : str
+       structure id, used as the value of the structureId column
+    structure : MmtfStructure
+       structure to be converted
+
+    Returns
+    -------
+    tuple
+       column values
+    '''
+    data = structure.input_data
+
+    row = [structure_id]
+    row += [data.get(name) for name, _ in HEADER_FIELDS[1:]]
+
+    release_date = data.get('releaseDate')
+    row.append(int(release_date[:4]) if release_date else None)
+
+    for name in NESTED_FIELDS:
+        value = data.get(name)
+        row.append(bytearray(msgpack.packb(value, use_bin_type=True)) if value is not None else None)
+
+    for name in ARRAY_FIELDS:
+        value = data.get(name)
+        row.append(bytearray(value) if value is not None else None)
+
+    return tuple(row)
+
+
+def from_row(row):
+    '''Returns a dictionary of MMTF fields equivalent to the output of
+    msgpack.loads. Columns that were not read or are null are omitted.
+
+    Parameters
+    ----------
+    row : Row
+       row of an MMTF Parquet file
+
+    Returns
+    -------
+    dict
+       MMTF field name -> value
+    '''
+    values = row.asDict()
+    data = {}
+    for name, _ in HEADER_FIELDS:
+        if values.get(name) is not None:
+            data[name] = values[name]
+
+    for name in NESTED_FIELDS:
+        if values.get(name) is not None:
+            data[name] = msgpack.unpackb(values[name], raw=False)
+
+    for name in ARRAY_FIELDS:
+        if values.get(name) is not None:
+            data[name] = bytes(values[name])
+
+    return data
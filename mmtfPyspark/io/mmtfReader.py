@@ -7,6 +7,7 @@ Supported operations and file formats:
 - Read directory of MMTF-Hadoop sequence files in full and reduced representation
 - Download MMTF full and reduced representations using web service (mmtf.rcsb.org)
 - Read directory of MMTF files (.mmtf, mmtf.gz)
+- Read MMTF structures stored in columnar Parquet files
 
 '''
 __author__ = "Mars (Shih-Cheng) Huang"
@@ -15,22 +16,33 @@ __email__ = "marshuang80@gmail.com"
 __version__ = "0.2.0"
 __status__ = "Done"
 
+import fnmatch
+import glob
 import os
+import random
 import msgpack
 import gzip
-from mmtfPyspark.utils import MmtfStructure
-from mmtf.api import default_api
-from os import path, walk
+from mmtfPyspark.filters import DEFAULT_FILTER_COST
+from mmtfPyspark.utils import MmtfStructure, MmtfBuffer, MmtfHeader
+from mmtfPyspark.utils.structurePartitioner import balance_partitions
+from mmtfPyspark.io import mmtfIndex, mmtfParquet
+from mmtfPyspark.io.mmtfDownloader import MmtfDownloader
+from os import path
 from pyspark.sql import SparkSession
-import urllib
-import urllib.request as urllib2
 import pandas as pd
 
 text = "org.apache.hadoop.io.Text"
 byteWritable = "org.apache.hadoop.io.BytesWritable"
 
+# file name extensions of MMTF files
+MMTF_EXTENSIONS = ('.mmtf', '.mmtf.gz')
 
-def read_full_sequence_file(pdbId=None, first_model=False, fraction=None, seed=123):
+# size of the MMTF files in a partition
+PARTITION_BYTES = 64 * 1024 * 1024
+
+
+def read_full_sequence_file(pdbId=None, first_model=False, fraction=None, seed=123, lazy=False,
+                            metadata_only=False, filters=None):
     '''Reads a MMTF-Hadoop Sequence file using the default file location.
     The default file location is determined by :func:`get_mmtf_full_path() <mmtfPyspark.io.mmtfReader.get_mmtf_full_path>`
 
@@ -44,11 +56,19 @@ def read_full_sequence_file(pdbId=None, first_model=False, fraction=None, seed=1
        fraction of structure to read
     seed : int, optional
        random seed
+    lazy : bool, optional
+       if True, keep the raw msgpack data and decode fields on first access
+    metadata_only : bool, optional
+       if True, return lightweight header records (MmtfHeader) instead of structures
+    filters : list, optional
+       filters applied while reading, see :func:`read_sequence_file`
     '''
-    return read_sequence_file(get_mmtf_full_path(), pdbId, first_model, fraction, seed)
+    return read_sequence_file(get_mmtf_full_path(), pdbId, first_model, fraction, seed, lazy, metadata_only,
+                              filters)
 
 
-def read_reduced_sequence_file(pdbId=None, first_model=False, fraction=None, seed=123):
+def read_reduced_sequence_file(pdbId=None, first_model=False, fraction=None, seed=123, lazy=False,
+                               metadata_only=False, filters=None):
     '''Reads a MMTF-Hadoop Sequence file using the default file location.
     The default file location is determined by :func:`get_mmtf_reduced_path()
     <mmtfPyspark.io.mmtfReader.get_mmtf_reducedget_mmtf_reduced_path>`
@@ -63,11 +83,19 @@ def read_reduced_sequence_file(pdbId=None, first_model=False, fraction=None, see
        fraction of structure to read
     seed : int, optional
        random seed
+    lazy : bool, optional
+       if True, keep the raw msgpack data and decode fields on first access
+    metadata_only : bool, optional
+       if True, return lightweight header records (MmtfHeader) instead of structures
+    filters : list, optional
+       filters applied while reading, see :func:`read_sequence_file`
     '''
-    return read_sequence_file(get_mmtf_reduced_path(), pdbId, first_model, fraction, seed)
+    return read_sequence_file(get_mmtf_reduced_path(), pdbId, first_model, fraction, seed, lazy, metadata_only,
+                              filters)
 
 
-def read_sequence_file(path, pdbId=None, first_model=False, fraction=None, seed=123):
+def read_sequence_file(path, pdbId=None, first_model=False, fraction=None, seed=123, lazy=False,
+                       metadata_only=False, filters=None, index_path=None):
     '''Reads an MMTF Hadoop Sequence File. Can read all files from path,
     randomly rample a fraction, or a subset based on input list.
     See <a href="http://mmtf.rcsb.org/download.html"> for file download information</a>
@@ -82,12 +110,40 @@ def read_sequence_file(path, pdbId=None, first_model=False, fraction=None, seed=
        fraction of structure to read
     seed : int
        random seed
+    lazy : bool
+       if True, keep the raw msgpack data and decode fields on first access.
+       This avoids unpacking the full structure when only a few fields
+       (e.g. header fields used by filters) are accessed.
+    metadata_only : bool
+       if True, return lightweight header records (:class:`MmtfHeader <mmtfPyspark.utils.MmtfHeader>`)
+       instead of structures. Header records can be filtered with the metadata
+       filters (Resolution, RFree, RWork, ExperimentalMethods, ReleaseDate,
+       DepositionDate), and the full structures of the remaining entries are
+       decoded with ``mapValues(lambda h: h.to_structure())``.
+    filters : list
+       filters (e.g. Resolution, ExperimentalMethods, ContainsGroup, OrFilter,
+       NotFilter) that are applied while reading. Only structures that pass all
+       filters are returned. Filters are evaluated in the order of their cost;
+       metadata filters are evaluated on the header fields before any arrays
+       are decoded, so rejected entries are never fully unpacked.
+    index_path : str
+       path to a structure id index created with :func:`build_index()
+       <mmtfPyspark.io.mmtfIndex.build_index>`, default: <path>/_mmtf_index.tsv.
+       If an index exists, a list of pdbIds is read by seeking directly to
+       the requested records instead of scanning the entire sequence file.
+       An index whose part files have been changed since it was built is
+       not used.
 
     Raises
     ------
     Exception
        file path does not exist
+    ValueError
+       a filter requires the full structure, but metadata_only is set
 
+    Examples
+    --------
+    >>> pdb = read_sequence_file(path, filters=[ContainsLProteinChain(), Resolution(0.0, 2.0)])
     '''
 
     if not os.path.exists(path):
@@ -97,79 +153,213 @@ def read_sequence_file(path, pdbId=None, first_model=False, fraction=None, seed=
     sc = spark.sparkContext
 
     infiles = sc.sequenceFile(path, text, byteWritable)
+    decoder = _StructureDecoder(first_model, lazy, metadata_only, filters)
 
     # Read in all structures from a directory
     if (pdbId == None and fraction == None):
-        return infiles.map(lambda t: _call_sequence_file(t, first_model))
+        structures = infiles.map(lambda t: _call_sequence_file(t, decoder))
+
+    # Read in a specified list of pdbIds using the structure id index
+    elif(pdbId != None and fraction == None and mmtfIndex.has_index(path, index_path)):
+        pdbIdSet = set(pdbId)
+        index = mmtfIndex.read_index(path, index_path)
+        entries = sorted(index[i] for i in pdbIdSet if i in index)
+        num_slices = max(1, min(len(entries), sc.defaultParallelism))
+        structures = sc.parallelize(entries, num_slices) \
+                       .mapPartitions(lambda e: mmtfIndex.read_records(path, e)) \
+                       .filter(lambda t: t[0] in pdbIdSet) \
+                       .map(lambda t: _call_sequence_file(t, decoder))
 
     # Read in a specified list of pdbIds
     elif(pdbId != None and fraction == None):
         pdbIdSet = set(pdbId)
-        return infiles.filter(lambda t: str(t[0]) in pdbIdSet).map(lambda t: _call_sequence_file(t, first_model))
+        structures = infiles.filter(lambda t: str(t[0]) in pdbIdSet).map(lambda t: _call_sequence_file(t, decoder))
 
     # Read in a random fraction of structures from a directory
     elif (pdbId == None and fraction != None):
-        return infiles.sample(False, fraction, seed).map(lambda t: _call_sequence_file(t, first_model))
+        structures = infiles.sample(False, fraction, seed).map(lambda t: _call_sequence_file(t, decoder))
 
     else:
         raise Exception("Inappropriate combination of parameters")
 
+    if filters:
+        structures = structures.filter(lambda t: t is not None)
+
+    return structures
+
 
-def read_mmtf_files(path, first_model=False):
-    '''Read the specified PDB entries from a MMTF file
+def read_parquet_file(path, pdbId=None, first_model=False, columns=None, condition=None):
+    '''Reads MMTF structures from a Parquet file written by :func:`write_parquet_file()
+    <mmtfPyspark.io.mmtfWriter.write_parquet_file>`.
+
+    The header columns are always read. Spark reads only the selected array
+    columns from disk, and the pdbId list and condition are pushed down to
+    the Parquet reader, which skips partitions and row groups that cannot match.
 
     Parameters
     ----------
     path : str
-       Path to MMTF files
+       path to Parquet file directory
+    pdbId : list, optional
+       List of structures to read
+    first_model : bool, optional
+       if True, use only the first model. Requires the groupList and groupTypeList columns.
+    columns : list, optional
+       MMTF fields to read in addition to the header fields, e.g.
+       ['xCoordList', 'yCoordList', 'zCoordList', 'groupTypeList', 'groupList'].
+       By default, all fields are read. Properties of the returned structures
+       that depend on fields that were not read are unavailable.
+    condition : str or Column, optional
+       filter condition on the header columns, e.g. "resolution < 2.0 AND releaseYear >= 2010"
 
     Returns
     -------
     data
-       structure data as keywork/value pairs
+       structure data as keyword/value pairs
+
+    Raises
+    ------
+    Exception
+       file path does not exist
+    ValueError
+       unknown column
+
+    Examples
+    --------
+    Read only coordinates and group types of high-resolution structures
+
+    >>> pdb = read_parquet_file(path, columns=['xCoordList', 'yCoordList', 'zCoordList',
+    ...                                        'groupTypeList', 'groupList'],
+    ...                         condition="resolution < 2.0")
     '''
 
     if not os.path.exists(path):
         raise Exception("file path does not exist")
 
+    if columns is None:
+        columns = mmtfParquet.OPTIONAL_COLUMNS
+    else:
+        unknown = set(columns) - set(mmtfParquet.OPTIONAL_COLUMNS)
+        if unknown:
+            raise ValueError("Unknown column(s): " + ", ".join(sorted(unknown)))
+
     spark = SparkSession.builder.getOrCreate()
-    sc = spark.sparkContext
 
-    return sc.parallelize(_get_files(path)).map(lambda f: _call_mmtf(f, first_model)).filter(lambda t: t is not None)
+    df = spark.read.parquet(path)
+    if pdbId is not None:
+        df = df.filter(df.structureId.isin(list(pdbId)))
+    if condition is not None:
+        df = df.filter(condition)
 
+    df = df.select(mmtfParquet.REQUIRED_COLUMNS + list(columns))
+
+    return df.rdd.map(lambda row: (row.structureId, MmtfStructure(mmtfParquet.from_row(row), first_model)))
 
-def download_mmtf_files(pdbIds, reduced=False, first_model=False):
-    '''Download and reads the specified PDB entries using `MMTF web services <http://mmtf.rcsb.org/download.html>`_
-    with either full or reduced format
+
+def read_mmtf_files(path, first_model=False, lazy=False, metadata_only=False, filters=None, pdbId=None,
+                    fraction=None, seed=123, manifest=None, num_partitions=None):
+    '''Read the specified PDB entries from MMTF files (.mmtf, .mmtf.gz)
+
+    The directories are listed on the executors: the driver only lists the
+    top level of the path, and the subdirectories are listed recursively by
+    Spark tasks. The files are then grouped into partitions of about equal
+    total file size.
 
     Parameters
     ----------
     path : str
-       Path to PDB files
-    reduced : bool
-       flag to indicate reduced or full file format
+       Path to a directory of MMTF files, which is listed recursively, a
+       glob pattern, e.g. "/mirror/*/*.mmtf.gz", or a path to an MMTF file
+    lazy : bool
+       if True, keep the raw msgpack data and decode fields on first access
+    metadata_only : bool
+       if True, return lightweight header records (MmtfHeader) instead of structures
+    filters : list
+       filters applied while reading, see :func:`read_sequence_file`
+    pdbId : list, optional
+       List of structures to read, selected by file name before any file is read
+    fraction : float, optional
+       fraction of structures to read, sampled by file name before any file is read
+    seed : int, optional
+       random seed
+    manifest : str, optional
+       text file that lists the MMTF files, one per line, relative to path or
+       absolute, optionally followed by a tab and the file size in bytes.
+       The directories are not listed if a manifest is given.
+    num_partitions : int, optional
+       number of partitions, by default one partition for each
+       :data:`PARTITION_BYTES` of files, at least the default parallelism
 
     Returns
     -------
     data
        structure data as keywork/value pairs
+
+    Examples
+    --------
+    >>> pdb = read_mmtf_files("/mirror/*/*.mmtf.gz", fraction=0.1)
     '''
+
+    base_path, pattern = _split_glob(path)
+    # the files are read by executors, which may run in a different working directory
+    base_path = os.path.abspath(base_path)
+    if not os.path.exists(base_path) or (manifest is not None and not os.path.exists(manifest)):
+        raise Exception("file path does not exist")
+
     spark = SparkSession.builder.getOrCreate()
     sc = spark.sparkContext
 
-    return sc.parallelize(set(pdbIds)) \
-             .map(lambda t: _get_structure(t, reduced, first_model)) \
+    if manifest is not None:
+        files = _read_manifest(base_path, manifest)
+    else:
+        files, tasks = _list_top_level(base_path, pattern)
+        if len(tasks) > 0:
+            num_slices = min(len(tasks), sc.defaultParallelism)
+            files += sc.parallelize(tasks, num_slices).flatMap(lambda t: _list_directory(*t)).collect()
+
+    # entries are selected by file name before any file is read, in a
+    # reproducible order that does not depend on the file system
+    files = sorted(f for f in files if _get_structure_id(f[0]) is not None)
+    if pdbId is not None:
+        pdbIdSet = set(pdbId)
+        files = [f for f in files if _get_structure_id(f[0]) in pdbIdSet]
+    if fraction is not None:
+        rng = random.Random(seed)
+        files = [f for f in files if rng.random() < fraction]
+
+    # file sizes that are not listed in the manifest
+    unknown = [f for f, size in files if size is None]
+    if len(unknown) > 0:
+        num_slices = min(len(unknown), sc.defaultParallelism)
+        sizes = dict(sc.parallelize(unknown, num_slices).map(lambda f: (f, os.path.getsize(f))).collect())
+        files = [(f, sizes[f] if size is None else size) for f, size in files]
+
+    partitions = _partition_by_size(files, num_partitions or _default_num_partitions(sc, files))
+
+    decoder = _StructureDecoder(first_model, lazy, metadata_only, filters)
+
+    return sc.parallelize(partitions, max(len(partitions), 1)) \
+             .flatMap(lambda p: [_call_mmtf(f, decoder) for f in p]) \
              .filter(lambda t: t is not None)
 
 
-def download_full_mmtf_files(pdbIds, first_model=False):
-    '''Download and reads the specified PDB entries in full mmtf format using `MMTF web services
-    <http://mmtf.rcsb.org/download.html>`_
+def download_mmtf_files(pdbIds, reduced=False, first_model=False, lazy=False):
+    '''Download and reads the specified PDB entries using `MMTF web services <http://mmtf.rcsb.org/download.html>`_
+    with either full or reduced format
+
+    The files are downloaded with pooled connections and concurrent requests
+    within each partition, failed requests are retried, and the files are
+    cached locally if a cache directory is set, see
+    :mod:`mmtfDownloader <mmtfPyspark.io.mmtfDownloader>`.
 
     Parameters
     ----------
-    path : str
-       Path to PDB files
+    pdbIds : list
+       List of structures to download
+    reduced : bool
+       flag to indicate reduced or full file format
+    lazy : bool
+       if True, keep the raw msgpack data and decode fields on first access
 
     Returns
     -------
@@ -179,114 +369,203 @@ def download_full_mmtf_files(pdbIds, first_model=False):
     spark = SparkSession.builder.getOrCreate()
     sc = spark.sparkContext
 
-    return sc.parallelize(set(pdbIds)) \
-             .map(lambda t: _get_structure(t, False, first_model)) \
-             .filter(lambda t: t is not None)
+    downloader = MmtfDownloader(reduced)
+    decoder = _StructureDecoder(first_model, lazy)
 
+    pdbIds = sorted(set(pdbIds))
+    num_slices = max(1, min(len(pdbIds), sc.defaultParallelism))
 
-def download_reduced_mmtf_files(pdbIds, first_model=False):
-    '''Download and reads the specified PDB entries in reduced mmtf format using `MMTF web services
+    return sc.parallelize(pdbIds, num_slices) \
+             .mapPartitions(lambda ids: (decoder(i, data) for i, data in downloader.fetch_all(ids)
+                                         if data is not None))
+
+
+def download_full_mmtf_files(pdbIds, first_model=False):
+    '''Download and reads the specified PDB entries in full mmtf format using `MMTF web services
     <http://mmtf.rcsb.org/download.html>`_
 
     Parameters
     ----------
-    path : str
-       Path to PDB files
+    pdbIds : list
+       List of structures to download
 
     Returns
     -------
     data
        structure data as keywork/value pairs
     '''
-    spark = SparkSession.builder.getOrCreate()
-    sc = spark.sparkContext
-    
-    return sc.parallelize(set(pdbIds)) \
-             .map(lambda t: _get_structure(t, True, first_model)) \
-             .filter(lambda t: t is not None)
+    return download_mmtf_files(pdbIds, False, first_model)
 
 
-def _get_structure(pdbId, reduced, first_model):
-    '''Download and decode a list of structure from a list of PDBid
+def download_reduced_mmtf_files(pdbIds, first_model=False):
+    '''Download and reads the specified PDB entries in reduced mmtf format using `MMTF web services
+    <http://mmtf.rcsb.org/download.html>`_
 
     Parameters
     ----------
-    pdbID : list
+    pdbIds : list
        List of structures to download
 
     Returns
     -------
-    tuple
-       pdbID and deccoder
+    data
+       structure data as keywork/value pairs
     '''
-
-    try:
-        #unpack = default_api.get_raw_data_from_url(pdbId, reduced)
-        url = default_api.get_url(pdbId, reduced)
-        request = urllib2.Request(url)
-        request.add_header('Accept-encoding', 'gzip')
-        response = urllib2.urlopen(request)
-        if response.info().get('Content-Encoding') == 'gzip':
-            data = gzip.decompress(response.read())
-        else:
-            data = response.read()
-        unpack = msgpack.loads(data)
-        decoder = MmtfStructure(unpack, first_model)
-        return (pdbId, decoder)
-    except urllib.error.HTTPError:
-        print(f"ERROR: {pdbId} is not a valid pdbId")
+    return download_mmtf_files(pdbIds, True, first_model)
 
 
-def _call_sequence_file(t, first_model):
+def _call_sequence_file(t, decoder):
     '''Call function for hadoop sequence files'''
     # TODO: check if all sequence files are gzipped
     data = gzip.decompress(t[1])
-    unpack = msgpack.loads(data)
-    decoder = MmtfStructure(unpack, first_model)
-    return (t[0], decoder)
+    return decoder(t[0], data)
 
 
-def _call_mmtf(f, first_model=False):
+def _call_mmtf(f, decoder):
     '''Call function for mmtf files'''
+    name = _get_structure_id(f)
+    if name is None:
+        return None
 
-    if ".mmtf.gz" in f:
-        name = f.split('/')[-1].split('.')[0].upper()
-        data = gzip.open(f, 'rb')
-        unpack = msgpack.unpack(data, raw=False)
-        decoder = MmtfStructure(unpack, first_model)
-        return (name, decoder)
+    if f.endswith('.gz'):
+        with gzip.open(f, 'rb') as infile:
+            data = infile.read()
+    else:
+        with open(f, 'rb') as infile:
+            data = infile.read()
 
-    elif ".mmtf" in f:
-        name = f.split('/')[-1].split('.')[0].upper()
-        unpack = msgpack.unpack(open(f, "rb"), raw=False)
-        decoder = MmtfStructure(unpack, first_model)
-        return (name, decoder)
+    return decoder(name, data)
 
 
-def _get_files(user_path):
-    '''Get List of files from path
+class _StructureDecoder(object):
+    '''Decodes msgpack encoded data into a (structure id, structure) tuple.
 
-    Parameters
-    ----------
-    user_path : str
-       File path
-
-    Returns
-    -------
-    list
-       files in path
+    Filters are sorted by cost. Filters that only use header fields
+    (header_only attribute) are evaluated on a partially decoded
+    :class:`MmtfHeader <mmtfPyspark.utils.MmtfHeader>` before the full structure is decoded.
+    All other filters are applied to the decoded structure.
+    Returns None if the structure does not pass all filters.
     '''
+
+    def __init__(self, first_model=False, lazy=False, metadata_only=False, filters=None):
+        self.first_model = first_model
+        self.lazy = lazy
+        self.metadata_only = metadata_only
+
+        filters = sorted(filters or [], key=lambda f: getattr(f, 'cost', DEFAULT_FILTER_COST))
+        self.header_filters = [f for f in filters if getattr(f, 'header_only', False)]
+        self.structure_filters = [f for f in filters if not getattr(f, 'header_only', False)]
+
+        if metadata_only and len(self.structure_filters) > 0:
+            raise ValueError("Filters that require the full structure cannot be used with metadata_only=True")
+
+    def __call__(self, structure_id, data):
+        header = None
+        if self.metadata_only or len(self.header_filters) > 0:
+            header = MmtfHeader(data, self.first_model)
+            for f in self.header_filters:
+                if not f((structure_id, header)):
+                    return None
+
+            if self.metadata_only:
+                return (structure_id, header)
+
+        if self.lazy:
+            buffer = header.input_data if header is not None else MmtfBuffer(data)
+            structure = MmtfStructure(buffer, self.first_model)
+        else:
+            structure = MmtfStructure(msgpack.loads(data, raw=False), self.first_model)
+
+        for f in self.structure_filters:
+            if not f((structure_id, structure)):
+                return None
+
+        return (structure_id, structure)
+
+
+def _get_structure_id(f):
+    '''Returns the structure id of an MMTF file, e.g., 4HHB for 4hhb.mmtf.gz,
+    or None if the file is not an MMTF file'''
+    name = path.basename(f)
+    if not name.endswith(MMTF_EXTENSIONS):
+        return None
+    return name.split('.')[0].upper()
+
+
+def _split_glob(user_path):
+    '''Splits a path into the directory without wildcards and the glob
+    pattern relative to this directory. A directory without wildcards
+    matches all files in its subdirectories.'''
+    parts = user_path.split(os.sep)
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            base_path = os.sep.join(parts[:i])
+            if len(base_path) == 0:
+                # pattern in the root directory or relative to the current directory
+                base_path = os.sep if os.path.isabs(user_path) else os.curdir
+            return base_path, os.sep.join(parts[i:])
+    return user_path, os.path.join('**', '*')
+
+
+def _list_top_level(base_path, pattern):
+    '''Lists the top level of a directory on the driver. Returns the
+    matching files with their sizes, and the (subdirectory, pattern) pairs
+    that are listed on the executors. A path to a file returns the file.'''
+    if path.isfile(base_path):
+        return [(base_path, path.getsize(base_path))], []
+
+    first, _, rest = pattern.partition(os.sep)
     files = []
-    for dirpath, dirnames, filenames in walk(user_path):
-        for f in filenames:
-            if path.isdir(f):
-                # TODO fix this
-                files += getFiles(f)
-            else:
-                files.append(dirpath + '/' + f)
+    tasks = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if first == '**':
+                    # ** matches any number of subdirectories, including none
+                    tasks.append((entry.path, pattern))
+                elif rest and fnmatch.fnmatch(entry.name, first):
+                    tasks.append((entry.path, rest))
+            elif entry.is_file():
+                name_pattern = rest if first == '**' else first
+                if (first == '**' or not rest) and fnmatch.fnmatch(entry.name, name_pattern):
+                    files.append((entry.path, entry.stat().st_size))
+    return files, tasks
+
+
+def _list_directory(directory, pattern):
+    '''Returns the files and their sizes that match a glob pattern relative to a directory'''
+    return [(f, path.getsize(f)) for f in glob.iglob(path.join(directory, pattern), recursive=True)
+            if path.isfile(f)]
+
+
+def _read_manifest(base_path, manifest):
+    '''Returns the files and their sizes (None if not listed) in a manifest file'''
+    files = []
+    with open(manifest) as infile:
+        for line in infile:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields[0]) > 0:
+                size = int(fields[1]) if len(fields) > 1 and len(fields[1]) > 0 else None
+                files.append((path.join(base_path, fields[0]), size))
     return files
 
 
+def _default_num_partitions(sc, files):
+    '''Returns one partition for each PARTITION_BYTES of files, at least the default parallelism'''
+    total_size = sum(size for _, size in files)
+    num_partitions = max(sc.defaultParallelism, -(-total_size // PARTITION_BYTES))
+    return max(1, min(num_partitions, len(files)))
+
+
+def _partition_by_size(files, num_partitions):
+    '''Groups (file, size) pairs into lists of files of about equal total size'''
+    assignment = balance_partitions([size for _, size in files], num_partitions)
+    partitions = [[] for _ in range(num_partitions)]
+    for (f, _), index in zip(files, assignment):
+        partitions[index].append(f)
+    return [p for p in partitions if len(p) > 0]
+
+
 def get_mmtf_full_path():
     '''Returns the path to the full MMTF-Hadoop sequence file.
     It looks for the environmental variable "MMTF_FULL", if not set, an error
@@ -1,7 +1,8 @@
 #!/user/bin/env python
 '''mmtfWriter.py
 
-Encodes and write MMTF encoded structure data to a Hadoop Sequence File
+Encodes and write MMTF encoded structure data to a Hadoop Sequence File,
+MMTF files, or Parquet files
 
 '''
 __author__ = "Mars (Shih-Cheng) Huang"
@@ -11,7 +12,8 @@ __version__ = "0.2.0"
 __status__ = "Done"
 
 #from mmtf.api.mmtf_writer import MMTFEncoder
-from mmtfPyspark.utils import MmtfStructure
+from mmtfPyspark.utils import MmtfStructure, MmtfBuffer
+from mmtfPyspark.io import mmtfParquet
 from pyspark.sql import SparkSession
 import gzip
 import msgpack
@@ -40,6 +42,36 @@ def write_sequence_file(path, structure, compressed=True):
                                "org.apache.hadoop.io.BytesWritable")
 
 
+def write_parquet_file(path, structure, partition_by=None):
+    '''Writes MMTF encoded structure data to a Parquet file with one row per
+    structure. Header fields are stored as typed columns and each encoded
+    MMTF array in its own binary column (see :mod:`mmtfParquet <mmtfPyspark.io.mmtfParquet>`).
+    The file can be read with :func:`read_parquet_file() <mmtfPyspark.io.mmtfReader.read_parquet_file>`.
+
+    Parameters
+    ----------
+    path : str
+       Path to Parquet file directory
+    structure : tuple
+       structure data to be written
+    partition_by : list, optional
+       columns used to partition the output, e.g. ['releaseYear']
+
+    Examples
+    --------
+    >>> write_parquet_file(path, pdb, partition_by=['releaseYear'])
+    '''
+    spark = SparkSession.builder.getOrCreate()
+
+    rows = structure.map(lambda t: mmtfParquet.to_row(t[0], t[1]))
+    df = spark.createDataFrame(rows, mmtfParquet.get_schema())
+
+    writer = df.write
+    if partition_by:
+        writer = writer.partitionBy(*partition_by)
+    writer.parquet(path)
+
+
 def write_mmtf_files(path, structure):
     '''Encodes and writes MMTF encoded and gzipped structure data to individual .mmtf.gz files.
 
@@ -88,7 +120,11 @@ def _to_byte_array(structure, compressed):
        MMTF encoded and optionally gzipped structure data
     '''
 
-    byte_array = bytearray(msgpack.packb(structure.input_data, use_bin_type=True))
+    if isinstance(structure.input_data, MmtfBuffer):
+        # lazily decoded structures retain the original msgpack data
+        byte_array = bytearray(structure.input_data.data)
+    else:
+        byte_array = bytearray(msgpack.packb(structure.input_data, use_bin_type=True))
     #byte_array = bytearray(msgpack.packb(MMTFEncoder.encode_data(structure), use_bin_type = True))
 
     if compressed:
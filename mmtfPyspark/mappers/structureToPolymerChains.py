@@ -15,6 +15,7 @@ __status__ = "debug"
 from mmtf.utils import decoder_utils
 from mmtf.api.mmtf_writer import MMTFEncoder
 from mmtfPyspark.utils import MmtfStructure
+import numpy as np
 
 class StructureToPolymerChains(object):
     '''Extracts all polymer chains from a structure. If the argument is set to true,
@@ -44,131 +45,134 @@ class StructureToPolymerChains(object):
         numChains = structure.chains_per_model[0]
         chainToEntityIndex = self._get_chain_to_entity_index(structure)
         atomsPerChain, bondsPerChain = self._get_num_atoms_and_bonds(structure)
+        chainToGroupIndices = _cumsum_indices(structure.groups_per_chain[:numChains])
+        chainToAtomIndices = _cumsum_indices(atomsPerChain)
 
         chainList = list()
         seqSet = set()
-        groupCounter = 0
-        atomCounter = 0
 
-        for i in range(numChains):
-            polymerChain = MMTFEncoder()
+        # group and atom lists, looked up once instead of for each group or atom
+        groupTypeList = structure.group_type_list
+        groupIdList = structure.group_id_list
+        insCodeList = structure.ins_code_list
+        sequenceIndexList = structure.sequence_index_list
+        secStructList = structure.sec_struct_list
+        atomIdList = structure.atom_id_list
+        altLocList = structure.alt_loc_list
+        xCoordList = structure.x_coord_list
+        yCoordList = structure.y_coord_list
+        zCoordList = structure.z_coord_list
+        occupancyList = structure.occupancy_list
+        bFactorList = structure.b_factor_list
 
+        for i in range(numChains):
             entityToChainIndex = chainToEntityIndex[i]
 
             chain_type = structure.entity_list[entityToChainIndex]['type']
 
-            polymer = chain_type == "polymer"
-            polymerAtomCount = 0
-
-            atomMap = {}
-
-            structureId = ''
-
-            if polymer:
-                # To avoid of information loss, add chainName/IDs and entity id
-                # This required by some queries
-                structureId = structure.structure_id + '.' +\
-                              structure.chain_name_list[i] + '.' +\
-                              structure.chain_id_list[i] + '.' +\
-                              str(entityToChainIndex + 1)
-
-                # Set header
-                polymerChain.init_structure(bondsPerChain[i], atomsPerChain[i],
-                    structure.groups_per_chain[i], 1, 1, structureId)
-                decoder_utils.add_xtalographic_info(structure, polymerChain)
-                decoder_utils.add_header_info(structure, polymerChain)
-
-                # Set model info (only one model: 0)
-                polymerChain.set_model_info(0,1)
-
-                # Set entity and chain info
-                polymerChain.set_entity_info([0],
-                    structure.entity_list[entityToChainIndex]['sequence'],
-                    structure.entity_list[entityToChainIndex]['description'],
-                    structure.entity_list[entityToChainIndex]['type'])
-                polymerChain.set_chain_info(structure.chain_id_list[i],
-                    structure.chain_name_list[i],
-                    structure.groups_per_chain[i])
-
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-
-                if polymer:
-                    # Set group info
-                    polymerChain.set_group_info(structure.group_list[groupIndex]['groupName'],
-                        structure.group_id_list[groupCounter],
-                        structure.ins_code_list[groupCounter],
-                        structure.group_list[groupIndex]['chemCompType'],
-                        len(structure.group_list[groupIndex]['atomNameList']),
-                        len(structure.group_list[groupIndex]['bondOrderList']),
-                        structure.group_list[groupIndex]['singleLetterCode'],
-                        structure.sequence_index_list[groupCounter],
-                        structure.sec_struct_list[groupCounter])
-
-                for k in range(len(structure.group_list[groupIndex]['atomNameList'])):
-                    if polymer:
-                        atomMap[atomCounter] = polymerAtomCount
-                        polymerAtomCount += 1
-
-                        polymerChain.set_atom_info(
-                            structure.group_list[groupIndex]['atomNameList'][k],
-                            structure.atom_id_list[atomCounter],
-                            structure.alt_loc_list[atomCounter],
-                            structure.x_coord_list[atomCounter],
-                            structure.y_coord_list[atomCounter],
-                            structure.z_coord_list[atomCounter],
-                            structure.occupancy_list[atomCounter],
-                            structure.b_factor_list[atomCounter],
-                            structure.group_list[groupIndex]['elementList'][k],
-                            structure.group_list[groupIndex]['formalChargeList'][k],)
+            # only polymer chains are mapped, the groups and atoms of other
+            # chains are skipped using the chain offsets
+            if chain_type != "polymer":
+                continue
 
-                    atomCounter += 1
+            polymerChain = MMTFEncoder()
 
-                if polymer:
-                    # Add intra-group bond info
-                    for l in range(len(structure.group_list[groupIndex]['bondOrderList'])):
-                        bondIndOne = structure.group_list[groupIndex]['bondAtomList'][l*2]
-                        bondIndTwo = structure.group_list[groupIndex]['bondAtomList'][l*2+1]
-                        bondOrder = structure.group_list[groupIndex]['bondOrderList'][l]
+            # To avoid of information loss, add chainName/IDs and entity id
+            # This required by some queries
+            structureId = structure.structure_id + '.' +\
+                          structure.chain_name_list[i] + '.' +\
+                          structure.chain_id_list[i] + '.' +\
+                          str(entityToChainIndex + 1)
+
+            # Set header
+            polymerChain.init_structure(bondsPerChain[i], atomsPerChain[i],
+                structure.groups_per_chain[i], 1, 1, structureId)
+            decoder_utils.add_xtalographic_info(structure, polymerChain)
+            decoder_utils.add_header_info(structure, polymerChain)
+
+            # Set model info (only one model: 0)
+            polymerChain.set_model_info(0,1)
+
+            # Set entity and chain info
+            polymerChain.set_entity_info([0],
+                structure.entity_list[entityToChainIndex]['sequence'],
+                structure.entity_list[entityToChainIndex]['description'],
+                structure.entity_list[entityToChainIndex]['type'])
+            polymerChain.set_chain_info(structure.chain_id_list[i],
+                structure.chain_name_list[i],
+                structure.groups_per_chain[i])
+
+            atomCounter = chainToAtomIndices[i]
+
+            for groupCounter in range(chainToGroupIndices[i], chainToGroupIndices[i + 1]):
+                group = structure.group_list[groupTypeList[groupCounter]]
+
+                # Set group info
+                polymerChain.set_group_info(group['groupName'],
+                    groupIdList[groupCounter],
+                    insCodeList[groupCounter],
+                    group['chemCompType'],
+                    len(group['atomNameList']),
+                    len(group['bondOrderList']),
+                    group['singleLetterCode'],
+                    sequenceIndexList[groupCounter],
+                    secStructList[groupCounter])
+
+                for k in range(len(group['atomNameList'])):
+                    polymerChain.set_atom_info(
+                        group['atomNameList'][k],
+                        atomIdList[atomCounter],
+                        altLocList[atomCounter],
+                        xCoordList[atomCounter],
+                        yCoordList[atomCounter],
+                        zCoordList[atomCounter],
+                        occupancyList[atomCounter],
+                        bFactorList[atomCounter],
+                        group['elementList'][k],
+                        group['formalChargeList'][k],)
 
-                        polymerChain.set_group_bond(bondIndOne, bondIndTwo, bondOrder)
+                    atomCounter += 1
+
+                # Add intra-group bond info
+                for l in range(len(group['bondOrderList'])):
+                    bondIndOne = group['bondAtomList'][l*2]
+                    bondIndTwo = group['bondAtomList'][l*2+1]
+                    bondOrder = group['bondOrderList'][l]
 
-                groupCounter += 1
+                    polymerChain.set_group_bond(bondIndOne, bondIndTwo, bondOrder)
 
-            if polymer:
-                # TODO skipping adding inter group bond info for now
+            # TODO skipping adding inter group bond info for now
 
-                polymerChain.finalize_structure()
+            polymerChain.finalize_structure()
 
-                chId = structure.chain_name_list[i]
-                if self.useChainIdInsteadOfChainName :
-                    chId = structure.chain_id_list[i]
-                if self.excludeDuplicates:
-                    if chainToEntityIndex[i] in seqSet:
-                        continue
-                    seqSet.add(chainToEntityIndex[i])
-                chainList.append((structure.structure_id + "." + chId, polymerChain))
+            chId = structure.chain_name_list[i]
+            if self.useChainIdInsteadOfChainName :
+                chId = structure.chain_id_list[i]
+            if self.excludeDuplicates:
+                if chainToEntityIndex[i] in seqSet:
+                    continue
+                seqSet.add(chainToEntityIndex[i])
+            chainList.append((structure.structure_id + "." + chId, polymerChain))
 
         return chainList
 
 
     def _get_num_atoms_and_bonds(self, structure):
-        '''Gets the number of atoms and bonds per chain
+        '''Gets the number of atoms and bonds per chain from the group types,
+        without a loop over the groups
         '''
         numChains = structure.chains_per_model[0]
-        atomsPerChain = [0] * numChains
-        bondsPerChain = [0] * numChains
-        groupCounter = 0
+        groupsPerChain = np.asarray(structure.groups_per_chain[:numChains], dtype=np.int64)
+        groupTypes = np.asarray(structure.group_type_list[:groupsPerChain.sum()], dtype=np.int64)
+        chainIndices = np.repeat(np.arange(numChains), groupsPerChain)
 
-        for i in range(numChains):
+        atomsPerGroupType = np.array([len(group['atomNameList']) for group in structure.group_list], dtype=np.int64)
+        bondsPerGroupType = np.array([len(group['bondOrderList']) for group in structure.group_list], dtype=np.int64)
 
-            for j in range(structure.groups_per_chain[i]):
-                groupIndex = structure.group_type_list[groupCounter]
-                atomsPerChain[i] += len(structure.group_list[groupIndex]['atomNameList'])
-                bondsPerChain[i] += len(structure.group_list[groupIndex]['bondOrderList'])
-                groupCounter += 1
+        atomsPerChain = np.bincount(chainIndices, weights=atomsPerGroupType[groupTypes], minlength=numChains)
+        bondsPerChain = np.bincount(chainIndices, weights=bondsPerGroupType[groupTypes], minlength=numChains)
 
-        return atomsPerChain, bondsPerChain
+        return atomsPerChain.astype(np.int64).tolist(), bondsPerChain.astype(np.int64).tolist()
 
 
     def _get_chain_to_entity_index(self, structure):
@@ -186,3 +190,9 @@ class StructureToPolymerChains(object):
                 entityChainIndex[j] = i
 
         return entityChainIndex
+
+
+def _cumsum_indices(counts):
+    '''Returns the start indices of consecutive blocks with the given sizes,
+    followed by the total size'''
+    return [0] + np.cumsum(counts, dtype=np.int64).tolist()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+import numpy as np
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.datasets import atomExtractor
+from mmtfPyspark.utils import structurePartitioner
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class AtomExtractorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("atomExtractorTest") \
+                                 .getOrCreate()
+
+        self.pdb = mmtfReader.read_mmtf_files(FILE_DIR, first_model=True)
+
+    def test_default_columns(self):
+        df = atomExtractor.structures_to_atom_dataframe(self.pdb)
+        self.assertListEqual(['structure_id'] + atomExtractor.DEFAULT_COLUMNS, df.columns)
+
+        counts = dict(df.groupBy('structure_id').count().collect())
+        self.assertDictEqual({'1HV4': 9288, '1J6T': 3555, '1STP': 1001, '4HHB': 4779}, counts)
+
+        # the structures are sent to the Python workers in small batches
+        max_records = int(self.spark.conf.get('spark.sql.execution.arrow.maxRecordsPerBatch'))
+        self.assertLessEqual(max_records, structurePartitioner.STRUCTURES_PER_BATCH)
+
+    def test_4HHB(self):
+        pdb = self.pdb.filter(lambda t: t[0] == '4HHB')
+        structure = pdb.values().first()
+
+        cols = ['chain_id', 'group_number', 'atom_name', 'x', 'polymer', 'entity_type', 'group_serial']
+        df = atomExtractor.structures_to_atom_dataframe(pdb, cols=cols).toPandas()
+
+        self.assertEqual(structure.num_atoms, df.shape[0])
+        self.assertListEqual(structure.chain_ids.tolist(), df['chain_id'].tolist())
+        self.assertListEqual(structure.group_numbers.tolist(), df['group_number'].tolist())
+        self.assertListEqual(structure.entity_types.tolist(), df['entity_type'].tolist())
+        np.testing.assert_array_equal(structure.x_coord_list, df['x'].values)
+        np.testing.assert_array_equal(structure.polymer, df['polymer'].values)
+        np.testing.assert_array_equal(structure.group_serial, df['group_serial'].values)
+
+    def test_schema(self):
+        schema = atomExtractor.get_schema(['chain_id', 'altloc', 'x', 'polymer', 'atom_id'])
+        self.assertListEqual(['string', 'string', 'string', 'float', 'boolean', 'int'],
+                             [field.dataType.simpleString() for field in schema.fields])
+
+        df = atomExtractor.structures_to_atom_dataframe(self.pdb.filter(lambda t: t[0] == '1J6T'),
+                                                        cols=['altloc', 'element']).toPandas()
+        self.assertSetEqual({'1J6T'}, set(df['structure_id']))
+        self.assertSetEqual({'', 'A', 'B'}, set(df['altloc']))
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            atomExtractor.structures_to_atom_dataframe(self.pdb, cols=['coords'])
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
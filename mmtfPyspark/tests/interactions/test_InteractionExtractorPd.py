@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.interactions import InteractionExtractorPd
+from mmtfPyspark.interactions.interaction_extractor_pd import AsymmetricUnitInteractions, CrystalContactInteractions
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class InteractionExtractorPdTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("InteractionExtractorPdTest") \
+                                 .getOrCreate()
+
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        self.pdb = mmtfReader.read_mmtf_files(path, pdbId=['4HHB'])
+        self.query = "group_name != 'HOH'"
+
+    def test_asymmetric_unit(self):
+        counts = {}
+        for level in ['chain', 'group', 'atom']:
+            df = InteractionExtractorPd.get_interactions(self.pdb, query=self.query, target=self.query,
+                                                         bio=None, level=level)
+            counts[level] = df.count()
+
+        self.assertEqual({'chain': 22, 'group': 364, 'atom': 1380}, counts)
+
+    def test_bio_assembly(self):
+        df = InteractionExtractorPd.get_interactions(self.pdb, query=self.query, target=self.query,
+                                                     bio=1, level='group')
+        self.assertEqual(364, df.count())
+        self.assertEqual(0, df.filter("q_trans != 0 or t_trans != 0").count())
+
+        # interactions within the same group are excluded
+        same_group = "q_chain_name = t_chain_name and q_group_number = t_group_number"
+        self.assertEqual(0, df.filter(same_group).count())
+
+    def test_crystal_contacts(self):
+        df = InteractionExtractorPd.get_interactions(self.pdb, query=self.query, target=self.query,
+                                                     crystal=True, level='chain')
+        self.assertEqual({1555}, {row.q_trans for row in df.select('q_trans').collect()})
+        # 4HHB (P 1 21 1) packs against lattice translations along a and c, and a 21 screw axis
+        self.assertEqual({1455, 1554, 1556, 1655, 2545, 2555},
+                         {row.t_trans for row in df.select('t_trans').collect()})
+
+        # structures without atoms have no crystal contacts
+        structure = SimpleNamespace(experimental_methods=['X-RAY DIFFRACTION'], space_group='P 1',
+                                    unit_cell=[20.0, 30.0, 40.0, 90.0, 90.0, 90.0],
+                                    coords=np.empty((0, 3), dtype=np.float32))
+        extractor = CrystalContactInteractions(self.query, self.query, 4.0, True, True, 'chain')
+        self.assertIsNone(extractor.get_batch(('EMPTY', structure)))
+
+    def test_rows(self):
+        df = InteractionExtractorPd.get_interactions(self.pdb, query=self.query, target=self.query,
+                                                     bio=None, level='coord')
+        expected = sorted(tuple(round(v, 3) if isinstance(v, float) else v for v in row) for row in df.collect())
+
+        extractor = AsymmetricUnitInteractions(self.query, self.query, 4.0, True, False, 'coord')
+        rows = self.pdb.flatMap(extractor).collect()
+        rows = sorted(tuple(round(v, 3) if isinstance(v, float) else v for v in row) for row in rows)
+        self.assertListEqual(expected, rows)
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
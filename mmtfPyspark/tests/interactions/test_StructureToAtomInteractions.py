@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.interactions import InteractionFilter, StructureToAtomInteractions
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class StructureToAtomInteractionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("StructureToAtomInteractionsTest") \
+                                 .getOrCreate()
+
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        self.pdb = mmtfReader.read_mmtf_files(path, pdbId=['4HHB'])
+
+    def get_rows(self, interactionFilter):
+        bfilter = self.spark.sparkContext.broadcast(interactionFilter)
+        return self.pdb.flatMap(StructureToAtomInteractions(bfilter)).collect()
+
+    def test_heme_iron(self):
+        interactionFilter = InteractionFilter(distanceCutoff=3.0, minInteractions=1, maxInteractions=6)
+        interactionFilter.set_query_groups(True, 'HEM')
+        interactionFilter.set_query_elements(True, 'Fe')
+        interactionFilter.set_target_elements(True, ['N', 'O'])
+
+        # the porphyrin nitrogens are part of the heme group, the iron is
+        # coordinated by the proximal histidine
+        rows = self.get_rows(interactionFilter)
+        self.assertEqual(4, len(rows))
+        self.assertEqual({('NE2', 'HIS')}, {(row[13], row[15]) for row in rows})
+
+        interactionFilter.set_prohibited_target_groups(['HIS'])
+        self.assertEqual(0, len(self.get_rows(interactionFilter)))
+
+    def test_water(self):
+        interactionFilter = InteractionFilter(distanceCutoff=3.2, minInteractions=1, maxInteractions=4)
+        interactionFilter.set_query_groups(True, 'HOH')
+        interactionFilter.set_target_elements(True, ['N', 'O'])
+
+        rows = self.get_rows(interactionFilter)
+        self.assertEqual(209, len(rows))
+        self.assertEqual({'HOH'}, {row[8] for row in rows})
+
+        # waters that interact with a heme are excluded
+        interactionFilter.set_prohibited_target_groups(['HEM'])
+        self.assertEqual(202, len(self.get_rows(interactionFilter)))
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
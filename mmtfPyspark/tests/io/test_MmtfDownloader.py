@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+'''
+
+Authorship information:
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__status__ = "Warning"
+'''
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfDownloader, mmtfReader
+from mmtfPyspark.io.mmtfDownloader import MmtfDownloader
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class _MmtfHandler(BaseHTTPRequestHandler):
+    '''Serves the MMTF files in resources/files as /full/<id>. The first
+    request of each file fails with 503 to test the retries.'''
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        pdb_id = self.path.split('/')[-1]
+        files = [f for f in (pdb_id + '.mmtf.gz', pdb_id + '.mmtf') if os.path.exists(FILE_DIR + f)]
+        if self.requests.count(self.path) == 1:
+            self.send_response(503)
+            self.end_headers()
+        elif len(files) == 0 or not self.path.startswith('/full/'):
+            self.send_response(404)
+            self.end_headers()
+        else:
+            with open(FILE_DIR + files[0], 'rb') as f:
+                data = f.read()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestMmtfDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("TestMmtfDownloader") \
+                                 .getOrCreate()
+
+        _MmtfHandler.requests = []
+        self.server = ThreadingHTTPServer(('localhost', 0), _MmtfHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = 'http://localhost:%d/' % self.server.server_address[1]
+        self.cache_dir = tempfile.mkdtemp()
+
+    def test_fetch(self):
+        downloader = MmtfDownloader(base_url=self.base_url, cache_dir=self.cache_dir, backoff_factor=0)
+        with self.assertWarns(UserWarning):
+            results = list(downloader.fetch_all(['4HHB', '1STP', '1XYZ']))
+        self.assertListEqual(['4HHB', '1STP', '1XYZ'], [pdb_id for pdb_id, _ in results])
+        self.assertIsNone(results[2][1])
+        with open(FILE_DIR + '1STP.mmtf', 'rb') as f:
+            self.assertEqual(f.read(), results[1][1])
+        self.assertTrue(os.path.exists(mmtfDownloader.get_cache_path('4HHB', cache_dir=self.cache_dir)))
+
+        # cached files are not downloaded again
+        num_requests = len(_MmtfHandler.requests)
+        self.assertEqual(results[0][1], downloader.fetch('4HHB'))
+        self.assertEqual(num_requests, len(_MmtfHandler.requests))
+
+    def test_cache_write_error(self):
+        # downloaded files are returned if they cannot be cached
+        cache_dir = os.path.join(self.cache_dir, 'file')
+        open(cache_dir, 'w').close()
+        downloader = MmtfDownloader(base_url=self.base_url, cache_dir=cache_dir, backoff_factor=0)
+        with self.assertWarns(UserWarning):
+            data = downloader.fetch('1STP')
+        with open(FILE_DIR + '1STP.mmtf', 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_download_mmtf_files(self):
+        base_url = mmtfDownloader.get_base_url()
+        cache_dir = mmtfDownloader.get_cache_dir()
+        try:
+            mmtfDownloader.set_base_url(self.base_url)
+            mmtfDownloader.set_cache_dir(self.cache_dir)
+            pdb = mmtfReader.download_mmtf_files(['1STP', '4HHB', '1XYZ', '4HHB'])
+            self.assertListEqual(['1STP', '4HHB'], sorted(pdb.keys().collect()))
+
+            # the cache directory can be read as a local mirror
+            pdb = mmtfReader.read_mmtf_files(self.cache_dir + '/full')
+            self.assertEqual(4779, pdb.filter(lambda t: t[0] == '4HHB').values().first().num_atoms)
+        finally:
+            mmtfDownloader.set_base_url(base_url)
+            mmtfDownloader.set_cache_dir(cache_dir)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
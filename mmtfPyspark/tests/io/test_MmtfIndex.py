@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+'''
+
+Authorship information:
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__status__ = "Warning"
+'''
+import os
+import shutil
+import tempfile
+import unittest
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfIndex, mmtfReader, mmtfWriter
+from mmtfPyspark.filters import Resolution
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class TestMmtfIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("TestMmtfIndex") \
+                                 .getOrCreate()
+
+        self.path = tempfile.mkdtemp() + '/full'
+        mmtfWriter.write_sequence_file(self.path, mmtfReader.read_mmtf_files(FILE_DIR))
+
+    def test_build_index(self):
+        self.assertEqual(4, mmtfIndex.build_index(self.path))
+        self.assertTrue(mmtfIndex.has_index(self.path))
+
+        index = mmtfIndex.read_index(self.path)
+        self.assertSetEqual({'1HV4', '1J6T', '1STP', '4HHB'}, set(index.keys()))
+
+        # the index file is ignored when reading the sequence file
+        self.assertEqual(4, mmtfReader.read_sequence_file(self.path).count())
+
+    def test_read_records(self):
+        mmtfIndex.build_index(self.path)
+        index = mmtfIndex.read_index(self.path)
+
+        expected = dict(self.spark.sparkContext.sequenceFile(self.path, mmtfReader.text,
+                                                             mmtfReader.byteWritable).collect())
+        records = dict(mmtfIndex.read_records(self.path, index.values()))
+        self.assertEqual(expected.keys(), records.keys())
+        for structure_id, value in records.items():
+            self.assertEqual(bytes(expected[structure_id]), value)
+
+    def test_read_with_index(self):
+        pdbIds = ['1STP', '4HHB', '1J6T', 'XXXX']
+        pdb = mmtfReader.read_sequence_file(self.path, pdbId=pdbIds)
+        expected = sorted((t[0], t[1].num_atoms) for t in pdb.collect())
+
+        index_path = tempfile.mkdtemp() + '/index.tsv'
+        mmtfIndex.build_index(self.path, index_path)
+        pdb = mmtfReader.read_sequence_file(self.path, pdbId=pdbIds, index_path=index_path)
+        self.assertListEqual(expected, sorted((t[0], t[1].num_atoms) for t in pdb.collect()))
+
+        pdb = mmtfReader.read_sequence_file(self.path, pdbId=pdbIds, index_path=index_path,
+                                            filters=[Resolution(0.0, 2.0)])
+        self.assertListEqual(['4HHB'], pdb.keys().collect())
+
+    def test_stale_index(self):
+        mmtfIndex.build_index(self.path)
+        self.assertTrue(mmtfIndex.has_index(self.path))
+
+        # replace the part files (and their checksum files) after the index was built
+        path = tempfile.mkdtemp() + '/full'
+        mmtfWriter.write_sequence_file(path, mmtfReader.read_mmtf_files(FILE_DIR, pdbId=['1STP', '4HHB']))
+        for file_name in os.listdir(self.path):
+            if file_name != mmtfIndex.INDEX_FILE_NAME:
+                os.remove(os.path.join(self.path, file_name))
+        for file_name in os.listdir(path):
+            shutil.copy(os.path.join(path, file_name), self.path)
+        self.assertFalse(mmtfIndex.has_index(self.path))
+
+        pdb = mmtfReader.read_sequence_file(self.path, pdbId=['1STP', '4HHB', '1J6T'])
+        self.assertListEqual([('1STP', 1001), ('4HHB', 4779)],
+                             sorted((t[0], t[1].num_atoms) for t in pdb.collect()))
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
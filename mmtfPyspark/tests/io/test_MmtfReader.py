@@ -10,9 +10,11 @@ __email__ = "marshuang80@gmail.com:
 __status__ = "Warning"
 '''
 import os
+import tempfile
 import unittest
 from pyspark.sql import SparkSession
-from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.io import mmtfReader, mmtfWriter
+from mmtfPyspark.filters import Resolution, ExperimentalMethods, ContainsGroup, OrFilter, NotFilter
 
 FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
 
@@ -28,6 +30,76 @@ class ReadSequenceFileTest(unittest.TestCase):
         pdb = mmtfReader.read_mmtf_files(path)
         self.assertEqual(4, pdb.count())
 
+    def test_mmtf_selection(self):
+        path = FIXTURE_DIR +  '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path + '*/*.mmtf.gz')
+        self.assertListEqual(['1HV4'], pdb.keys().collect())
+
+        pdb = mmtfReader.read_mmtf_files(path, pdbId=['1HV4', '4HHB', '1XYZ'], num_partitions=2)
+        self.assertEqual(2, pdb.getNumPartitions())
+        self.assertListEqual(['1HV4', '4HHB'], sorted(pdb.keys().collect()))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, 'manifest.txt')
+            with open(manifest, 'w') as f:
+                f.write('1STP.mmtf\t1000\ntest/1HV4.mmtf.gz\n')
+            pdb = mmtfReader.read_mmtf_files(path, manifest=manifest)
+            self.assertListEqual(['1HV4', '1STP'], sorted(pdb.keys().collect()))
+
+        # path to a single file
+        pdb = mmtfReader.read_mmtf_files(path + '4HHB.mmtf.gz')
+        self.assertListEqual(['4HHB'], pdb.keys().collect())
+
+        # glob pattern relative to the current directory
+        cwd = os.getcwd()
+        try:
+            os.chdir(path)
+            pdb = mmtfReader.read_mmtf_files('*.mmtf.gz')
+            self.assertListEqual(['1J6T', '4HHB'], sorted(pdb.keys().collect()))
+        finally:
+            os.chdir(cwd)
+
+        # sampling does not depend on the order of the directory listing
+        samples = [sorted(mmtfReader.read_mmtf_files(path, fraction=0.5, seed=7).keys().collect()) for _ in range(2)]
+        self.assertListEqual(samples[0], samples[1])
+
+    def test_metadata_only(self):
+        path = FIXTURE_DIR +  '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path, metadata_only=True)
+        pdb = pdb.filter(Resolution(0.0, 2.0)) \
+                 .filter(ExperimentalMethods(ExperimentalMethods.X_RAY_DIFFRACTION))
+        self.assertListEqual(['4HHB'], pdb.keys().collect())
+
+        structure = pdb.mapValues(lambda h: h.to_structure()).values().first()
+        self.assertEqual(4779, structure.num_atoms)
+        self.assertListEqual(['N', 'CA', 'C'], structure.atom_names[0:3].tolist())
+
+    def test_filters(self):
+        path = FIXTURE_DIR +  '/../../../resources/files/'
+        xray = ExperimentalMethods(ExperimentalMethods.X_RAY_DIFFRACTION)
+        filters = [ContainsGroup('HEM'), OrFilter(Resolution(0.0, 2.0), NotFilter(xray))]
+        pdb = mmtfReader.read_mmtf_files(path, filters=filters)
+        expected = mmtfReader.read_mmtf_files(path).filter(filters[0]).filter(filters[1])
+        self.assertListEqual(sorted(expected.keys().collect()), sorted(pdb.keys().collect()))
+        self.assertListEqual(['4HHB'], pdb.keys().collect())
+
+        with self.assertRaises(ValueError):
+            mmtfReader.read_mmtf_files(path, metadata_only=True, filters=filters)
+
+    def test_sequence_file_filters(self):
+        path = FIXTURE_DIR +  '/../../../resources/files/'
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = tmp_dir + '/full'
+            mmtfWriter.write_sequence_file(tmp_path, mmtfReader.read_mmtf_files(path))
+
+            xray = ExperimentalMethods(ExperimentalMethods.X_RAY_DIFFRACTION)
+            pdb = mmtfReader.read_sequence_file(tmp_path, filters=[NotFilter(xray)])
+            self.assertListEqual(['1J6T'], pdb.keys().collect())
+
+            pdb = mmtfReader.read_sequence_file(tmp_path, pdbId=['1STP', '4HHB'], lazy=True,
+                                                filters=[Resolution(2.0, 3.0)])
+            self.assertListEqual(['1STP'], pdb.keys().collect())
+
     def tearDown(self):
         self.spark.stop()
 
@@ -35,6 +35,31 @@ class WriteSequenceFileTest(unittest.TestCase):
         pdb = mmtfReader.read_mmtf_files(tmp_path)
         self.assertEqual(4, pdb.count())
 
+    def test_parquet(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path)
+        tmp_path = tempfile.mkdtemp() + '/parquet'
+        mmtfWriter.write_parquet_file(tmp_path, pdb, partition_by=['releaseYear'])
+
+        expected = pdb.filter(lambda t: t[0] == '4HHB').values().first()
+        structure = mmtfReader.read_parquet_file(tmp_path, pdbId=['4HHB']).values().first()
+        self.assertEqual(expected.resolution, structure.resolution)
+        self.assertEqual(expected.unit_cell, structure.unit_cell)
+        self.assertListEqual(expected.group_names.tolist(), structure.group_names.tolist())
+        np.testing.assert_array_equal(expected.x_coord_list, structure.x_coord_list)
+        np.testing.assert_array_equal(expected.entityChainIndex, structure.entityChainIndex)
+
+        pdb = mmtfReader.read_parquet_file(tmp_path, first_model=True,
+                                           columns=['xCoordList', 'groupTypeList', 'groupList'],
+                                           condition="releaseYear > 1990")
+        pdb = pdb.collectAsMap()
+        self.assertSetEqual({'1HV4', '1J6T', '1STP'}, set(pdb.keys()))
+        self.assertNotIn('bFactorList', pdb['1J6T'].input_data)
+        self.assertEqual(3555, len(pdb['1J6T'].x_coord_list))
+
+        with self.assertRaises(ValueError):
+            mmtfReader.read_parquet_file(tmp_path, columns=['coords'])
+
     def test_4hhb(self):
         path = FIXTURE_DIR + '/../../../resources/files/'
         pdb = mmtfReader.read_mmtf_files(path)
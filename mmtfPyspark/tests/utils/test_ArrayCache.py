@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import os
+import gc
+import gzip
+import unittest
+import msgpack
+import numpy as np
+from mmtfPyspark.utils import MmtfStructure, MmtfSubstructure, arrayCache
+from mmtfPyspark.utils.arrayCache import ArrayCache
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class ArrayCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        with gzip.open(FILE_DIR + '4HHB.mmtf.gz', 'rb') as f:
+            self.data = msgpack.unpackb(f.read(), raw=False)
+
+    def tearDown(self):
+        arrayCache.set_cache_size(None)
+
+    def test_lru_eviction(self):
+        cache = ArrayCache(max_bytes=200)
+        cache.put(1, 'a', np.zeros(10, dtype=np.float64))
+        cache.put(1, 'b', np.zeros(10, dtype=np.float64))
+        cache.put(2, 'a', np.zeros(10, dtype=np.float64))
+        self.assertIsNone(cache.get(1, 'a'))
+        self.assertEqual(160, cache.nbytes)
+
+        # b is used more recently than (2, a)
+        self.assertIsNotNone(cache.get(1, 'b'))
+        cache.put(2, 'b', np.zeros(10, dtype=np.float64))
+        self.assertIsNone(cache.get(2, 'a'))
+        self.assertDictEqual({'b': 80}, cache.owner_nbytes(1))
+
+        # a value larger than the budget is kept until the next value is cached
+        cache.put(3, 'a', np.zeros(100, dtype=np.float64))
+        self.assertEqual(1, len(cache))
+        self.assertIsNotNone(cache.get(3, 'a'))
+
+        cache.discard_owner(3)
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.nbytes)
+
+    def test_structure(self):
+        structure = MmtfStructure(self.data)
+        df = structure.to_pandas(add_cols=['sequence_position', 'group_serial']).copy()
+        names = structure.atom_names.copy()
+        self.assertEqual(4779 * 3 * 4, structure.nbytes()['_coords'])
+
+        # arrays are decoded again after eviction
+        arrayCache.set_cache_size(100000)
+        self.assertLessEqual(arrayCache.get_cache().nbytes, 100000)
+        for _ in range(2):
+            np.testing.assert_array_equal(names, structure.atom_names)
+            np.testing.assert_array_equal(df['x'], structure.x_coord_list)
+            np.testing.assert_array_equal(df['sequence_position'], structure.sequence_positions)
+            np.testing.assert_array_equal(df['b'], structure.b_factor_list)
+
+        # cached arrays are removed when the structure is garbage collected
+        arrayCache.set_cache_size(None)
+        structure.to_pandas()
+        self.assertIn('df', structure.nbytes())
+        num_entries = len(arrayCache.get_cache())
+        del structure
+        gc.collect()
+        self.assertLess(len(arrayCache.get_cache()), num_entries)
+
+    def test_substructures(self):
+        structure = MmtfStructure(self.data)
+        chain = structure.get_chain('A')
+        model = structure.get_model(0)
+        substructure = MmtfSubstructure(structure, 'A', chain_names=['A'], entity_types=['polymer'])
+        coords = substructure.coords.copy()
+        dfs = [s.to_pandas().copy() for s in (chain, model, substructure)]
+
+        cache = arrayCache.get_cache()
+        for s in (chain, model, substructure):
+            self.assertIn('df', cache.owner_nbytes(s._cache_id))
+        self.assertIn('_coords', cache.owner_nbytes(substructure._cache_id))
+
+        # the dataframes and masked coordinates are evicted and calculated again
+        arrayCache.set_cache_size(0)
+        self.assertEqual(1, len(cache))
+        np.testing.assert_array_equal(coords, substructure.coords)
+        for s, df in zip((chain, model, substructure), dfs):
+            self.assertTrue(df.equals(s.to_pandas()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import unittest
+import numpy as np
+from mmtfPyspark.utils import CellList, DistanceBox
+
+
+class CellListTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(123)
+        self.coords = rng.uniform(-20, 20, (500, 3))
+        self.cutoff = 4.0
+
+    def test_get_pairs(self):
+        cells = CellList(self.coords, self.cutoff)
+        query = self.coords[:100]
+        query_indices, indices, distances = cells.get_pairs(query, self.cutoff)
+
+        all_distances = np.linalg.norm(query[:, np.newaxis, :] - self.coords, axis=2)
+        expected = set(zip(*np.nonzero(all_distances <= self.cutoff)))
+        self.assertEqual(expected, set(zip(query_indices.tolist(), indices.tolist())))
+        self.assertTrue(np.allclose(all_distances[query_indices, indices], distances))
+
+    def test_get_neighbors(self):
+        cells = CellList(self.coords, self.cutoff)
+        indptr, indices = cells.get_neighbors(self.coords[:10])
+        self.assertEqual(11, len(indptr))
+
+        # the neighbors are the points in the 27 cells around the query point
+        cell_indices = np.rint(self.coords / self.cutoff)
+        for i in range(10):
+            expected = np.nonzero(np.all(np.abs(cell_indices - cell_indices[i]) <= 1, axis=1))[0]
+            self.assertListEqual(sorted(expected.tolist()), sorted(indices[indptr[i]:indptr[i + 1]].tolist()))
+            # the points of the cell of the query point are returned first
+            first = indices[indptr[i]]
+            self.assertTrue(np.array_equal(cell_indices[i], cell_indices[first]))
+
+        # empty cell list
+        indptr, indices = CellList(np.zeros((0, 3)), self.cutoff).get_neighbors(self.coords[:2])
+        self.assertListEqual([0, 0, 0], indptr.tolist())
+
+    def test_get_intersection(self):
+        cells1 = CellList([[0.0, 0.0, 0.0], [4.0, 0.0, 0.0], [20.0, 0.0, 0.0]], 4.0)
+        cells2 = CellList([[8.0, 0.0, 0.0]], 4.0)
+        # the cell of point 1 overlaps, it is visited before its neighbor cell
+        self.assertListEqual([1, 0], cells1.get_intersection(cells2).tolist())
+        self.assertListEqual([0], cells2.get_intersection(cells1).tolist())
+
+    def test_distance_box(self):
+        box = DistanceBox(self.cutoff)
+        for i, point in enumerate(self.coords):
+            box.add_point(point, 'p' + str(i))
+
+        indptr, indices = box.get_cell_list().get_neighbors(self.coords[:10])
+        for i in range(10):
+            neighbors = box.get_neighbors(self.coords[i])
+            self.assertListEqual(['p' + str(n) for n in indices[indptr[i]:indptr[i + 1]]], neighbors)
+
+        other = DistanceBox(self.cutoff)
+        other.add_point(self.coords[0], 'q')
+        intersection = box.getIntersection(other)
+        self.assertIn('p0', intersection)
+        self.assertListEqual(['q'], other.getIntersection(box))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+import os
+import gzip
+import unittest
+import msgpack
+import numpy as np
+from mmtfPyspark.utils import codec, mmtfCodec
+from mmtfPyspark.utils.codec import Codec
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+BACKENDS = ['numpy', 'numba']
+
+
+class CodecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.random = np.random.RandomState(7)
+        with gzip.open(FILE_DIR + '4HHB.mmtf.gz', 'rb') as f:
+            self.data = msgpack.unpackb(f.read(), raw=False)
+
+    def _random_arrays(self, codec_type):
+        '''Returns random arrays that can be encoded with a codec, including
+        runs of repeated values, large deltas, and the empty array'''
+        arrays = []
+        for _ in range(20):
+            n = self.random.randint(1, 300)
+            runs = self.random.randint(1, 10, size=n)
+            if codec_type in (2, 4, 8):
+                values = self.random.randint(-100, 100, size=n)
+                if codec_type != 2:
+                    values[::7] = self.random.randint(-2**20, 2**20, size=values[::7].shape[0])
+                arrays.append(np.repeat(values, runs).astype(np.int32))
+            elif codec_type == 5:
+                chains = np.array(['A', 'B', 'AAAA', 'b1', ''])
+                arrays.append(chains[self.random.randint(0, 5, size=n)])
+            elif codec_type == 6:
+                chars = np.array(['', 'A', 'B', 'z', '1'])
+                arrays.append(np.repeat(chars[self.random.randint(0, 5, size=n)], runs))
+            elif codec_type == 9:
+                values = self.random.randint(0, 10000, size=n) / 100.0
+                arrays.append(np.repeat(values, runs).astype(np.float32))
+            elif codec_type == 10:
+                # coordinates with 3 decimals, including jumps > 32.767 Angstrom
+                values = np.cumsum(self.random.randint(-3000, 3000, size=n))
+                values[::11] += self.random.randint(-200000, 200000, size=values[::11].shape[0])
+                arrays.append((values / 1000.0).astype(np.float32))
+        arrays.append(arrays[0][:0])
+        return arrays
+
+    def test_round_trip(self):
+        params = {2: 0, 4: 0, 5: 4, 6: 0, 8: 0, 9: 100, 10: 1000}
+        for backend in BACKENDS:
+            c = Codec(backend)
+            for codec_type, param in params.items():
+                for array in self._random_arrays(codec_type):
+                    encoded = getattr(c, 'encode' + str(codec_type))(array, param)
+                    decoded = c.decode_array(codec.add_header(encoded, codec_type, len(array), param))
+                    if codec_type in (9, 10):
+                        np.testing.assert_allclose(array, decoded, atol=0.5 / param, rtol=0)
+                    else:
+                        self.assertListEqual(array.tolist(), decoded.tolist())
+
+    def test_backends_identical(self):
+        numpy_codec = Codec('numpy')
+        numba_codec = Codec('numba')
+        for field_name, value in self.data.items():
+            if not isinstance(value, bytes):
+                continue
+            expected = numpy_codec.decode_array(value)
+            decoded = numba_codec.decode_array(value)
+            self.assertEqual(expected.dtype, decoded.dtype, field_name)
+            np.testing.assert_array_equal(expected, decoded, field_name)
+
+            codec_type, length, param, in_array = numpy_codec.parse_header(value)
+            encoded = getattr(numba_codec, 'encode' + str(codec_type))(expected, param)
+            self.assertEqual(getattr(numpy_codec, 'encode' + str(codec_type))(expected, param), encoded)
+
+    def test_4HHB_coordinates(self):
+        for backend in BACKENDS:
+            c = Codec(backend)
+            x = c.decode_array(self.data['xCoordList'])
+            self.assertEqual(np.float32, x.dtype)
+            self.assertEqual(4779, x.shape[0])
+            np.testing.assert_allclose([6.204, 6.913, 8.504], x[0:3], atol=0.001)
+
+            out = np.zeros((10, 3), dtype=np.float32)
+            c.decode_array_into(self.data['yCoordList'], out[:, 1])
+            np.testing.assert_array_equal(c.decode_array(self.data['yCoordList'])[:10], out[:, 1])
+
+    def test_decode_arrays(self):
+        with open(FILE_DIR + '1STP.mmtf', 'rb') as f:
+            data_list = [self.data, msgpack.unpackb(f.read(), raw=False), {}]
+
+        c = Codec()
+        for field_name in ['xCoordList', 'bFactorList', 'atomIdList', 'altLocList', 'groupTypeList',
+                           'secStructList', 'chainNameList', 'sequenceIndexList']:
+            decoded = c.decode_field(data_list, field_name)
+            self.assertIsNone(decoded[2])
+            for data, array in zip(data_list, decoded):
+                if field_name in data:
+                    np.testing.assert_array_equal(c.decode_array(data[field_name]), array)
+
+        # mixed codecs and parameters
+        arrays = [self.data['xCoordList'], self.data['atomIdList'], self.data['yCoordList']]
+        for array, decoded in zip(arrays, mmtfCodec.decode_arrays(arrays)):
+            np.testing.assert_array_equal(c.decode_array(array), decoded)
+
+        # several batches
+        batch_size = codec.BATCH_SIZE
+        try:
+            codec.BATCH_SIZE = 5000
+            arrays = [data_list[i % 2]['zCoordList'] for i in range(7)]
+            for array, decoded in zip(arrays, c.decode_arrays(arrays)):
+                np.testing.assert_array_equal(c.decode_array(array), decoded)
+        finally:
+            codec.BATCH_SIZE = batch_size
+
+    def test_decode_limit(self):
+        for backend in BACKENDS:
+            c = Codec(backend)
+            for field_name, value in self.data.items():
+                if not isinstance(value, bytes):
+                    continue
+                expected = c.decode_array(value)
+                for limit in [0, 1, 100, len(expected) - 1, len(expected), len(expected) + 1]:
+                    np.testing.assert_array_equal(expected[:limit], c.decode_array(value, limit),
+                                                  field_name)
+
+        # recursive index encoding with fill values
+        array = np.array([0.0, 40.0, -40.0, 1.0, 100.0, 2.0], dtype=np.float32)
+        encoded = codec.add_header(Codec().encode10(array, 1000), 10, len(array), 1000)
+        for limit in range(len(array) + 1):
+            np.testing.assert_allclose(array[:limit], Codec().decode_array(encoded, limit), atol=0.001)
+            np.testing.assert_allclose(array[:limit], mmtfCodec.decode_array(encoded, limit), atol=0.001)
+
+    def test_encode_array(self):
+        for field_name in ['xCoordList', 'occupancyList', 'atomIdList', 'altLocList', 'chainIdList']:
+            value = self.data[field_name]
+            codec_type, length, param, _ = mmtfCodec.parse_header(value)
+            decoded = mmtfCodec.decode_array(value)
+            encoded = mmtfCodec.encode_array(decoded, codec_type, param)
+            np.testing.assert_array_equal(decoded, mmtfCodec.decode_array(encoded))
+
+    def test_set_backend(self):
+        backend = codec.get_backend()
+        try:
+            codec.set_backend('numba')
+            self.assertEqual('numba', codec.get_backend().name)
+            self.assertEqual('numba', Codec()._get_backend().name)
+            self.assertEqual('numpy', Codec('numpy')._get_backend().name)
+        finally:
+            codec.set_backend(backend.name)
+
+        with self.assertRaises(ValueError):
+            codec.set_backend('cython')
+
+
+if __name__ == '__main__':
+    unittest.main()
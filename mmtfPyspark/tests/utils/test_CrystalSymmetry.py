@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+from fractions import Fraction
+import numpy as np
+from mmtfPyspark.utils import crystalSymmetry
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class CrystalSymmetryTest(unittest.TestCase):
+
+    def test_symmetry_operators(self):
+        # number of operators including the lattice centering translations
+        orders = {'P 1': 1, 'C 1 2 1': 4, 'P 21 21 21': 4, 'I 41 2 2': 16, 'H 3 2': 18,
+                  'P 61 2 2': 12, 'F 41 3 2': 96}
+        for space_group, order in orders.items():
+            rotations, translations = crystalSymmetry.get_symmetry_operators(space_group)
+            self.assertEqual(order, len(rotations), space_group)
+            self.assertTrue(np.array_equal(np.identity(3), rotations[0]))
+
+        # operators in the order of the International Tables
+        rotations, translations = crystalSymmetry.get_symmetry_operators('P 21 21 21')
+        operators = [(tuple(np.diag(r)), tuple(t)) for r, t in zip(rotations, translations)]
+        expected = [((1, 1, 1), (0, 0, 0)), ((-1, -1, 1), (0.5, 0, 0.5)),
+                    ((-1, 1, -1), (0, 0.5, 0.5)), ((1, -1, -1), (0.5, 0.5, 0))]
+        self.assertListEqual(expected, operators)
+
+        with self.assertRaises(ValueError):
+            crystalSymmetry.get_symmetry_operators('P 2/m')
+
+    def test_symmetry_operators_centred(self):
+        # general positions of the International Tables, (0,0,0)+ set followed by the centring translations
+        expected = {'I 21 21 21': ['x,y,z', '-x+1/2,-y,z+1/2', '-x,y+1/2,-z+1/2', 'x+1/2,-y+1/2,-z',
+                                   'x+1/2,y+1/2,z+1/2', '-x,-y+1/2,z', '-x+1/2,y,-z', 'x,-y,-z+1/2'],
+                    'I 41 2 2': ['x,y,z', '-x+1/2,-y+1/2,z+1/2', '-y,x+1/2,z+1/4', 'y+1/2,-x,z+3/4',
+                                 '-x+1/2,y,-z+3/4', 'x,-y+1/2,-z+1/4', 'y+1/2,x+1/2,-z+1/2', '-y,-x,-z',
+                                 'x+1/2,y+1/2,z+1/2', '-x,-y,z', '-y+1/2,x,z+3/4', 'y,-x+1/2,z+1/4',
+                                 '-x,y+1/2,-z+1/4', 'x+1/2,-y,-z+3/4', 'y,x,-z', '-y+1/2,-x+1/2,-z+1/2']}
+        for space_group, operators in expected.items():
+            rotations, translations = crystalSymmetry.get_symmetry_operators(space_group)
+            self.assertListEqual(operators, [_to_xyz(r, t) for r, t in zip(rotations, translations)])
+
+    def test_symmetry_operators_pdb(self):
+        # symmetry operators in Cartesian coordinates from REMARK 290
+        with open(FILE_DIR + '2rfk.pdb') as f:
+            lines = f.read().splitlines()
+
+        cryst = [line for line in lines if line.startswith('CRYST1')][0]
+        unit_cell = [float(v) for v in cryst[6:54].split()]
+        expected = {}
+        for line in lines:
+            if line.startswith('REMARK 290   SMTRY'):
+                fields = line.split()
+                expected.setdefault(int(fields[3]), []).append([float(v) for v in fields[4:8]])
+
+        orthogonalization = crystalSymmetry.get_orthogonalization_matrix(unit_cell)
+        fractionalization = np.linalg.inv(orthogonalization)
+        rotations, translations = crystalSymmetry.get_symmetry_operators('P 41 21 2')
+        operators = [np.column_stack([orthogonalization.dot(r).dot(fractionalization), orthogonalization.dot(t)])
+                     for r, t in zip(rotations, translations)]
+
+        # the symmetry codes refer to the operator numbers of REMARK 290
+        self.assertEqual(len(expected), len(operators))
+        for number, operator in expected.items():
+            self.assertTrue(np.allclose(operator, operators[number - 1], atol=1e-3), number)
+
+    def test_symmetry_mates(self):
+        # P1 crystal: translations along the cell edges
+        unit_cell = [20.0, 30.0, 40.0, 90.0, 90.0, 90.0]
+        mates = crystalSymmetry.get_symmetry_mates('P 1', unit_cell, np.array([10.0, 15.0, 20.0]), 5.0, 4.0)
+        self.assertEqual([], mates)
+
+        mates = crystalSymmetry.get_symmetry_mates('P 1', unit_cell, np.array([10.0, 15.0, 20.0]), 9.0, 4.0)
+        self.assertListEqual([1455, 1655], [code for code, _ in mates])
+        self.assertTrue(np.allclose([20.0, 0.0, 0.0], mates[1][1][3, 0:3]))
+
+        # lattice translations beyond +/- 4 unit cells cannot be encoded in a symmetry code
+        with self.assertRaises(ValueError):
+            crystalSymmetry.get_symmetry_mates('P 1', unit_cell, np.array([10.0, 15.0, 20.0]), 50.0, 4.0)
+
+
+def _to_xyz(rotation, translation):
+    components = list()
+    for row, value in zip(rotation, translation):
+        component = ''.join(('+' if r > 0 else '-') + axis for r, axis in zip(row, 'xyz') if r != 0).lstrip('+')
+        if value != 0:
+            component += '+' + str(Fraction(value).limit_denominator(12))
+        components.append(component)
+    return ','.join(components)
+
+
+if __name__ == '__main__':
+    unittest.main()
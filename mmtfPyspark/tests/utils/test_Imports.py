@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.realpath(__file__)) + '/../../../'
+
+
+def _imported_modules(code):
+    '''Runs code in a new Python process and returns the names of the imported modules'''
+    code += '\nimport sys\nprint("\\n".join(sys.modules))'
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', code], env=env)
+    return set(output.decode().split())
+
+
+class ImportsTest(unittest.TestCase):
+
+    def test_import_package(self):
+        modules = _imported_modules('import mmtfPyspark')
+        self.assertNotIn('mmtfPyspark.datasets', modules)
+        self.assertNotIn('pyspark', modules)
+
+    def test_import_structure(self):
+        modules = _imported_modules('from mmtfPyspark.utils import MmtfStructure')
+        self.assertIn('mmtfPyspark.utils.mmtfStructure', modules)
+        self.assertNotIn('mmtfPyspark.ml', modules)
+        self.assertNotIn('sympy', modules)
+        self.assertNotIn('numba', modules)
+
+    def test_lazy_attributes(self):
+        import mmtfPyspark
+        from mmtfPyspark.utils import ColumnarStructure, decode_array
+        from mmtfPyspark.utils.columnarStructure import ColumnarStructure as cs
+        self.assertIs(cs, ColumnarStructure)
+        self.assertTrue(callable(decode_array))
+        self.assertTrue(hasattr(mmtfPyspark.filters, 'Resolution'))
+
+        with self.assertRaises(AttributeError):
+            mmtfPyspark.utils.NoSuchClass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+'''
+
+Authorship information:
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__status__ = "Warning"
+'''
+
+import os
+import gzip
+import pickle
+import unittest
+import msgpack
+import numpy as np
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.utils import MmtfBuffer, MmtfStructure
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+FILE_DIR = FIXTURE_DIR + '/../../../resources/files/'
+
+
+class TestMmtfBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[1]") \
+                                 .appName("TestMmtfBuffer") \
+                                 .getOrCreate()
+
+    def test_buffer_fields(self):
+        data = gzip.open(FILE_DIR + '4HHB.mmtf.gz', 'rb').read()
+        unpack = msgpack.loads(data, raw=False)
+        buffer = MmtfBuffer(data)
+
+        self.assertEqual(set(unpack.keys()), set(buffer.keys()))
+        self.assertEqual(unpack['structureId'], buffer['structureId'])
+        self.assertEqual(unpack['groupList'], buffer['groupList'])
+        # binary fields are returned without copying the data
+        self.assertIsInstance(buffer['xCoordList'], memoryview)
+        self.assertEqual(unpack['xCoordList'], bytes(buffer['xCoordList']))
+
+        # pickled buffers are rebuilt from the raw bytes
+        copy = pickle.loads(pickle.dumps(buffer))
+        self.assertEqual(buffer.to_dict(), copy.to_dict())
+
+    def test_4HHB_lazy_structure(self):
+        data = gzip.open(FILE_DIR + '4HHB.mmtf.gz', 'rb').read()
+        structure = MmtfStructure(msgpack.loads(data, raw=False))
+        lazy = MmtfStructure(data)
+
+        self.assertEqual(structure.resolution, lazy.resolution)
+        self.assertEqual(structure.num_atoms, lazy.num_atoms)
+        # indices are only calculated on demand
+        self.assertIsNone(lazy._groupToAtomIndices)
+        np.testing.assert_array_equal(structure.chainToAtomIndices, lazy.chainToAtomIndices)
+        np.testing.assert_array_equal(structure.entityChainIndex, lazy.entityChainIndex)
+        np.testing.assert_allclose(structure.x_coord_list, lazy.x_coord_list)
+        self.assertListEqual(structure.atom_names.tolist(), lazy.atom_names.tolist())
+        self.assertListEqual(structure.chain_ids.tolist(), lazy.chain_ids.tolist())
+
+    def test_1J6T_lazy_first_model(self):
+        path = FILE_DIR + '1J6T.mmtf.gz'
+        structure = mmtfReader._call_mmtf(path, mmtfReader._StructureDecoder(first_model=True))[1]
+        lazy = mmtfReader._call_mmtf(path, mmtfReader._StructureDecoder(first_model=True, lazy=True))[1]
+
+        self.assertEqual(structure.num_atoms, lazy.num_atoms)
+        self.assertEqual(structure.num_groups, lazy.num_groups)
+        self.assertEqual(structure.num_chains, lazy.num_chains)
+        np.testing.assert_allclose(structure.z_coord_list, lazy.z_coord_list)
+
+    def test_read_lazy(self):
+        pdb = mmtfReader.read_mmtf_files(FILE_DIR, lazy=True)
+        pdb = pdb.filter(lambda t: t[1].resolution is not None and t[1].resolution < 2.0)
+        self.assertListEqual(['4HHB'], pdb.keys().collect())
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,11 +8,12 @@ __status__ = "Warning"
 '''
 
 import os
+import pickle
 import unittest
 import numpy as np
 from pyspark.sql import SparkSession
 from mmtfPyspark.io import mmtfReader
-from mmtfPyspark.utils import MmtfSubstructure
+from mmtfPyspark.utils import MmtfSubstructure, mmtfStructure
 
 FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
 
@@ -194,6 +195,193 @@ class TestMmtfStructure(unittest.TestCase):
         df = structure.to_pandas(add_cols=['sequence_position', 'chem_comp_type'])
         self.assertEqual((4779, 15), df.shape)
 
+    def test_1J6T_indices(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        for first_model in [False, True]:
+            pdb = mmtfReader.read_mmtf_files(path, first_model=first_model)
+            structure = pdb.filter(lambda t: t[0] == '1J6T').values().first()
+
+            num_models = 1 if first_model else 3
+            group_atoms, chain_atoms, chain_groups = [], [], []
+            model_atoms, model_groups, model_chains = [], [], []
+            chain, group, atom = 0, 0, 0
+            for m in range(num_models):
+                model_atoms.append(atom)
+                model_groups.append(group)
+                model_chains.append(chain)
+                for _ in range(structure.chains_per_model[m]):
+                    chain_atoms.append(atom)
+                    chain_groups.append(group)
+                    for _ in range(structure.groups_per_chain[chain]):
+                        group_atoms.append(atom)
+                        group_type = structure.group_type_list[group]
+                        atom += len(structure.group_list[group_type]['elementList'])
+                        group += 1
+                    chain += 1
+
+            self.assertEqual(atom, structure.num_atoms)
+            self.assertEqual(group, structure.num_groups)
+            self.assertEqual(chain, structure.num_chains)
+            self.assertEqual(group, len(structure.group_type_list))
+            self.assertListEqual(group_atoms + [atom], structure.groupToAtomIndices.tolist())
+            self.assertListEqual(chain_atoms + [atom], structure.chainToAtomIndices.tolist())
+            self.assertListEqual(chain_groups + [group], structure.chainToGroupIndices.tolist())
+            self.assertListEqual(model_atoms + [atom], structure.modelToAtomIndices.tolist())
+            self.assertListEqual(model_groups + [group], structure.modelToGroupIndices.tolist())
+            self.assertListEqual(model_chains + [chain], structure.modelToChainIndices.tolist())
+
+    def test_4HHB_encoded(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path)
+        structure = pdb.filter(lambda t: t[0] == '4HHB').values().first()
+
+        codes, vocabulary = structure.get_encoded('group_name')
+        self.assertEqual(4779, len(codes))
+        self.assertEqual(22, len(vocabulary))
+        self.assertListEqual(['VAL', 'VAL', 'VAL'], vocabulary[codes[0:3]].tolist())
+
+        codes, vocabulary = structure.get_encoded('atom_name')
+        self.assertListEqual(['N', 'CA', 'C'], vocabulary[codes[0:3]].tolist())
+
+        mask = structure.atom_mask('group_name', ['HOH'])
+        self.assertEqual(221, np.count_nonzero(mask))
+        self.assertTrue(np.all(structure.group_names[mask] == 'HOH'))
+
+        df = structure.to_pandas(use_categories=True)
+        self.assertEqual((4779, 13), df.shape)
+        self.assertEqual('category', df['atom_name'].dtype.name)
+        self.assertListEqual(structure.group_numbers.tolist(), df['group_number'].astype(str).tolist())
+
+        with self.assertRaises(ValueError):
+            structure.get_encoded('x')
+
+    def test_4HHB_atom_col_dtypes(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path)
+        structure = pdb.filter(lambda t: t[0] == '4HHB').values().first()
+
+        self.assertListEqual([*structure.atom_cols], [*structure.atom_col_dtypes])
+        for col, name in structure.atom_cols.items():
+            self.assertEqual(np.dtype(structure.atom_col_dtypes[col]).kind, getattr(structure, name).dtype.kind, col)
+            self.assertEqual(np.dtype(structure.atom_col_dtypes[col]).type, getattr(structure, name).dtype.type, col)
+
+    def test_1J6T_coords(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path, first_model=True)
+        structure = pdb.filter(lambda t: t[0] == '1J6T').values().first()
+
+        coords = structure.coords
+        self.assertEqual((3555, 3), coords.shape)
+        self.assertEqual(np.float32, coords.dtype)
+        self.assertTrue(coords.flags['C_CONTIGUOUS'])
+        self.assertIs(coords, structure.coords)
+        self.assertTrue(np.shares_memory(coords, structure.x_coord_list))
+
+        x = structure.decoder.decode_array(structure.input_data['xCoordList'])
+        np.testing.assert_array_equal(x[:3555], structure.x_coord_list)
+
+        chain = structure.get_chain('A')
+        np.testing.assert_array_equal(coords[chain.start:chain.end], chain.coords)
+        np.testing.assert_array_equal(coords[:, 2][chain.start:chain.end], chain.z_coord_list)
+
+        substructure = MmtfSubstructure(structure, 'A', chain_names=['A'])
+        np.testing.assert_array_equal(coords[substructure.mask], substructure.coords)
+        np.testing.assert_array_equal(structure.y_coord_list[substructure.mask], substructure.y_coord_list)
+
+    def test_1J6T_first_model_lists(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        structures = mmtfReader.read_mmtf_files(path, first_model=False)
+        full = structures.filter(lambda t: t[0] == '1J6T').values().first()
+        structures = mmtfReader.read_mmtf_files(path, first_model=True)
+        structure = structures.filter(lambda t: t[0] == '1J6T').values().first()
+
+        np.testing.assert_array_equal(full.b_factor_list[:3555], structure.b_factor_list)
+        np.testing.assert_array_equal(full.alt_loc_list[:3555], structure.alt_loc_list)
+        np.testing.assert_array_equal(full.sequence_index_list[:229], structure.sequence_index_list)
+        np.testing.assert_array_equal(full.chain_name_list[:2], structure.chain_name_list)
+
+        # bonds between atoms of the first model
+        bond_atoms = full.bond_atom_list.reshape(-1, 2)
+        mask = np.all(bond_atoms < 3555, axis=1)
+        np.testing.assert_array_equal(bond_atoms[mask].ravel(), structure.bond_atom_list)
+        np.testing.assert_array_equal(full.bond_order_list[mask], structure.bond_order_list)
+
+        # entities restricted to the chains of the first model
+        self.assertListEqual([[0], [1]], [e['chainIndexList'] for e in structure.entity_list])
+        self.assertListEqual([0, 1], structure.entityChainIndex.tolist())
+        self.assertListEqual([[0, 2, 5], [1, 3, 6]], [e['chainIndexList'] for e in full.entity_list])
+
+    def test_4HHB_groups(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path)
+        structure = pdb.filter(lambda t: t[0] == '4HHB').values().first()
+        df = structure.to_group_pandas()
+        self.assertEqual(801, df.shape[0])
+        self.assertEqual(['A', 'VAL', '1', 0, 0, 7], [df.chain_name[0], df.group_name[0], df.group_number[0],
+                                                     df.chain_index[0], df.sequence_position[0], df.atom_end[0]])
+        self.assertEqual(574, df.ca_x.count())
+        self.assertEqual(0, df.p_x.count())
+
+        # group values agree with the per-atom values
+        atoms = structure.to_pandas(add_cols=['group_serial', 'entity_index', 'sequence_position'])
+        first = atoms.groupby('group_serial').first()
+        for col in ['chain_name', 'chain_id', 'group_number', 'group_name', 'entity_index', 'sequence_position']:
+            np.testing.assert_array_equal(first[col].values, df[col].values)
+        np.testing.assert_allclose(atoms.groupby('group_serial')[['x', 'y', 'z']].mean().values,
+                                   structure.get_group_coords(), atol=0.001)
+
+        # in 4HHB, only amino acids have atoms named CA
+        ca = structure.get_group_coords('CA')
+        np.testing.assert_array_equal(ca[:, 0], df.ca_x)
+
+    def test_4HHB_pickle(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path)
+        structure = pdb.filter(lambda t: t[0] == '4HHB').values().first()
+        df = structure.to_pandas()
+
+        mode = mmtfStructure.get_pickle_mode()
+        try:
+            for pickle_mode in mmtfStructure.PICKLE_MODES:
+                mmtfStructure.set_pickle_mode(pickle_mode)
+                data = pickle.dumps(structure)
+                self.assertLess(len(data), 200000)
+
+                copy = pickle.loads(data)
+                self.assertIsNone(copy.df)
+                self.assertTrue(df.equals(copy.to_pandas()))
+                np.testing.assert_array_equal(structure.bond_atom_list, copy.bond_atom_list)
+                self.assertTrue(np.shares_memory(copy.coords, copy.z_coord_list))
+
+                chain = pickle.loads(pickle.dumps(structure.get_chain('B')))
+                self.assertEqual('4HHB.B', chain.structure_id)
+                np.testing.assert_array_equal(structure.get_chain('B').coords, chain.coords)
+
+                model = pickle.loads(pickle.dumps(structure.get_model(0)))
+                self.assertEqual(4779, model.num_atoms)
+
+                substructure = MmtfSubstructure(structure, 'A', chain_names=['A'], entity_types=['polymer'])
+                copy = pickle.loads(pickle.dumps(substructure))
+                self.assertEqual(substructure.num_atoms, copy.num_atoms)
+                np.testing.assert_array_equal(substructure.coords, copy.coords)
+
+            # structures unpickled from decoded arrays are pickled again in other modes,
+            # e.g. when the driver and the executors use different modes
+            mmtfStructure.set_pickle_mode('arrays')
+            copy = pickle.loads(pickle.dumps(structure))
+            for pickle_mode in mmtfStructure.PICKLE_MODES:
+                mmtfStructure.set_pickle_mode(pickle_mode)
+                copy = pickle.loads(pickle.dumps(copy))
+                self.assertEqual(4779, copy.num_atoms)
+                np.testing.assert_array_equal(structure.coords, copy.coords)
+                np.testing.assert_array_equal(structure.b_factor_list, copy.b_factor_list)
+                self.assertTrue(df.equals(copy.to_pandas()))
+        finally:
+            mmtfStructure.set_pickle_mode(mode)
+
+        with self.assertRaises(ValueError):
+            mmtfStructure.set_pickle_mode('json')
+
     def tearDown(self):
         self.spark.stop()
 
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+from pyspark.sql import SparkSession
+from mmtfPyspark.io import mmtfReader
+from mmtfPyspark.utils import structurePartitioner
+
+FIXTURE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class StructurePartitionerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.spark = SparkSession.builder.master("local[*]") \
+                                 .appName("StructurePartitionerTest") \
+                                 .getOrCreate()
+
+    def test_balance_partitions(self):
+        # the expensive item is isolated, the other items are balanced
+        costs = [100, 5, 4, 3, 3, 2, 1]
+        assignment = structurePartitioner.balance_partitions(costs, 3)
+        self.assertEqual([0], [i for i, p in enumerate(assignment) if p == assignment[0]])
+        loads = [sum(c for c, p in zip(costs, assignment) if p == index) for index in range(3)]
+        self.assertEqual([100, 9, 9], loads)
+
+        # more expensive items than partitions
+        assignment = structurePartitioner.balance_partitions([10, 10, 10, 1], 2)
+        self.assertEqual(2, len(set(assignment)))
+
+        self.assertEqual([], structurePartitioner.balance_partitions([], 4))
+
+    def test_repartition_by_cost(self):
+        path = FIXTURE_DIR + '/../../../resources/files/'
+        pdb = mmtfReader.read_mmtf_files(path, lazy=True)
+        costs = dict(pdb.mapValues(structurePartitioner.estimate_cost).collect())
+
+        # 4HHB: bioassembly 1 contains the 14 chains of the asymmetric unit
+        self.assertEqual(4779 + 14 * structurePartitioner.CHAIN_COST, costs['4HHB'])
+
+        partitioned = structurePartitioner.repartition_by_cost(pdb, 3)
+        self.assertEqual(3, partitioned.getNumPartitions())
+        partitions = partitioned.keys().glom().collect()
+        self.assertEqual(sorted(costs), sorted(k for keys in partitions for k in keys))
+
+        # the most expensive structure (1J6T) is placed in its own partition
+        largest = max(costs, key=costs.get)
+        self.assertIn([largest], partitions)
+
+    def test_limit_structures_per_batch(self):
+        key = 'spark.sql.execution.arrow.maxRecordsPerBatch'
+        try:
+            self.spark.conf.set(key, '10000')
+            structurePartitioner.limit_structures_per_batch(self.spark)
+            self.assertEqual(structurePartitioner.STRUCTURES_PER_BATCH, int(self.spark.conf.get(key)))
+
+            # smaller batches are kept, unlimited batches are limited
+            structurePartitioner.limit_structures_per_batch(self.spark, 64)
+            self.assertEqual(structurePartitioner.STRUCTURES_PER_BATCH, int(self.spark.conf.get(key)))
+            self.spark.conf.set(key, '-1')
+            structurePartitioner.limit_structures_per_batch(self.spark, 64)
+            self.assertEqual(64, int(self.spark.conf.get(key)))
+        finally:
+            self.spark.conf.unset(key)
+
+    def tearDown(self):
+        self.spark.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
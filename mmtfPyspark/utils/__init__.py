@@ -1,12 +1,37 @@
-from .columnarStructure import ColumnarStructure
-from .columnarStructureX import ColumnarStructureX
-from .codec import Codec
-from .mmtfChain import MmtfChain
-from .mmtfSubstructure import MmtfSubstructure
-from .mmtfModel import MmtfModel
-from .mmtfStructure import MmtfStructure
-from .dsspSecondaryStructure import DsspSecondaryStructure
-from .distanceBox import DistanceBox
-from .structureToAllInteractions import StructureToAllInteractions
-from .mmtfCodec import encode_array, decode_array
+import importlib
 
+# public names and the modules that define them. The modules are imported on
+# first access, e.g., reading a structure does not import sympy or pyspark.
+_exports = {'ColumnarStructure': 'columnarStructure',
+            'ColumnarStructureX': 'columnarStructureX',
+            'Codec': 'codec',
+            'MmtfChain': 'mmtfChain',
+            'MmtfSubstructure': 'mmtfSubstructure',
+            'MmtfModel': 'mmtfModel',
+            'MmtfBuffer': 'mmtfBuffer',
+            'MmtfStructure': 'mmtfStructure',
+            'MmtfHeader': 'mmtfHeader',
+            'DsspSecondaryStructure': 'dsspSecondaryStructure',
+            'DistanceBox': 'distanceBox',
+            'CellList': 'cellList',
+            'StructureToAllInteractions': 'structureToAllInteractions',
+            'encode_array': 'mmtfCodec',
+            'decode_array': 'mmtfCodec',
+            'decode_arrays': 'mmtfCodec',
+            'repartition_by_cost': 'structurePartitioner',
+            'limit_structures_per_batch': 'structurePartitioner'}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
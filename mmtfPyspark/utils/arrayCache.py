@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+'''arrayCache.py
+
+Per-process cache of decoded arrays with a byte budget and least recently
+used (LRU) eviction.
+
+Structures keep their decoded arrays (coordinates, atom names, dataframes,
+...) in this cache instead of their own attributes. When the cached arrays
+of all structures in a Python worker exceed the budget, the least recently
+used arrays are evicted and decoded again from the encoded MMTF data on the
+next access. This bounds the memory of cached RDDs of structures, e.g.,
+after rdd.persist().
+
+The budget (in bytes) is set with :func:`set_cache_size` or with the
+environment variable MMTF_CACHE_BYTES, which is also read by Spark executors,
+e.g., spark.executorEnv.MMTF_CACHE_BYTES=2000000000. By default, the cache
+is unbounded.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+
+class ArrayCache(object):
+    '''LRU cache of arrays, keyed by owner id and name
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+       maximum number of bytes of the cached values, None: no limit
+    '''
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._owners = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, owner, name):
+        '''Returns a cached value and marks it as recently used, or None if it is not cached'''
+        key = (owner, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, owner, name, value):
+        '''Caches a value and evicts the least recently used values if the cache
+        exceeds its budget. The new value is kept even if it exceeds the budget
+        by itself, so that it can be used until the next value is cached.'''
+        key = (owner, name)
+        size = get_nbytes(value)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size)
+            self._owners.setdefault(owner, set()).add(name)
+            self.nbytes += size
+            self._evict()
+
+    def discard(self, owner, name):
+        '''Removes a value from the cache'''
+        with self._lock:
+            self._remove((owner, name))
+
+    def discard_owner(self, owner):
+        '''Removes all values of an owner from the cache'''
+        with self._lock:
+            for name in list(self._owners.get(owner, ())):
+                self._remove((owner, name))
+
+    def clear(self):
+        '''Removes all values from the cache'''
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self.nbytes = 0
+
+    def resize(self, max_bytes):
+        '''Sets the budget and evicts values that exceed it'''
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def owner_nbytes(self, owner):
+        '''Returns a dictionary of name -> number of bytes of the cached values of an owner'''
+        with self._lock:
+            return {name: self._entries[(owner, name)][1] for name in self._owners.get(owner, ())}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+            names = self._owners[key[0]]
+            names.discard(key[1])
+            if len(names) == 0:
+                del self._owners[key[0]]
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+
+class CachedAttribute(object):
+    '''Attribute of a structure whose value is kept in the array cache. It
+    reads as None after the value has been evicted, so that the property
+    using it decodes the value again.
+
+    Instances that were not registered with :func:`register` (e.g. structures
+    unpickled with decoded arrays only) keep the value in their own __dict__.
+    '''
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return get_cached(instance, self.name)
+
+    def __set__(self, instance, value):
+        set_cached(instance, self.name, value)
+
+
+_cache = ArrayCache(int(os.environ['MMTF_CACHE_BYTES']) if os.environ.get('MMTF_CACHE_BYTES') else None)
+_owner_ids = itertools.count()
+
+
+def get_cache():
+    '''Returns the array cache of this Python process
+
+    Returns
+    -------
+    ArrayCache
+       array cache
+    '''
+    return _cache
+
+
+def set_cache_size(max_bytes):
+    '''Sets the budget of the array cache of this Python process
+
+    Parameters
+    ----------
+    max_bytes : int
+       maximum number of bytes of the cached arrays, None: no limit
+    '''
+    _cache.resize(max_bytes)
+
+
+def register(instance):
+    '''Assigns a cache owner id to an instance. Its cached values are removed
+    when the instance is garbage collected.
+
+    Parameters
+    ----------
+    instance : object
+       owner of cached values, e.g., a structure
+    '''
+    owner = next(_owner_ids)
+    instance.__dict__['_cache_id'] = owner
+    weakref.finalize(instance, _cache.discard_owner, owner)
+
+
+def get_cached(instance, name):
+    '''Returns a cached value of an instance, or None if it is not cached'''
+    owner = instance.__dict__.get('_cache_id')
+    if owner is None:
+        return instance.__dict__.get(name)
+    return _cache.get(owner, name)
+
+
+def set_cached(instance, name, value):
+    '''Caches a value of an instance, None removes the value'''
+    owner = instance.__dict__.get('_cache_id')
+    if owner is None:
+        instance.__dict__[name] = value
+    elif value is None:
+        _cache.discard(owner, name)
+    else:
+        _cache.put(owner, name, value)
+
+
+def get_nbytes(value):
+    '''Returns the (shallow) number of bytes of an array, a dataframe, or a tuple of arrays'''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    elif isinstance(value, (tuple, list)):
+        return sum(get_nbytes(v) for v in value)
+    elif hasattr(value, 'memory_usage'):
+        # pandas DataFrame, memory_usage() is slow for small dataframes
+        return int(sum(getattr(column, 'nbytes', 0) for _, column in value.items()))
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return 0
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+'''cellList.py
+
+Vectorized neighbor search of points in 3D on a uniform grid (cell list).
+
+The points are binned into cubic cells, and a neighbor query returns the
+points in the 27 cells around the cell of a query point. All queries are
+batched: they take an array of query points and return the neighbors of
+all points in compressed sparse row (CSR) format.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import numpy as np
+
+# cell indices (i, j, k) are packed into a single integer key, 21 bits per index
+KEY_BITS = 21
+KEY_OFFSET = 1 << (KEY_BITS - 1)
+
+# offsets of the 27 neighboring cells, starting with the cell itself
+_OFFSETS = [(0, 0, 0)] + [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)
+                          if (i, j, k) != (0, 0, 0)]
+OFFSET_KEYS = np.array([i + (j << KEY_BITS) + (k << 2 * KEY_BITS) for i, j, k in _OFFSETS], dtype=np.int64)
+
+
+class CellList(object):
+    '''Cell list for fast neighbor searches of points in 3D. The points are
+    binned into cubic cells of width cell_width, centered at integer multiples
+    of cell_width. A neighbor query returns all points in the 27 cells around
+    the query point, which includes all points within cell_width of the query
+    point.
+
+    Parameters
+    ----------
+    coords : ndarray
+       n x 3 array of point coordinates
+    cell_width : float
+       cell width, usually the distance cutoff
+
+    Examples
+    --------
+    Find all pairs of atoms within 4 A
+
+    >>> cells = CellList(structure.coords, 4.0)
+    >>> query_indices, indices, distances = cells.get_pairs(structure.coords, 4.0)
+    '''
+
+    def __init__(self, coords, cell_width):
+        self.coords = np.asarray(coords).reshape(-1, 3)
+        self.cell_width = cell_width
+        self.inverse_cell_width = 1.0 / cell_width
+
+        # sort the points by cell, the points within a cell remain in the input order
+        keys = self.get_keys(self.coords)
+        self._order = np.argsort(keys, kind='stable')
+        self._cell_keys, self._cell_starts, self._cell_counts = np.unique(keys[self._order], return_index=True,
+                                                                          return_counts=True)
+
+    def __len__(self):
+        return self.coords.shape[0]
+
+    def get_keys(self, points):
+        '''Returns the keys of the cells that contain the points
+
+        Parameters
+        ----------
+        points : ndarray
+           n x 3 array of point coordinates
+
+        Returns
+        -------
+        ndarray
+           cell keys
+        '''
+        cells = np.rint(np.asarray(points, dtype=np.float64).reshape(-1, 3) * self.inverse_cell_width)
+        cells = cells.astype(np.int64) + KEY_OFFSET
+        return cells[:, 0] + (cells[:, 1] << KEY_BITS) + (cells[:, 2] << 2 * KEY_BITS)
+
+    def get_cell_points(self):
+        '''Returns the keys of the occupied cells and the indices of the points
+        in each cell in CSR format
+
+        Returns
+        -------
+        tuple
+           cell keys, index pointers (len(keys) + 1), point indices
+        '''
+        indptr = np.append(self._cell_starts, len(self._order))
+        return self._cell_keys, indptr, self._order
+
+    def get_neighbors(self, points):
+        '''Returns the points in the 27 cells around each query point
+
+        Parameters
+        ----------
+        points : ndarray
+           m x 3 array of query point coordinates
+
+        Returns
+        -------
+        tuple
+           index pointers (m + 1) and point indices in CSR format: the
+           neighbors of query point i are indices[indptr[i]:indptr[i+1]]
+        '''
+        neighbor_keys = self.get_keys(points)[:, np.newaxis] + OFFSET_KEYS
+        if len(self) == 0:
+            return np.zeros(neighbor_keys.shape[0] + 1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        positions, found = self._find(neighbor_keys)
+        starts = np.where(found, self._cell_starts[positions], 0)
+        counts = np.where(found, self._cell_counts[positions], 0)
+
+        indptr = np.zeros(neighbor_keys.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts.sum(axis=1), out=indptr[1:])
+        return indptr, self._order[_ranges(starts.ravel(), counts.ravel())]
+
+    def get_pairs(self, points, distance_cutoff):
+        '''Returns all pairs of query points and points within the distance cutoff
+
+        Parameters
+        ----------
+        points : ndarray
+           m x 3 array of query point coordinates
+        distance_cutoff : float
+           distance cutoff, must not exceed the cell width
+
+        Returns
+        -------
+        tuple
+           query point indices, point indices, and distances of the pairs,
+           ordered by query point
+        '''
+        points = np.asarray(points).reshape(-1, 3)
+        indptr, indices = self.get_neighbors(points)
+        query_indices = np.repeat(np.arange(points.shape[0]), np.diff(indptr))
+
+        distances = np.sum((points[query_indices] - self.coords[indices]) ** 2, axis=1)
+        mask = distances <= distance_cutoff * distance_cutoff
+
+        return query_indices[mask], indices[mask], np.sqrt(distances[mask])
+
+    def get_intersection(self, other):
+        '''Returns the points in the cells around the cells that are adjacent
+        to the occupied cells of another cell list
+
+        Parameters
+        ----------
+        other : CellList
+           cell list with the same cell width
+
+        Returns
+        -------
+        ndarray
+           point indices, ordered by the cells in the order of their first point
+        '''
+        if len(self) == 0 or len(other) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # occupied cells in the order of their first point
+        cell_keys = self._cell_keys[np.argsort(self._order[self._cell_starts], kind='stable')]
+
+        # cells with an adjacent cell in the other cell list
+        neighbor_keys = cell_keys[:, np.newaxis] + OFFSET_KEYS
+        overlap = other._find(neighbor_keys)[1].any(axis=1)
+
+        # the cells around these cells, in the order they are visited
+        keys = neighbor_keys[overlap].ravel()
+        _, first = np.unique(keys, return_index=True)
+        positions, found = self._find(keys[np.sort(first)])
+        positions = positions[found]
+
+        return self._order[_ranges(self._cell_starts[positions], self._cell_counts[positions])]
+
+    def _find(self, keys):
+        '''Returns the positions of the cell keys and a mask of the keys that exist'''
+        positions = np.minimum(np.searchsorted(self._cell_keys, keys), len(self._cell_keys) - 1)
+        return positions, self._cell_keys[positions] == keys
+
+
+def _ranges(starts, counts):
+    '''Returns the concatenated ranges [start, start + count)'''
+    ends = np.cumsum(counts)
+    return np.repeat(starts - ends + counts, counts) + np.arange(ends[-1] if len(ends) > 0 else 0)
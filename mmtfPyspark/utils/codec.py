@@ -1,13 +1,228 @@
 #!/usr/bin/env python
 # coding: utf-8
+'''codec.py
 
-import msgpack
+Decodes and encodes MMTF binary arrays, see https://github.com/rcsb/mmtf/blob/master/spec.md#codecs.
+
+The run-length, delta, and recursive index codecs are implemented by two
+interchangeable backends:
+
+* "numpy": vectorized NumPy code (np.repeat, np.cumsum), no compilation
+  step. This is the default, since short-lived Python workers would otherwise
+  pay the JIT compilation cost for each task.
+* "numba": compiled loops, see :mod:`mmtfPyspark.utils.codecNumba`. Numba is
+  only imported when this backend is selected.
+
+The backend is selected with :func:`set_backend` or with the environment
+variable MMTF_CODEC_BACKEND, which is also read by Spark executors, e.g.,
+spark.executorEnv.MMTF_CODEC_BACKEND=numba.
+
+'''
+
+import os
 import struct
 import numpy as np
-from numba import njit, jit, float32, int32, int16
+
+# fill values of the recursive index encoding (int16)
+MAX_INT16 = 32767
+MIN_INT16 = -32768
+
+NULL_BYTE = '\x00'
+nb = NULL_BYTE.encode('ascii')
+CHAIN_LEN = 4
+
+# maximum number of decoded elements of small arrays that are decoded in a single call
+BATCH_SIZE = 1 << 18
+
+# data type of the encoded array for each codec
+ENCODED_TYPES = {2: '>i1', 4: '>i4', 5: 'S4', 6: '>i4', 8: '>i4', 9: '>i4', 10: '>i2'}
+
+
+class NumpyBackend(object):
+    '''Vectorized NumPy implementation of the MMTF codecs. The input arrays
+    of the decoders are native-endian integer arrays.
+    '''
+    name = 'numpy'
+
+    @staticmethod
+    def run_length_decode(x, n):
+        '''Decodes a run-length encoded int32 array (value, repeat pairs) of n elements'''
+        return _repeat(x[0::2].astype(np.int32), x[1::2], n)
+
+    @staticmethod
+    def run_length_delta_decode(x, n):
+        '''Decodes a run-length and delta encoded int32 array of n elements'''
+        y = _repeat(x[0::2].astype(np.int32), x[1::2], n)
+        return np.cumsum(y, out=y)
+
+    @staticmethod
+    def run_length_div_decode(x, n, divisor):
+        '''Decodes a run-length encoded array and divides the values by divisor'''
+        return _repeat((x[0::2] / divisor).astype(np.float32), x[1::2], n)
+
+    @staticmethod
+    def run_length_decode_ascii(x, n):
+        '''Decodes a run-length encoded array of character codes'''
+        return _repeat(x[0::2].astype(np.uint32).view('U1'), x[1::2], n)
+
+    @staticmethod
+    def ri_decode(x, n, divisor):
+        '''Decodes a recursive index and delta encoded int16 array of n elements and
+        divides the values by divisor'''
+        y = np.cumsum(x, dtype=np.int32)
+        if n < x.shape[0]:
+            y = y[(x != MAX_INT16) & (x != MIN_INT16)]
+        return np.divide(y, divisor, dtype=np.float32)
+
+    @staticmethod
+    def ri_decode_into(x, n, divisor, out):
+        '''Decodes a recursive index and delta encoded int16 array of n elements into
+        an existing float32 array. The decoded values are truncated to the length of
+        the output array.'''
+        y = np.cumsum(x, dtype=np.int32)
+        if n < x.shape[0]:
+            y = y[(x != MAX_INT16) & (x != MIN_INT16)]
+        np.divide(y[:out.shape[0]], divisor, out=out, dtype=np.float32)
+        return out
+
+    @staticmethod
+    def run_length_encode(x):
+        '''Run-length encodes an integer array as (value, repeat) pairs'''
+        x = np.asarray(x)
+        if x.shape[0] == 0:
+            return np.empty(0, dtype=np.int32)
+
+        starts = np.flatnonzero(x[1:] != x[:-1]) + 1
+        y = np.empty(2 * starts.shape[0] + 2, dtype=np.int32)
+        y[0] = x[0]
+        y[2::2] = x[starts]
+        y[1:-1:2] = np.diff(starts, prepend=0)
+        y[-1] = x.shape[0] - (starts[-1] if starts.shape[0] > 0 else 0)
+        return y
+
+    @staticmethod
+    def delta(x):
+        '''Delta encodes an integer array'''
+        x = np.asarray(x)
+        y = np.empty(x.shape[0], dtype=np.int32)
+        if x.shape[0] > 0:
+            y[0] = x[0]
+            np.subtract(x[1:], x[:-1], out=y[1:], casting='unsafe')
+        return y
+
+    @staticmethod
+    def f2id(x, multiplier):
+        '''Converts floats to integers (multiplied by multiplier) and delta encodes them'''
+        y = np.multiply(x, multiplier, dtype=np.float64)
+        return NumpyBackend.delta(np.rint(y, out=y))
+
+    @staticmethod
+    def ri_encode(x, maximum=MAX_INT16, minimum=MIN_INT16):
+        '''Recursive index encodes an integer array into an int16 array'''
+        x = np.asarray(x)
+        large = np.flatnonzero((x >= maximum) | (x <= minimum))
+        if large.shape[0] == 0:
+            return x.astype(np.int16)
+
+        # large values are stored as a sequence of fill values (maximum or minimum)
+        # followed by the remainder
+        values = x[large].astype(np.int64)
+        fill = np.where(values >= 0, maximum, minimum)
+        counts = values // fill
+        extra = np.zeros(x.shape[0], dtype=np.int64)
+        extra[large] = counts
+        ends = np.arange(x.shape[0]) + np.cumsum(extra)
+
+        y = np.empty(x.shape[0] + counts.sum(), dtype=np.int16)
+        y[ends] = x
+        y[ends[large]] = values - counts * fill
+        offsets = np.cumsum(counts) - counts
+        y[np.arange(counts.sum()) + np.repeat(ends[large] - counts - offsets, counts)] = np.repeat(fill, counts)
+        return y
+
+    @staticmethod
+    def run_length_div_encode(x, divisor):
+        '''Multiplies a float array by divisor and run-length encodes the integer values'''
+        return NumpyBackend.run_length_encode(np.rint(np.multiply(x, divisor, dtype=np.float64)).astype(np.int32))
+
+    @staticmethod
+    def run_length_encode_ascii(x):
+        '''Run-length encodes an array of single characters as character codes'''
+        return NumpyBackend.run_length_encode(_char_codes(x))
+
+
+_backends = {'numpy': NumpyBackend}
+_backend = None
+
+
+def get_backend(name=None):
+    '''Returns a codec backend
+
+    Parameters
+    ----------
+    name : str, optional
+       name of the backend ("numpy" or "numba"), default: the selected backend
+
+    Returns
+    -------
+    backend
+       class with the static codec methods of the backend
+
+    Raises
+    ------
+    ValueError
+       unknown backend or Numba is not installed
+    '''
+    if name is None:
+        if _backend is None:
+            set_backend(os.environ.get('MMTF_CODEC_BACKEND', 'numpy'))
+        return _backend
+
+    if name == 'numba' and name not in _backends:
+        try:
+            from mmtfPyspark.utils.codecNumba import NumbaBackend
+        except ImportError:
+            raise ValueError("The numba codec backend requires the numba package")
+        _backends[name] = NumbaBackend
+
+    if name not in _backends:
+        raise ValueError("Unknown codec backend: " + str(name))
+
+    return _backends[name]
+
+
+def set_backend(name):
+    '''Selects the codec backend used in this Python process
+
+    Parameters
+    ----------
+    name : str
+       name of the backend ("numpy" or "numba")
+
+    Raises
+    ------
+    ValueError
+       unknown backend or Numba is not installed
+    '''
+    global _backend
+    _backend = get_backend(name)
 
 
 class Codec(object):
+    '''Decodes and encodes MMTF binary arrays
+
+    Parameters
+    ----------
+    backend : str, optional
+       name of the backend ("numpy" or "numba"), default: the backend selected
+       with :func:`set_backend` at the time of the call
+    '''
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def _get_backend(self):
+        return get_backend(self.backend)
 
     @staticmethod
     def get_value(input_data, field_name, required=False):
@@ -26,16 +241,110 @@ class Codec(object):
         else:
             return None
 
-    def decode_array(self, input_array):
+    def decode_array(self, input_array, limit=None):
         """Parse the header of an input byte array and then decode using the input array,
     the codec and the appropirate parameter.
     :param input_array: the array to be decoded
+    :param limit: maximum number of decoded elements, e.g., the number of atoms of the
+    first model. Only the part of the encoded array that is needed is decoded.
     :return the decoded array"""
 
         codec, length, param, in_array = self.parse_header(input_array)
+        if limit is not None and limit < length:
+            in_array, length = truncate_encoded(codec, in_array, limit), limit
         decode_func = getattr(self, "decode" + str(codec))
         return decode_func(in_array, length, param)
 
+    def decode_array_into(self, input_array, out):
+        """Decode an input byte array into an existing output array, e.g., a column
+    of a 2D array. If the decoded array is longer than the output array, it is truncated.
+    :param input_array: the array to be decoded
+    :param out: the output array
+    :return the output array"""
+
+        codec, length, param, in_array = self.parse_header(input_array)
+        n = out.shape[0]
+        if n < length:
+            in_array, length = truncate_encoded(codec, in_array, n), n
+        if codec == 10:
+            # avoid an intermediate float array for the decoded values
+            self._get_backend().ri_decode_into(_int_array(in_array, codec), length, param, out)
+        else:
+            decode_func = getattr(self, "decode" + str(codec))
+            out[:] = decode_func(in_array, length, param)[:n]
+        return out
+
+    def decode_arrays(self, input_arrays):
+        """Decode a list of encoded arrays, e.g., the same field of many structures.
+    Small arrays with the same codec and parameter are concatenated (up to BATCH_SIZE
+    decoded elements) and decoded in a single call.
+    :param input_arrays: the arrays to be decoded
+    :return the list of decoded arrays"""
+
+        headers = [self.parse_header(input_array) for input_array in input_arrays]
+
+        # batches of small arrays with the same codec and parameter
+        batches = {}
+        batch_sizes = {}
+        for i, (codec, length, param, in_array) in enumerate(headers):
+            key = (codec, param)
+            if key not in batches or batch_sizes[key] + length > BATCH_SIZE:
+                batches.setdefault(key, []).append([])
+                batch_sizes[key] = 0
+            batches[key][-1].append(i)
+            batch_sizes[key] += length
+
+        decoded = [None] * len(headers)
+        for (codec, param), batch in batches.items():
+            for indices in batch:
+                if len(indices) == 1:
+                    decoded[indices[0]] = self.decode_array(input_arrays[indices[0]])
+                    continue
+
+                lengths = np.array([headers[i][1] for i in indices], dtype=np.int64)
+                in_arrays = [headers[i][3] for i in indices]
+                arrays = self._decode_concatenated(codec, param, in_arrays, lengths)
+                for i, array in zip(indices, arrays):
+                    decoded[i] = array
+
+        return decoded
+
+    def decode_field(self, input_data_list, field_name):
+        """Decode a field of many MMTF data structures in one call.
+    :param input_data_list: list of unpacked msgpack data (dictionaries)
+    :param field_name: the field to be decoded
+    :return the list of decoded arrays, None for structures without this field"""
+
+        present = [i for i, input_data in enumerate(input_data_list) if field_name in input_data]
+        arrays = self.decode_arrays([input_data_list[i][field_name] for i in present])
+
+        decoded = [None] * len(input_data_list)
+        for i, array in zip(present, arrays):
+            decoded[i] = array
+        return decoded
+
+    def _decode_concatenated(self, codec, param, in_arrays, lengths):
+        '''Decodes the concatenated encoded arrays with the same codec and parameter
+        and splits the result into the individual arrays'''
+        offsets = np.cumsum(lengths)[:-1]
+
+        if codec == 8:
+            x = self._get_backend().run_length_decode(_int_array(b''.join(in_arrays), 8), int(lengths.sum()))
+            _restart_cumsum(x, lengths)
+            return np.split(np.cumsum(x, out=x), offsets)
+
+        if codec == 10:
+            encoded = _int_array(b''.join(in_arrays), 10)
+            x = encoded.astype(np.int32)
+            _restart_cumsum(x, [len(in_array) // 2 for in_array in in_arrays])
+            y = np.cumsum(x, out=x)
+            if lengths.sum() < y.shape[0]:
+                y = y[(encoded != MAX_INT16) & (encoded != MIN_INT16)]
+            return np.split(np.divide(y, param, dtype=np.float32), offsets)
+
+        decode_func = getattr(self, "decode" + str(codec))
+        return np.split(decode_func(b''.join(in_arrays), int(lengths.sum()), param), offsets)
+
     @staticmethod
     def parse_header(input_array):
         """Parse the header and return it along with the input array minus the header.
@@ -52,13 +361,13 @@ class Codec(object):
         return np.frombuffer(in_array, '>i1')
 
     def encode2(self, in_array, param):
-        return in_array.astype(np.int8).tobytes()
+        return np.asarray(in_array).astype(np.int8).tobytes()
 
     def decode4(self, in_array, length, param):
-        return np.frombuffer(in_array, '>i4').byteswap().newbyteorder()
+        return _int_array(in_array, 4)
 
     def encode4(self, in_array, param):
-        return in_array.astype(np.int32).byteswap().newbyteorder().tobytes()
+        return np.asarray(in_array).astype('>i4').tobytes()
 
     def decode5(self, in_array, length, param):
         return np.frombuffer(in_array, 'S4').astype(str)
@@ -67,329 +376,114 @@ class Codec(object):
         return encode_chain_list(in_array)
 
     def decode6(self, in_array, length, param):
-        int_array = np.frombuffer(in_array, '>i4').byteswap().newbyteorder()
-        return run_length_decode_ascii(int_array, length)
+        return self._get_backend().run_length_decode_ascii(_int_array(in_array, 6), length)
 
     def encode6(self, in_array, param):
-        y = run_length_encode_ascii(in_array)
-        return y.byteswap().newbyteorder().tobytes()
+        y = self._get_backend().run_length_encode_ascii(in_array)
+        return y.astype('>i4').tobytes()
 
     def decode8(self, in_array, length, param):
-        int_array = np.frombuffer(in_array, '>i4').byteswap().newbyteorder()
-        return np.cumsum(run_length_decode(int_array, length))
-        #return run_length_decode_cumsum(int_array, length)
+        return self._get_backend().run_length_delta_decode(_int_array(in_array, 8), length)
 
     def encode8(self, in_array, param):
-        y = run_length_encode(delta(in_array))
-        return y.byteswap().newbyteorder().tobytes()
+        backend = self._get_backend()
+        y = backend.run_length_encode(backend.delta(in_array))
+        return y.astype('>i4').tobytes()
 
     def decode9(self, in_array, length, param):
-        int_array = np.frombuffer(in_array, '>i4').byteswap().newbyteorder()
-        return run_length_div_decode(int_array, length, param)
+        return self._get_backend().run_length_div_decode(_int_array(in_array, 9), length, param)
 
     def encode9(self, in_array, param):
-        y = run_length_div_encode(in_array, param)
-        return y.byteswap().newbyteorder().tobytes()
+        y = self._get_backend().run_length_div_encode(in_array, param)
+        return y.astype('>i4').tobytes()
 
     def decode10(self, in_array, length, param):
-        int_array = np.frombuffer(in_array, '>i2').byteswap().newbyteorder()
-        #return ri_decode(int_array, param).astype(np.float32)
-        return ri_decode(int_array, param)
-        #return reverse_index_decode(int_array, param)
+        return self._get_backend().ri_decode(_int_array(in_array, 10), length, param)
 
     def encode10(self, in_array, param):
-        y = ri_encode(f2id_numba(in_array, param))
-        return y.byteswap().newbyteorder().tobytes()
-
-
-@njit
-def f2id_numba(x, multiplier):
-    y = np.empty(x.shape[0], dtype=np.int32)
-    y[0] = round(x[0] * multiplier)
-
-    for i in range(1, x.shape[0]):
-        y[i] = round((x[i] - x[i - 1]) * multiplier)
-
-    return y
-
-
-@njit
-def ri_encode(int_array, max=32767, min=-32768):
-    """Pack an integer array using recursive indexing.
-    :param int_array: the input array of integers
-    :param max: the maximum integer size
-    :param min: the minimum integer size
-    :return the array of integers after recursive index encoding"""
-    # TODO check if any value exceeds min/max -> skip this step?
-    # TODO optimize speed, e.g. use mod to find #repeats
-    out_arr = np.empty(int_array.shape[0] * 2, dtype=np.int16)
-    i = 0
-    for curr in int_array:
-        if curr >= 0:
-            while curr >= max:
-                out_arr[i] = max
-                i += 1
-                curr -= max
-        else:
-            while curr <= min:
-                out_arr[i] = min
-                i += 1
-                curr -= min
-        out_arr[i] = curr
-        i += 1
-    return out_arr[:i]
-
-
-# @njit
-# def cum_sum(x):
-#     y = np.empty(x.shape[0], dtype=np.float32)
-#     y[0] = x[0]
-#     for i in range(1, x.shape[0]):
-#         y[i] = x[i - 1] + x[i]
-#
-#     return y
-
-# @njit
-# def reverse_index_decode(x, divisor):
-#     y = np.empty(x.shape[0], dtype=np.float32)
-#     y[0] = x[0]
-#     for i in range(1, x.shape[0]-1):
-#         y[i] = x[i - 1] + x[i]
-#
-#     y = y / divisor
-#     maximum = 32767
-#     minimum = -32768
-#     return y[(x != maximum) & (x != minimum)]
-
-#@jit(float32[:](int16[:], int32))
-def ri_decode(x, divisor):
-    """Unpack an array of integers using recursive indexing.
-
-    Parameters
-    ----------
-    x : list
-       the input array of integers
-    divisor : int
-       the number used for decoding [1000]
-
-    Returns
-    -------
-    numpy.array
-       return the numpy.array of integers after recursive index decoding
-    """
-    maximum = 32767
-    minimum = -32768
-    #y = np.cumsum(x) / divisor
-    y = np.cumsum(x, dtype=np.float32) / divisor
-    return y[(x != maximum) & (x != minimum)]
-
-
-# @jit(float32[:](int16[:]))
-# def numba_cumsum(x):
-#     return np.cumsum(x, dtype=np.float32)
-
-
-#@njit(float32[:](int32[:], int32, int32))
-def run_length_div_decode(x, n, divisor):
-    """Decodes a run length encoded array and scales/converts integer values to float
-
-    Parameters
-    ----------
-    x : encoded array of integers (value, repeat pairs)
-    n : number of element in decoded array
-    """
-    y = np.empty(n, dtype=np.float32)
+        backend = self._get_backend()
+        y = backend.ri_encode(backend.f2id(in_array, param))
+        return y.astype('>i2').tobytes()
+
+
+def _int_array(in_array, codec):
+    '''Returns the encoded big-endian integers as a native-endian array'''
+    dtype = np.dtype(ENCODED_TYPES[codec])
+    return np.frombuffer(in_array, dtype).astype(dtype.newbyteorder('='))
+
+
+def truncate_encoded(codec, in_array, limit):
+    """Returns the part of an encoded array (without header) that decodes to the
+    first limit elements. The run-length and recursive index encodings are decoded
+    sequentially, so the remaining runs and values can be skipped.
+    :param codec: the codec of the array
+    :param in_array: the encoded array
+    :param limit: the number of decoded elements
+    :return the truncated encoded array"""
+    dtype = np.dtype(ENCODED_TYPES[codec])
+    if codec in (6, 8, 9):
+        # (value, repeat) pairs: keep the runs up to limit and shorten the last run
+        x = np.frombuffer(in_array, dtype)
+        ends = np.cumsum(x[1::2])
+        last = int(np.searchsorted(ends, limit))
+        if last >= ends.shape[0]:
+            return in_array
+        x = x[:2 * last + 2].copy()
+        x[-1] -= ends[last] - limit
+        return x.tobytes()
+    elif codec == 10:
+        # each value is preceded by its fill values (MAX_INT16, MIN_INT16): grow the
+        # prefix until it contains limit values
+        x = np.frombuffer(in_array, dtype)
+        end = min(limit, x.shape[0])
+        while True:
+            prefix = x[:end]
+            fills = np.count_nonzero((prefix == MAX_INT16) | (prefix == MIN_INT16))
+            if end == x.shape[0] or end == limit + fills:
+                return in_array[:end * dtype.itemsize]
+            end = min(limit + fills, x.shape[0])
+    else:
+        return in_array[:limit * dtype.itemsize]
+
+
+def _restart_cumsum(x, sizes):
+    '''Modifies concatenated delta encoded arrays in place, so that the
+    cumulative sum of x restarts at the start of each array'''
+    sizes = np.asarray(sizes)
+    starts = (np.cumsum(sizes) - sizes)[sizes > 0]
+    if starts.shape[0] > 1:
+        # subtract the last value of the previous array
+        totals = np.add.reduceat(x, starts)
+        x[starts[1:]] -= totals[:-1]
+
+
+def _repeat(values, repeats, n):
+    '''Returns an array of n elements with the values repeated repeats times'''
+    if values.shape[0] * 64 > n:
+        return np.repeat(values, repeats)
+
+    # few long runs, e.g. occupancies: fill slices instead of copying single elements
+    y = np.empty(n, dtype=values.dtype)
     start = 0
-    for i in range(0, x.shape[0] - 1, 2):
-        end = x[i + 1] + start
-        y[start:end] = x[i] / divisor
+    for value, end in zip(values.tolist(), np.cumsum(repeats).tolist()):
+        y[start:end] = value
         start = end
     return y
 
 
-@njit
-def run_length_div_encode(x, divisor):
-    y = np.empty(x.shape[0] * 2, dtype=np.int32)
-    v = x[0]
-    length = 0
-    count = 0
-    for i in x:
-        if i == v:
-            length += 1
-        else:
-            y[count] = round(v * divisor)
-            count += 1
-            y[count] = length
-            count += 1
-            v = i
-            length = 1
-
-    y[count] = round(v * divisor)
-    count += 1
-    y[count] = length
-
-    return y[:count + 1]
-
-
-@njit
-def delta(x):
-    # see np.ediff1d
-    y = np.empty(x.shape[0], dtype=np.int32)
-    y[0] = x[0]
-    for i in range(1, x.shape[0]):
-        y[i] = x[i] - x[i - 1]
-
-    return y
-
-
-#@njit(int32[:](int32[:], int32))
-def run_length_decode(x, n):
-    """Decodes a run length encoded array
-
-    Parameters
-    ----------
-    x : encoded array of integers (value, repeat pairs)
-    n : number of element in decoded array
-    """
-    y = np.empty(n, dtype=np.int32)
-    start = 0
-    for i in range(0, x.shape[0] - 1, 2):
-        end = x[i + 1] + start
-        y[start:end] = x[i]
-        start = end
-    return y
-
-
-def run_length_decoder_np(in_array, n):
-    """Decodes a run length encoded array
-    Parameters
-    ----------
-    in_array : list
-       the input list to apply run length decoder on
-    """
-    lengths = np.array(in_array[1::2])
-    values = np.array(in_array[0::2])
-    starts = np.insert(np.array([0]), 1, np.cumsum(lengths))[:-1]
-    ends = starts + lengths
-    x = np.full(n, np.nan)
-    for l, h, v in zip(starts, ends, values):
-        x[l:h] = v
-    return x
-
-
-@njit
-def run_length_decode_cumsum(x, n):
-    """Decodes a run length encoded array
-
-    Parameters
-    ----------
-    x : encoded array of integers (value, repeat pairs)
-    n : number of element in decoded array
-    """
-    y = np.empty(n, dtype=np.int32)
-    start = 0
-    csum = 0
-    for i in range(0, x.shape[0] - 1, 2):
-        end = x[i + 1] + start
-        csum = csum + x[i]
-        y[start:end] = csum
-        start = end
-
-    return y
-
-
-@njit
-def run_length_encode(x):
-    y = np.empty(x.shape[0] * 2, dtype=np.int32)
-    v = x[0]
-    length = 0
-    count = 0
-    for i in x:
-        if i == v:
-            length += 1
-        else:
-            y[count] = v
-            count += 1
-            y[count] = length
-            count += 1
-            v = i
-            length = 1
-
-    y[count] = v
-    count += 1
-    y[count] = length
-
-    return y[:count + 1]
-
-#@jit
-def run_length_decode_ascii(x, n):
-    """Decodes a run length encoded array
-
-    Parameters
-    ----------
-    x : encoded array of integers (value, repeat pairs)
-    n : number of element in decoded array
-    """
-    # TODO initialize as str or np.object_ or default?
-    y = np.empty(n, dtype=str)
-    start = 0
-    for i in range(0, x.shape[0] - 1, 2):
-        end = x[i + 1] + start
-        y[start:end] = chr(x[i])
-        start = end
-    return y
-
-
-def run_length_encode_ascii(x):
-    y = np.empty(x.shape[0] * 2, dtype=np.int32)
-    v = x[0]
-    length = 0
-    count = 0
-    for i in x:
-        if i == v:
-            length += 1
-        else:
-            y[count] = ord(v)
-            count += 1
-            y[count] = length
-            count += 1
-            v = i
-            length = 1
-
-    y[count] = ord(v)
-    count += 1
-    y[count] = length
-
-    return y[:count + 1]
-
-NULL_BYTE = '\x00'
-nb = NULL_BYTE.encode('ascii')
-CHAIN_LEN = 4
+def _char_codes(x):
+    '''Returns the character codes of an array of single characters, '' is encoded as 0'''
+    x = np.asarray(x)
+    if x.dtype != np.dtype('U1'):
+        x = x.astype('U1')
+    return x.view(np.uint32)
 
 
-# TODO optimize this method
 def encode_chain_list(in_strings):
     """Convert a list of strings to a list of byte arrays.
     :param in_strings: the input strings
     :return the encoded list of byte arrays"""
-    out_bytes = b""
-    for in_s in in_strings:
-        out_bytes += in_s.encode('ascii')
-        for i in range(CHAIN_LEN - len(in_s)):
-            out_bytes += nb
-    return out_bytes
-
-
-# def parse_header(input_array):
-#     """Parse the header and return it along with the input array minus the header.
-#     :param input_array the array to parse
-#     :return the codec, the length of the decoded array, the parameter and the remainder
-#     of the array"""
-#     codec = struct.unpack(">i", input_array[0:4])[0]
-#     length = struct.unpack(">i", input_array[4:8])[0]
-#     param = struct.unpack(">i", input_array[8:12])[0]
-#     #print("parse_header", codec, length, param)
-#     return codec, length, param, input_array[12:]
+    return np.asarray(in_strings, dtype='S' + str(CHAIN_LEN)).tobytes()
 
 
 def add_header(input_array, codec, length, param):
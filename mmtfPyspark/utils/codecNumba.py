@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+'''codecNumba.py
+
+Numba implementation of the MMTF codecs. This module is imported by
+:func:`mmtfPyspark.utils.codec.get_backend` when the "numba" backend is
+selected. The methods have the same signatures and results as
+:class:`mmtfPyspark.utils.codec.NumpyBackend`.
+
+The compiled kernels are cached on disk (in __pycache__ next to this file,
+in a user cache directory if the package is read-only, or in NUMBA_CACHE_DIR
+if that environment variable is set), so that only
+the first Python worker on a node pays the compilation time. Other workers
+load the machine code from the cache.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import numpy as np
+from numba import njit
+from mmtfPyspark.utils.codec import MAX_INT16, MIN_INT16, _char_codes
+
+
+class NumbaBackend(object):
+    '''Numba implementation of the MMTF codecs. The input arrays of the
+    decoders are native-endian integer arrays.
+    '''
+    name = 'numba'
+
+    @staticmethod
+    def run_length_decode(x, n):
+        '''Decodes a run-length encoded int32 array (value, repeat pairs) of n elements'''
+        return run_length_decode(x, n)
+
+    @staticmethod
+    def run_length_delta_decode(x, n):
+        '''Decodes a run-length and delta encoded int32 array of n elements'''
+        return run_length_delta_decode(x, n)
+
+    @staticmethod
+    def run_length_div_decode(x, n, divisor):
+        '''Decodes a run-length encoded array and divides the values by divisor'''
+        return run_length_div_decode(x, n, divisor)
+
+    @staticmethod
+    def run_length_decode_ascii(x, n):
+        '''Decodes a run-length encoded array of character codes'''
+        return run_length_decode_uint32(x, n).view('U1')
+
+    @staticmethod
+    def ri_decode(x, n, divisor):
+        '''Decodes a recursive index and delta encoded int16 array of n elements and
+        divides the values by divisor'''
+        return ri_decode_into(x, divisor, np.empty(n, dtype=np.float32))
+
+    @staticmethod
+    def ri_decode_into(x, n, divisor, out):
+        '''Decodes a recursive index and delta encoded int16 array of n elements into
+        an existing float32 array. The decoded values are truncated to the length of
+        the output array.'''
+        return ri_decode_into(x, divisor, out)
+
+    @staticmethod
+    def run_length_encode(x):
+        '''Run-length encodes an integer array as (value, repeat) pairs'''
+        x = np.asarray(x)
+        if x.shape[0] == 0:
+            return np.empty(0, dtype=np.int32)
+        return run_length_encode(x)
+
+    @staticmethod
+    def delta(x):
+        '''Delta encodes an integer array'''
+        return delta(np.asarray(x, dtype=np.int64))
+
+    @staticmethod
+    def f2id(x, multiplier):
+        '''Converts floats to integers (multiplied by multiplier) and delta encodes them'''
+        return f2id(np.asarray(x, dtype=np.float64), multiplier)
+
+    @staticmethod
+    def ri_encode(x, maximum=MAX_INT16, minimum=MIN_INT16):
+        '''Recursive index encodes an integer array into an int16 array'''
+        return ri_encode(np.asarray(x, dtype=np.int64), maximum, minimum)
+
+    @staticmethod
+    def run_length_div_encode(x, divisor):
+        '''Multiplies a float array by divisor and run-length encodes the integer values'''
+        x = np.asarray(x, dtype=np.float64)
+        if x.shape[0] == 0:
+            return np.empty(0, dtype=np.int32)
+        return run_length_div_encode(x, divisor)
+
+    @staticmethod
+    def run_length_encode_ascii(x):
+        '''Run-length encodes an array of single characters as character codes'''
+        return NumbaBackend.run_length_encode(_char_codes(x))
+
+
+@njit(cache=True)
+def run_length_decode(x, n):
+    y = np.empty(n, dtype=np.int32)
+    start = 0
+    for i in range(0, x.shape[0] - 1, 2):
+        end = start + x[i + 1]
+        y[start:end] = x[i]
+        start = end
+    return y
+
+
+@njit(cache=True)
+def run_length_decode_uint32(x, n):
+    y = np.empty(n, dtype=np.uint32)
+    start = 0
+    for i in range(0, x.shape[0] - 1, 2):
+        end = start + x[i + 1]
+        y[start:end] = x[i]
+        start = end
+    return y
+
+
+@njit(cache=True)
+def run_length_delta_decode(x, n):
+    y = np.empty(n, dtype=np.int32)
+    start = 0
+    value = 0
+    for i in range(0, x.shape[0] - 1, 2):
+        for j in range(start, start + x[i + 1]):
+            value += x[i]
+            y[j] = value
+        start += x[i + 1]
+    return y
+
+
+@njit(cache=True)
+def run_length_div_decode(x, n, divisor):
+    y = np.empty(n, dtype=np.float32)
+    start = 0
+    for i in range(0, x.shape[0] - 1, 2):
+        end = start + x[i + 1]
+        y[start:end] = x[i] / divisor
+        start = end
+    return y
+
+
+@njit(cache=True)
+def ri_decode_into(x, divisor, out):
+    value = 0
+    j = 0
+    for v in x:
+        if j >= out.shape[0]:
+            break
+        value += v
+        if v != MAX_INT16 and v != MIN_INT16:
+            out[j] = value / divisor
+            j += 1
+    return out
+
+
+@njit(cache=True)
+def run_length_encode(x):
+    y = np.empty(x.shape[0] * 2, dtype=np.int32)
+    v = x[0]
+    length = 0
+    count = 0
+    for i in x:
+        if i == v:
+            length += 1
+        else:
+            y[count] = v
+            y[count + 1] = length
+            count += 2
+            v = i
+            length = 1
+
+    y[count] = v
+    y[count + 1] = length
+    return y[:count + 2]
+
+
+@njit(cache=True)
+def delta(x):
+    y = np.empty(x.shape[0], dtype=np.int32)
+    previous = 0
+    for i in range(x.shape[0]):
+        y[i] = x[i] - previous
+        previous = x[i]
+    return y
+
+
+@njit(cache=True)
+def f2id(x, multiplier):
+    y = np.empty(x.shape[0], dtype=np.int32)
+    previous = 0
+    for i in range(x.shape[0]):
+        value = np.int64(np.rint(x[i] * multiplier))
+        y[i] = value - previous
+        previous = value
+    return y
+
+
+@njit(cache=True)
+def ri_encode(x, maximum, minimum):
+    n = 0
+    for curr in x:
+        if curr >= 0:
+            n += curr // maximum + 1
+        else:
+            n += -curr // -minimum + 1
+
+    y = np.empty(n, dtype=np.int16)
+    i = 0
+    for curr in x:
+        if curr >= 0:
+            while curr >= maximum:
+                y[i] = maximum
+                i += 1
+                curr -= maximum
+        else:
+            while curr <= minimum:
+                y[i] = minimum
+                i += 1
+                curr -= minimum
+        y[i] = curr
+        i += 1
+    return y
+
+
+@njit(cache=True)
+def run_length_div_encode(x, divisor):
+    return run_length_encode(np.rint(x * divisor).astype(np.int32))
@@ -0,0 +1,429 @@
+#!/usr/bin/env python
+'''crystalSymmetry.py
+
+Crystallographic symmetry operators of macromolecular space groups and the
+symmetry mates of a structure in the crystal lattice.
+
+The symmetry operators are generated from the Hall symbols of the 65
+chiral (Sohncke) space groups, the only space groups of macromolecular
+crystals, and a few non-standard settings that occur in the PDB.
+
+References
+----------
+- S. R. Hall, Space-group notation with an explicit origin, Acta Cryst. A37, 517-525 (1981)
+- International Tables for Crystallography, Volume A (2006)
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import re
+import numpy as np
+
+# Hall symbols of the space groups by Hermann-Mauguin symbol (as used in the PDB)
+HALL_SYMBOLS = {'P 1': 'P 1',
+                'P 1 2 1': 'P 2y',
+                'P 1 21 1': 'P 2yb',
+                'C 1 2 1': 'C 2y',
+                'A 1 2 1': 'A 2y',
+                'I 1 2 1': 'I 2y',
+                'P 1 1 2': 'P 2',
+                'P 1 1 21': 'P 2c',
+                'P 2 2 2': 'P 2 2',
+                'P 2 2 21': 'P 2c 2',
+                'P 21 2 2': 'P 2a 2a',
+                'P 2 21 2': 'P 2 2b',
+                'P 21 21 2': 'P 2 2ab',
+                'P 2 21 21': 'P 2bc 2',
+                'P 21 2 21': 'P 2ac 2ac',
+                'P 21 21 21': 'P 2ac 2ab',
+                'C 2 2 21': 'C 2c 2',
+                'C 2 2 2': 'C 2 2',
+                'F 2 2 2': 'F 2 2',
+                'I 2 2 2': 'I 2 2',
+                'I 21 21 21': 'I 2b 2c',
+                'P 4': 'P 4',
+                'P 41': 'P 4w',
+                'P 42': 'P 4c',
+                'P 43': 'P 4cw',
+                'I 4': 'I 4',
+                'I 41': 'I 4bw',
+                'P 4 2 2': 'P 4 2',
+                'P 4 21 2': 'P 4ab 2ab',
+                'P 41 2 2': 'P 4w 2c',
+                'P 41 21 2': 'P 4abw 2nw',
+                'P 42 2 2': 'P 4c 2',
+                'P 42 21 2': 'P 4n 2n',
+                'P 43 2 2': 'P 4cw 2c',
+                'P 43 21 2': 'P 4nw 2abw',
+                'I 4 2 2': 'I 4 2',
+                'I 41 2 2': 'I 4bw 2bw',
+                'P 3': 'P 3',
+                'P 31': 'P 31',
+                'P 32': 'P 32',
+                'H 3': 'R 3',
+                'R 3': 'P 3*',
+                'P 3 1 2': 'P 3 2',
+                'P 3 2 1': 'P 3 2"',
+                'P 31 1 2': 'P 31 2c (0 0 1)',
+                'P 31 2 1': 'P 31 2"',
+                'P 32 1 2': 'P 32 2c (0 0 -1)',
+                'P 32 2 1': 'P 32 2"',
+                'H 3 2': 'R 3 2"',
+                'R 3 2': 'P 3* 2',
+                'P 6': 'P 6',
+                'P 61': 'P 61',
+                'P 65': 'P 65',
+                'P 62': 'P 62',
+                'P 64': 'P 64',
+                'P 63': 'P 6c',
+                'P 6 2 2': 'P 6 2',
+                'P 61 2 2': 'P 61 2 (0 0 -1)',
+                'P 65 2 2': 'P 65 2 (0 0 1)',
+                'P 62 2 2': 'P 62 2c (0 0 1)',
+                'P 64 2 2': 'P 64 2c (0 0 -1)',
+                'P 63 2 2': 'P 6c 2c',
+                'P 2 3': 'P 2 2 3',
+                'F 2 3': 'F 2 2 3',
+                'I 2 3': 'I 2 2 3',
+                'P 21 3': 'P 2ac 2ab 3',
+                'I 21 3': 'I 2b 2c 3',
+                'P 4 3 2': 'P 4 2 3',
+                'P 42 3 2': 'P 4n 2 3',
+                'F 4 3 2': 'F 4 2 3',
+                'F 41 3 2': 'F 4d 2 3',
+                'I 4 3 2': 'I 4 2 3',
+                'P 43 3 2': 'P 4acd 2ab 3',
+                'P 41 3 2': 'P 4bd 2ab 3',
+                'I 41 3 2': 'I 4bd 2c 3'}
+
+# Translations are represented as integer multiples of 1/12 (exact for all space groups)
+_SCALE = 12
+
+_LATTICE_TRANSLATIONS = {'P': [(0, 0, 0)],
+                         'A': [(0, 0, 0), (0, 6, 6)],
+                         'B': [(0, 0, 0), (6, 0, 6)],
+                         'C': [(0, 0, 0), (6, 6, 0)],
+                         'I': [(0, 0, 0), (6, 6, 6)],
+                         'R': [(0, 0, 0), (8, 4, 4), (4, 8, 8)],
+                         'F': [(0, 0, 0), (0, 6, 6), (6, 0, 6), (6, 6, 0)]}
+
+_TRANSLATION_SYMBOLS = {'a': (6, 0, 0), 'b': (0, 6, 0), 'c': (0, 0, 6), 'n': (6, 6, 6),
+                        'u': (3, 0, 0), 'v': (0, 3, 0), 'w': (0, 0, 3), 'd': (3, 3, 3)}
+
+_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+# rotation matrices by order and axis, the face diagonal axes ' and " are
+# only used with a preceding rotation about the z axis
+_ROTATIONS = {('1', 'z'): [[1, 0, 0], [0, 1, 0], [0, 0, 1]],
+              ('2', 'x'): [[1, 0, 0], [0, -1, 0], [0, 0, -1]],
+              ('2', 'y'): [[-1, 0, 0], [0, 1, 0], [0, 0, -1]],
+              ('2', 'z'): [[-1, 0, 0], [0, -1, 0], [0, 0, 1]],
+              ('3', 'x'): [[1, 0, 0], [0, 0, -1], [0, 1, -1]],
+              ('3', 'y'): [[-1, 0, 1], [0, 1, 0], [-1, 0, 0]],
+              ('3', 'z'): [[0, -1, 0], [1, -1, 0], [0, 0, 1]],
+              ('4', 'x'): [[1, 0, 0], [0, 0, -1], [0, 1, 0]],
+              ('4', 'y'): [[0, 0, 1], [0, 1, 0], [-1, 0, 0]],
+              ('4', 'z'): [[0, -1, 0], [1, 0, 0], [0, 0, 1]],
+              ('6', 'x'): [[1, 0, 0], [0, 1, -1], [0, 1, 0]],
+              ('6', 'y'): [[0, 0, 1], [0, 1, 0], [-1, 0, 1]],
+              ('6', 'z'): [[1, -1, 0], [1, 0, 0], [0, 0, 1]],
+              ('2', "'"): [[0, -1, 0], [-1, 0, 0], [0, 0, -1]],
+              ('2', '"'): [[0, 1, 0], [1, 0, 0], [0, 0, -1]],
+              ('3', '*'): [[0, 0, 1], [1, 0, 0], [0, 1, 0]]}
+
+# rotation parts of the symmetry operators of the point groups 422, 622, 32 (rhombohedral
+# axes) and 432 in the order of the general positions in the International Tables, which
+# is the order of the symmetry operators in the PDB (REMARK 290). The operators of a space
+# group are sorted in the order of the first point group that contains all of its rotations.
+_ROTATION_ORDERS = [['x,y,z', '-x,-y,z', '-y,x,z', 'y,-x,z', '-x,y,-z', 'x,-y,-z', 'y,x,-z', '-y,-x,-z'],
+                    ['x,y,z', '-y,x-y,z', '-x+y,-x,z', '-x,-y,z', 'y,-x+y,z', 'x-y,x,z',
+                     'y,x,-z', 'x-y,-y,-z', '-x,-x+y,-z', '-y,-x,-z', '-x+y,y,-z', 'x,x-y,-z'],
+                    ['x,y,z', 'z,x,y', 'y,z,x', '-z,-y,-x', '-y,-x,-z', '-x,-z,-y'],
+                    ['x,y,z', '-x,-y,z', '-x,y,-z', 'x,-y,-z',
+                     'z,x,y', 'z,-x,-y', '-z,-x,y', '-z,x,-y', 'y,z,x', '-y,z,-x', 'y,-z,-x', '-y,-z,x',
+                     'y,x,-z', '-y,-x,-z', 'y,-x,z', '-y,x,z', 'x,z,-y', '-x,z,y', '-x,-z,-y', 'x,-z,y',
+                     'z,y,-x', 'z,-y,x', '-z,y,x', '-z,-y,-x']]
+
+# general positions (coordinate triplets of the (0,0,0)+ set) from the International Tables of
+# the centred space groups whose operators have translations. The operators generated from the
+# Hall symbol may differ from these by a centring translation, which changes the operator numbers.
+_GENERAL_POSITIONS = {'C 2 2 21': ['x,y,z', '-x,-y,z+1/2', '-x,y,-z+1/2', 'x,-y,-z'],
+                      'I 21 21 21': ['x,y,z', '-x+1/2,-y,z+1/2', '-x,y+1/2,-z+1/2', 'x+1/2,-y+1/2,-z'],
+                      'I 41': ['x,y,z', '-x+1/2,-y+1/2,z+1/2', '-y,x+1/2,z+1/4', 'y+1/2,-x,z+3/4'],
+                      'I 41 2 2': ['x,y,z', '-x+1/2,-y+1/2,z+1/2', '-y,x+1/2,z+1/4', 'y+1/2,-x,z+3/4',
+                                   '-x+1/2,y,-z+3/4', 'x,-y+1/2,-z+1/4', 'y+1/2,x+1/2,-z+1/2', '-y,-x,-z'],
+                      'I 21 3': ['x,y,z', '-x+1/2,-y,z+1/2', '-x,y+1/2,-z+1/2', 'x+1/2,-y+1/2,-z',
+                                 'z,x,y', 'z+1/2,-x+1/2,-y', '-z+1/2,-x,y+1/2', '-z,x+1/2,-y+1/2',
+                                 'y,z,x', '-y,z+1/2,-x+1/2', 'y+1/2,-z+1/2,-x', '-y+1/2,-z,x+1/2'],
+                      'F 41 3 2': ['x,y,z', '-x,-y+1/2,z+1/2', '-x+1/2,y+1/2,-z', 'x+1/2,-y,-z+1/2',
+                                   'z,x,y', 'z+1/2,-x,-y+1/2', '-z,-x+1/2,y+1/2', '-z+1/2,x+1/2,-y',
+                                   'y,z,x', '-y+1/2,z+1/2,-x', 'y+1/2,-z,-x+1/2', '-y,-z+1/2,x+1/2',
+                                   'y+3/4,x+1/4,-z+3/4', '-y+1/4,-x+1/4,-z+1/4', 'y+1/4,-x+3/4,z+3/4',
+                                   '-y+3/4,x+3/4,z+1/4', 'x+3/4,z+1/4,-y+3/4', '-x+3/4,z+3/4,y+1/4',
+                                   '-x+1/4,-z+1/4,-y+1/4', 'x+1/4,-z+3/4,y+3/4', 'z+3/4,y+1/4,-x+3/4',
+                                   'z+1/4,-y+3/4,x+3/4', '-z+3/4,y+3/4,x+1/4', '-z+1/4,-y+1/4,-x+1/4'],
+                      'I 41 3 2': ['x,y,z', '-x+1/2,-y,z+1/2', '-x,y+1/2,-z+1/2', 'x+1/2,-y+1/2,-z',
+                                   'z,x,y', 'z+1/2,-x+1/2,-y', '-z+1/2,-x,y+1/2', '-z,x+1/2,-y+1/2',
+                                   'y,z,x', '-y,z+1/2,-x+1/2', 'y+1/2,-z+1/2,-x', '-y+1/2,-z,x+1/2',
+                                   'y+3/4,x+1/4,-z+1/4', '-y+3/4,-x+3/4,-z+3/4', 'y+1/4,-x+1/4,z+3/4',
+                                   '-y+1/4,x+3/4,z+1/4', 'x+3/4,z+1/4,-y+1/4', '-x+1/4,z+3/4,y+1/4',
+                                   '-x+3/4,-z+3/4,-y+3/4', 'x+1/4,-z+1/4,y+3/4', 'z+3/4,y+1/4,-x+1/4',
+                                   'z+1/4,-y+1/4,x+3/4', '-z+1/4,y+3/4,x+1/4', '-z+3/4,-y+3/4,-x+3/4']}
+
+_TERM = re.compile(r'([+-]?)(?:([xyz])|(\d+)/(\d+))')
+
+_OPERATOR = re.compile(r'^([12346])([1-5]?)([xyz\'"*]?)([abcnuvwd]*)$')
+
+_operator_cache = {}
+
+
+def get_symmetry_operators(space_group):
+    '''Returns the symmetry operators of a space group in fractional coordinates.
+    A symmetry operator transforms fractional coordinates x to R x + t.
+    The operators are in the order of the International Tables and the PDB
+    (REMARK 290), the first operator is the identity.
+
+    Parameters
+    ----------
+    space_group : str
+       Hermann-Mauguin symbol of the space group, e.g., "P 21 21 21" or "P 1 21 1"
+
+    Returns
+    -------
+    tuple
+       rotation matrices (n x 3 x 3) and translation vectors (n x 3)
+
+    Raises
+    ------
+    ValueError
+       unknown space group
+    '''
+    space_group = ' '.join(space_group.split()) if space_group is not None else None
+    if space_group not in HALL_SYMBOLS:
+        raise ValueError("Unknown space group: " + str(space_group))
+
+    operators = _operator_cache.get(space_group)
+    if operators is None:
+        operators = _parse_hall_symbol(HALL_SYMBOLS[space_group], _GENERAL_POSITIONS.get(space_group))
+        _operator_cache[space_group] = operators
+
+    return operators
+
+
+def get_orthogonalization_matrix(unit_cell):
+    '''Returns the matrix that converts fractional to Cartesian coordinates, using
+    the PDB convention: a is parallel to x, and b lies in the xy plane.
+
+    Parameters
+    ----------
+    unit_cell : list
+       unit cell parameters [a, b, c, alpha, beta, gamma] (Angstrom, degrees)
+
+    Returns
+    -------
+    ndarray
+       3 x 3 orthogonalization matrix
+    '''
+    a, b, c = unit_cell[0:3]
+    alpha, beta, gamma = np.radians(unit_cell[3:6])
+    cos_alpha, cos_beta, cos_gamma = np.cos(alpha), np.cos(beta), np.cos(gamma)
+    sin_gamma = np.sin(gamma)
+    volume = np.sqrt(1 - cos_alpha ** 2 - cos_beta ** 2 - cos_gamma ** 2 + 2 * cos_alpha * cos_beta * cos_gamma)
+
+    return np.array([[a, b * cos_gamma, c * cos_beta],
+                     [0, b * sin_gamma, c * (cos_alpha - cos_beta * cos_gamma) / sin_gamma],
+                     [0, 0, c * volume / sin_gamma]])
+
+
+def get_symmetry_mates(space_group, unit_cell, center, radius, distance_cutoff=0.0):
+    '''Returns the symmetry mates in the crystal lattice that can be within
+    the distance cutoff of a set of atoms, given the bounding sphere of the atoms.
+    Only the copies whose bounding spheres are within the distance cutoff are
+    returned, instead of all copies generated by the space group operators in
+    the 27 neighboring unit cells.
+
+    Each symmetry mate is identified by a symmetry code nklm, following
+    the PDB convention: n is the number of the symmetry operator (one-based
+    index of :func:`get_symmetry_operators`), and k, l, m are 5 + the lattice
+    translations along a, b, and c, e.g., 2565 is symmetry operator 2 followed
+    by a translation by one unit cell along b. The asymmetric unit is 1555.
+    Lattice translations beyond +/- 4 unit cells cannot be encoded.
+
+    Parameters
+    ----------
+    space_group : str
+       Hermann-Mauguin symbol of the space group
+    unit_cell : list
+       unit cell parameters [a, b, c, alpha, beta, gamma] (Angstrom, degrees)
+    center : ndarray
+       center of the bounding sphere in Cartesian coordinates
+    radius : float
+       radius of the bounding sphere
+    distance_cutoff : float, optional
+       distance cutoff
+
+    Returns
+    -------
+    list
+       (symmetry code, 4x4 transformation matrix) tuples. The matrices transform
+       Cartesian coordinates x (row vectors) to x M[0:3, 0:3] + M[3, 0:3], in the
+       same format as the bio assembly transformations.
+
+    Raises
+    ------
+    ValueError
+       unknown space group, or a symmetry mate beyond the range of the symmetry codes
+    '''
+    rotations, translations = get_symmetry_operators(space_group)
+    orthogonalization = get_orthogonalization_matrix(unit_cell)
+    fractionalization = np.linalg.inv(orthogonalization)
+
+    # the bounding spheres of two copies overlap within the cutoff if their centers are within reach
+    reach = 2 * radius + distance_cutoff
+    center = fractionalization.dot(center)
+
+    # lattice translations that can bring a copy within reach, relative to the closest copy
+    span = np.ceil(reach * np.linalg.norm(fractionalization, axis=1) + 0.5).astype(int)
+    offsets = np.indices(2 * span + 1).reshape(3, -1).T - span
+
+    mates = list()
+    for index, (rotation, translation) in enumerate(zip(rotations, translations)):
+        mate_center = rotation.dot(center) + translation
+        lattice_translations = np.round(center - mate_center) + offsets
+        distances = np.linalg.norm((mate_center - center + lattice_translations).dot(orthogonalization.T), axis=1)
+
+        # Convert the symmetry operator to Cartesian coordinates
+        cartesian_rotation = orthogonalization.dot(rotation).dot(fractionalization)
+
+        for lattice_translation in lattice_translations[distances <= reach]:
+            # exclude the asymmetric unit
+            if index == 0 and not lattice_translation.any():
+                continue
+
+            if np.abs(lattice_translation).max() > 4:
+                raise ValueError("Lattice translation beyond the range of symmetry codes: "
+                                 + str(lattice_translation.astype(int).tolist()))
+
+            matrix = np.identity(4)
+            matrix[0:3, 0:3] = cartesian_rotation.T
+            matrix[3, 0:3] = orthogonalization.dot(translation + lattice_translation)
+
+            code = (index + 1) * 1000 + int(np.dot(lattice_translation + 5, [100, 10, 1]))
+            mates.append((code, matrix))
+
+    return mates
+
+
+def _parse_hall_symbol(hall_symbol, general_positions=None):
+    '''Returns the rotation matrices and translation vectors of the symmetry
+    operators of a space group given by its Hall symbol. The translations of
+    centred space groups are taken from the general positions, if given.'''
+    origin_shift = np.zeros(3, dtype=int)
+    match = re.search(r'\((.*)\)', hall_symbol)
+    if match is not None:
+        origin_shift = np.array([int(v) for v in match.group(1).split()])
+        hall_symbol = hall_symbol[:match.start()]
+
+    tokens = hall_symbol.split()
+    lattice = tokens[0]
+
+    generators = list()
+    previous_order = None
+    for position, token in enumerate(tokens[1:]):
+        match = _OPERATOR.match(token)
+        if match is None:
+            raise ValueError("Unsupported Hall symbol: " + hall_symbol)
+        order, screw, axis, symbols = match.groups()
+
+        # default axes
+        if axis == '':
+            if position == 0:
+                axis = 'z'
+            elif position == 1 and order == '2':
+                axis = 'x' if previous_order in ('2', '4') else "'"
+            elif position == 2 and order == '3':
+                axis = '*'
+        rotation = np.array(_ROTATIONS[(order, axis)])
+
+        translation = np.zeros(3, dtype=int)
+        for symbol in symbols:
+            translation += _TRANSLATION_SYMBOLS[symbol]
+        if screw != '':
+            translation[_AXES[axis]] += _SCALE * int(screw) // int(order)
+
+        # shift the origin: x' = R (x - v) + t + v
+        translation += origin_shift - rotation.dot(origin_shift)
+
+        generators.append((rotation, translation))
+        previous_order = order
+
+    # generate the operators from the generators, one operator per rotation
+    # (the operators that differ by a lattice centering translation are added below)
+    lattice_translations = _LATTICE_TRANSLATIONS[lattice]
+    operators = [(np.identity(3, dtype=int), np.zeros(3, dtype=int))]
+    keys = {_get_key(*operators[0], lattice_translations)}
+    for rotation, translation in operators:
+        for generator_rotation, generator_translation in generators:
+            operator = (generator_rotation.dot(rotation),
+                        (generator_rotation.dot(translation) + generator_translation) % _SCALE)
+            key = _get_key(*operator, lattice_translations)
+            if key not in keys:
+                keys.add(key)
+                operators.append(operator)
+
+    # sort the operators in the order of the International Tables
+    rotation_keys = [_get_rotation_key(rotation) for rotation, _ in operators]
+    order = next(o for o in _ROTATION_ORDERS if set(rotation_keys).issubset(o))
+    operators = [operators[rotation_keys.index(key)] for key in order if key in rotation_keys]
+
+    # use the translations of the International Tables, which may differ by a centring translation
+    if general_positions is not None:
+        for index, (rotation, translation) in enumerate(operators):
+            general_rotation, general_translation = _parse_operator(general_positions[index])
+            if not np.array_equal(rotation, general_rotation) or \
+                    _get_key(rotation, translation, lattice_translations) != \
+                    _get_key(general_rotation, general_translation, lattice_translations):
+                raise ValueError("Inconsistent general position: " + general_positions[index])
+            operators[index] = (rotation, general_translation)
+
+    # add the lattice centering translations
+    rotations = list()
+    translations = list()
+    for lattice_translation in lattice_translations:
+        for rotation, translation in operators:
+            rotations.append(rotation)
+            translations.append((translation + lattice_translation) % _SCALE)
+
+    return np.array(rotations), np.array(translations) / _SCALE
+
+
+def _get_key(rotation, translation, lattice_translations):
+    translation = min(tuple((translation + lattice_translation) % _SCALE) for lattice_translation in lattice_translations)
+    return rotation.tobytes(), translation
+
+
+def _get_rotation_key(rotation):
+    '''Returns the rotation matrix in the x,y,z notation, e.g., "-y,x-y,z"'''
+    rows = list()
+    for row in rotation:
+        terms = ''.join(('+' if value > 0 else '-') + axis for value, axis in zip(row, 'xyz') if value != 0)
+        rows.append(terms.lstrip('+'))
+    return ','.join(rows)
+
+
+def _parse_operator(operator):
+    '''Returns the rotation matrix and the translation vector (in multiples of
+    1/12) of a symmetry operator in the x,y,z notation, e.g., "-y+1/2,x,z+3/4"'''
+    rotation = np.zeros((3, 3), dtype=int)
+    translation = np.zeros(3, dtype=int)
+    for row, component in enumerate(operator.split(',')):
+        for sign, axis, numerator, denominator in _TERM.findall(component):
+            value = -1 if sign == '-' else 1
+            if axis:
+                rotation[row, _AXES[axis]] = value
+            else:
+                translation[row] = value * _SCALE * int(numerator) // int(denominator)
+    return rotation, translation % _SCALE
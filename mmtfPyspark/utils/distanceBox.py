@@ -1,7 +1,10 @@
 #!/user/bin/env python
 '''distanceBox.py:
 
-This code is a modification from BioJava's distanceBox class
+This code is a modification from BioJava's distanceBox class. Points are
+added one at a time and binned with a vectorized cell list
+(see :class:`CellList <mmtfPyspark.utils.cellList.CellList>`)
+when the box is first queried.
 
 References
 ----------
@@ -15,100 +18,60 @@ __version__ = "0.2.0"
 __status__ = "Done"
 
 import numpy as np
-from collections import defaultdict
+from mmtfPyspark.utils.cellList import CellList, OFFSET_KEYS, KEY_BITS, KEY_OFFSET
 
+_OFFSET_KEYS = OFFSET_KEYS.tolist()
 
-class DistanceBox(object):
 
-    offset = [
-        0 + (0 * 10000) + (0 * 1000000000),
-        -1 + (-1 * 10000) + (-1 * 1000000000),
-        -1 + (-1 * 10000) + (0 * 1000000000),
-        -1 + (-1 * 10000) + (1 * 1000000000),
-        -1 + (0 * 10000) + (-1 * 1000000000),
-        -1 + (0 * 10000) + (0 * 1000000000),
-        -1 + (0 * 10000) + (1 * 1000000000),
-        -1 + (1 * 10000) + (-1 * 1000000000),
-        -1 + (1 * 10000) + (0 * 1000000000),
-        -1 + (1 * 10000) + (1 * 1000000000),
-        0 + (-1 * 10000) + (-1 * 1000000000),
-        0 + (-1 * 10000) + (0 * 1000000000),
-        0 + (-1 * 10000) + (1 * 1000000000),
-        0 + (0 * 10000) + (-1 * 1000000000),
-        0 + (0 * 10000) + (1 * 1000000000),
-        0 + (1 * 10000) + (-1 * 1000000000),
-        0 + (1 * 10000) + (0 * 1000000000),
-        0 + (1 * 10000) + (1 * 1000000000),
-        1 + (-1 * 10000) + (-1 * 1000000000),
-        1 + (-1 * 10000) + (0 * 1000000000),
-        1 + (-1 * 10000) + (1 * 1000000000),
-        1 + (0 * 10000) + (-1 * 1000000000),
-        1 + (0 * 10000) + (0 * 1000000000),
-        1 + (0 * 10000) + (1 * 1000000000),
-        1 + (1 * 10000) + (-1 * 1000000000),
-        1 + (1 * 10000) + (0 * 1000000000),
-        1 + (1 * 10000) + (1 * 1000000000)
-    ]
+class DistanceBox(object):
 
     def __init__(self, binWidth):
 
+        self.binWidth = binWidth
         self.inverseBinWidth = 1.0 / binWidth
-        self.hashMap = defaultdict(list)
+        self.points = []
+        self.pointNames = []
+        self._cellList = None
+        self._hashMap = None
 
     def add_point(self, point, pointName):
 
-        i = np.rint(float(point[0]) * self.inverseBinWidth)
-        j = np.rint(float(point[1]) * self.inverseBinWidth)
-        k = np.rint(float(point[2]) * self.inverseBinWidth)
-        location = i + (j * 10000) + (k * 1000000000)
+        self.points.append(point)
+        self.pointNames.append(pointName)
+        self._cellList = None
+        self._hashMap = None
 
-        self.hashMap[location].append(pointName)
+    def get_cell_list(self):
+        '''Returns the cell list of the points in the box'''
+        if self._cellList is None:
+            self._cellList = CellList(np.array(self.points, dtype=np.float64).reshape(-1, 3), self.binWidth)
+        return self._cellList
 
     def get_neighbors(self, point):
 
-        i = np.rint(float(point[0]) * self.inverseBinWidth)
-        j = np.rint(float(point[1]) * self.inverseBinWidth)
-        k = np.rint(float(point[2]) * self.inverseBinWidth)
-        location = i + (j * 10000) + (k * 1000000000)
+        # single point lookups are faster with a dictionary of cell key -> point names
+        if self._hashMap is None:
+            keys, indptr, indices = self.get_cell_list().get_cell_points()
+            names = self._get_names(indices)
+            self._hashMap = {key: names[indptr[n]:indptr[n + 1]] for n, key in enumerate(keys.tolist())}
 
-        box = self.get_box_two(location)
-
-        return box
+        i = round(float(point[0]) * self.inverseBinWidth) + KEY_OFFSET
+        j = round(float(point[1]) * self.inverseBinWidth) + KEY_OFFSET
+        k = round(float(point[2]) * self.inverseBinWidth) + KEY_OFFSET
+        location = i + (j << KEY_BITS) + (k << 2 * KEY_BITS)
 
-    def get_box_two(self, location):
+        box = []
+        for off in _OFFSET_KEYS:
+            names = self._hashMap.get(location + off)
+            if names is not None:
+                box += names
 
-        box_two = []
-        for off in self.offset:
-            if (location + off) in self.hashMap:
-                box_two += self.hashMap[location + off]
-
-        return box_two
+        return box
 
     def getIntersection(self, distanceBox):
 
-        intersection = []
-        checkedLocations = set()
-
-        for location in self.hashMap.keys():
-            overlap = False
-
-            for off in self.offset:
-                loc = location + off
-
-                if loc in distanceBox.hashMap:
-
-                    overlap = True
-                    break
-
-            if overlap:
-                for off in self.offset:
-                    loc = location + off
-
-                    if loc in checkedLocations:
-                        continue
-
-                    checkedLocations.add(loc)
-                    if loc in self.hashMap:
-                        intersection += self.hashMap[loc]
+        indices = self.get_cell_list().get_intersection(distanceBox.get_cell_list())
+        return self._get_names(indices)
 
-        return intersection
+    def _get_names(self, indices):
+        return [self.pointNames[i] for i in indices.tolist()]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+'''mmtfBuffer.py
+
+Provides lazy, dictionary-like access to a msgpack encoded MMTF structure.
+The top-level msgpack map is scanned once to locate the byte offsets of all
+fields. Individual fields are only unpacked when they are accessed, and
+binary fields (e.g. xCoordList, groupTypeList) are returned as zero-copy
+memoryviews into the original buffer.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import io
+import struct
+import msgpack
+from collections.abc import Mapping
+
+# msgpack type codes for binary data and the size of their length fields
+_BIN_HEADERS = {0xc4: '>B', 0xc5: '>H', 0xc6: '>I'}
+
+
+class MmtfBuffer(Mapping):
+    '''Read-only mapping of MMTF field names to values that decodes fields
+    on first access from the raw msgpack bytes.
+
+    An MmtfBuffer can be used in place of the dictionary returned by
+    msgpack.loads as input to :class:`MmtfStructure <mmtfPyspark.utils.MmtfStructure>`.
+
+    Attributes
+    ----------
+    data : bytes
+       msgpack encoded (uncompressed) MMTF data
+
+    Examples
+    --------
+    >>> data = gzip.decompress(raw)
+    >>> structure = MmtfStructure(MmtfBuffer(data))
+    '''
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self._view = memoryview(self.data)
+        self._offsets = _scan_fields(self.data)
+        self._values = {}
+
+    def __getitem__(self, field_name):
+        if field_name in self._values:
+            return self._values[field_name]
+
+        start, end = self._offsets[field_name]
+        value = _unpack_value(self._view, start, end)
+        self._values[field_name] = value
+        return value
+
+    def __contains__(self, field_name):
+        return field_name in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __reduce__(self):
+        # memoryviews cannot be pickled, ship the raw bytes and rescan
+        return (MmtfBuffer, (self.data,))
+
+    def field_size(self, field_name):
+        '''Returns the number of encoded bytes of a field
+
+        Parameters
+        ----------
+        field_name : str
+           name of the MMTF field
+
+        Returns
+        -------
+        int
+           size of the msgpack encoded field in bytes
+        '''
+        start, end = self._offsets[field_name]
+        return end - start
+
+    def to_dict(self):
+        '''Returns a dictionary with all fields decoded, equivalent to the
+        output of msgpack.loads
+        '''
+        return {field_name: self[field_name] for field_name in self._offsets}
+
+
+def _scan_fields(data):
+    '''Returns a dictionary of field name -> (start, end) byte offsets
+    of the values in the top-level msgpack map'''
+    unpacker = msgpack.Unpacker(io.BytesIO(data), raw=False, max_buffer_size=max(len(data), 1024))
+    num_fields = unpacker.read_map_header()
+
+    offsets = {}
+    for _ in range(num_fields):
+        field_name = unpacker.unpack()
+        start = unpacker.tell()
+        unpacker.skip()
+        offsets[field_name] = (start, unpacker.tell())
+
+    return offsets
+
+
+def _unpack_value(view, start, end):
+    '''Unpacks a single msgpack value. Binary values are returned as a
+    memoryview without copying the data'''
+    bin_header = _BIN_HEADERS.get(view[start])
+    if bin_header is not None:
+        header_size = 1 + struct.calcsize(bin_header)
+        return view[start + header_size:end]
+
+    return msgpack.unpackb(view[start:end], raw=False)
@@ -11,12 +11,17 @@ __status__ = "Experimental"
 
 import numpy as np
 import pandas as pd
+from mmtfPyspark.utils.arrayCache import CachedAttribute, register
 
 
 class MmtfChain(object):
 
+    # the dataframe is kept in the per-process array cache (see arrayCache)
+    df = CachedAttribute()
+
     def __init__(self, structure, chain_name):
         """Extracts the specified polymer chain from a structure"""
+        register(self)
         self.structure = structure
         self.chain_name = chain_name
         self.start = None
@@ -60,6 +65,10 @@ class MmtfChain(object):
         # dataframes
         self.df = None
 
+    def __reduce__(self):
+        # the chain is extracted again from the (compactly pickled) structure
+        return MmtfChain, (self.structure, self.chain_name)
+
     @property
     def atom_id_list(self):
         """Return atom id list"""
@@ -68,22 +77,22 @@ class MmtfChain(object):
     @property
     def x_coord_list(self):
         """Return x coordinates"""
-        return self.structure.x_coord_list[self.start:self.end]
+        return self.coords[:, 0]
 
     @property
     def y_coord_list(self):
         """Return y coordinates"""
-        return self.structure.y_coord_list[self.start:self.end]
+        return self.coords[:, 1]
 
     @property
     def z_coord_list(self):
         """Return z coordinates"""
-        return self.structure.z_coord_list[self.start:self.end]
+        return self.coords[:, 2]
 
     @property
     def coords(self):
-        """Return 3xn coordinate array"""
-        return np.column_stack((self.x_coord_list, self.y_coord_list, self.z_coord_list))
+        """Return nx3 coordinate array (a view of the structure coordinates)"""
+        return self.structure.coords[self.start:self.end]
 
     @property
     def b_factor_list(self):
@@ -158,35 +167,38 @@ class MmtfChain(object):
         return self.structure.sequence_positions[self.start:self.end]
 
     def to_pandas(self, add_cols=None, multi_index=False):
-        if self.df is None:
-            self.df = pd.DataFrame({'chain_name': self.chain_names,
-                                    'chain_id': self.chain_ids,
-                                    'group_number': self.group_numbers,
-                                    'group_name': self.group_names,
-                                    'atom_name': self.atom_names,
-                                    'altloc': self.alt_loc_list,
-                                    'x': self.x_coord_list,
-                                    'y': self.y_coord_list,
-                                    'z': self.z_coord_list,
-                                    'o': self.occupancy_list,
-                                    'b': self.b_factor_list,
-                                    'element': self.elements,
-                                    'polymer': self.polymer,
-                                    })
+        df = self.df
+        if df is None:
+            df = pd.DataFrame({'chain_name': self.chain_names,
+                               'chain_id': self.chain_ids,
+                               'group_number': self.group_numbers,
+                               'group_name': self.group_names,
+                               'atom_name': self.atom_names,
+                               'altloc': self.alt_loc_list,
+                               'x': self.x_coord_list,
+                               'y': self.y_coord_list,
+                               'z': self.z_coord_list,
+                               'o': self.occupancy_list,
+                               'b': self.b_factor_list,
+                               'element': self.elements,
+                               'polymer': self.polymer,
+                               })
             if add_cols is not None:
                 if 'sequence_position' in add_cols:
-                    self.df['sequence_position'] = pd.Series(self.sequence_positions, index=self.df.index)
+                    df['sequence_position'] = pd.Series(self.sequence_positions, index=df.index)
                 if 'chem_comp_type' in add_cols:
-                    self.df['chem_comp_type'] = pd.Series(self.chem_comp_types, index=self.df.index)
+                    df['chem_comp_type'] = pd.Series(self.chem_comp_types, index=df.index)
                 if 'entity_index' in add_cols:
-                    self.df['entity_index'] = pd.Series(self.entity_indices, index=self.df.index)
+                    df['entity_index'] = pd.Series(self.entity_indices, index=df.index)
                 if 'entity_type' in add_cols:
-                    self.df['entity_type'] = pd.Series(self.entity_types, index=self.df.index)
+                    df['entity_type'] = pd.Series(self.entity_types, index=df.index)
 
             if multi_index:
-                self.df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+                df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+
+            self.df = df
 
-        return self.df
+        return df
 
     def entities_to_pandas(self):
         indices = np.unique(self.entity_indices)
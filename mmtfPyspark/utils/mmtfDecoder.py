@@ -9,11 +9,8 @@ __version__ = "0.3.7"
 __status__ = "experimental"
 
 import numpy as np
-from numba import jit
 from mmtfPyspark.utils import mmtfCodec
 
-USE_NUMBA = False
-
 #
 # Byte arrays in message pack are in big endian format, e.g. >i4.
 # Convert to little endian as expected by Python.
@@ -113,17 +110,7 @@ def _decode_type_9(input_data, field_name):
 
 
 def _decode_type_10(input_data, field_name):
-    # TODO debugging decoding error
-    return np.empty(1000, np.float32)
-    #return mmtfCodec.decode_array(input_data[field_name])
-    buffer = input_data[field_name]
-    #int_array = np.frombuffer(buffer[12:], '>i2').byteswap().newbyteorder()
-    int_array = np.frombuffer(buffer, '>i2', offset=12).byteswap().newbyteorder()
-    divisor = np.frombuffer(buffer[8:12], '>i').byteswap().newbyteorder()
-    if USE_NUMBA:
-        return (recursive_index_decode_jit(int_array, divisor)).astype(np.float32)
-    else:
-        return (recursive_index_decode(int_array, divisor)).astype(np.float32)
+    return mmtfCodec.decode_array(input_data[field_name])
 
 
 def run_length_decoder(in_array, n):
@@ -144,24 +131,6 @@ def run_length_decoder(in_array, n):
     return x
 
 
-@jit(nopython=True)
-def run_length_decoder_jit(x, n):
-    """Decodes a run length encoded array
-
-    Parameters
-    ----------
-    x : encoded array of integers (value, repeat pairs)
-    n : number of element in decoded array
-    """
-    y = np.empty(n)
-    start = 0
-    for i in range(0, x.shape[0] - 1, 2):
-        end = x[i + 1] + start
-        y[start:end] = x[i]
-        start = end
-    return y
-
-
 def recursive_index_decode(int_array, divisor=1000):
     """Unpack an array of integers using recursive indexing.
 
@@ -183,28 +152,6 @@ def recursive_index_decode(int_array, divisor=1000):
     return out_arr[(int_array != maximum) & (int_array != minimum)]
 
 
-@jit(nopython=True)
-def recursive_index_decode_jit(x, divisor):
-    """Unpack an array of integers using recursive indexing.
-
-    Parameters
-    ----------
-    x : list
-       the input array of integers
-    divisor : int
-       the number used for decoding [1000]
-
-    Returns
-    -------
-    numpy.array
-       return the numpy.array of integers after recursive index decoding
-    """
-    maximum = 32767
-    minimum = -32768
-    y = np.cumsum(x) / divisor
-    return y[(x != maximum) & (x != minimum)]
-
-
 def run_length_decoder_ascii(x, n):
     """Decodes a run length encoded array
 
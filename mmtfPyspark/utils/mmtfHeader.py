@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+'''mmtfHeader.py
+
+Lightweight record of the scalar header fields of an MMTF structure.
+Header records are used to quickly pre-filter structures by metadata,
+e.g. resolution, experimental method, or release date, without
+decoding any of the atom, group, or chain level data. The full
+structure is decoded on demand from the retained msgpack data.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+from mmtfPyspark.utils import mmtfDecoder, MmtfBuffer, MmtfStructure
+
+
+class MmtfHeader(object):
+    '''Header fields of an MMTF structure. The attribute names match the
+    corresponding attributes of :class:`MmtfStructure <mmtfPyspark.utils.MmtfStructure>`,
+    so that header-based filters (e.g. Resolution, RFree, ExperimentalMethods,
+    ReleaseDate, DepositionDate) can be applied to either representation.
+
+    Note, the counts (num_atoms, num_groups, ...) refer to the entire entry,
+    even if the structure is later decoded with first_model=True.
+
+    Parameters
+    ----------
+    input_data : bytes or MmtfBuffer
+       msgpack encoded MMTF data
+    first_model : bool
+       default value of first_model used by :meth:`to_structure`
+
+    Examples
+    --------
+    Pre-filter high-resolution X-ray structures and decode only those entries
+
+    >>> pdb = mmtfReader.read_sequence_file(path, metadata_only=True)
+    >>> pdb = pdb.filter(Resolution(0.0, 2.0)) \\
+    ...          .filter(ExperimentalMethods(ExperimentalMethods.X_RAY_DIFFRACTION)) \\
+    ...          .mapValues(lambda h: h.to_structure())
+    '''
+
+    def __init__(self, input_data, first_model=False):
+        if not isinstance(input_data, MmtfBuffer):
+            input_data = MmtfBuffer(input_data)
+        self.input_data = input_data
+        self.first_model = first_model
+
+        self.mmtf_version = mmtfDecoder.get_value(input_data, 'mmtfVersion', required=True)
+        self.mmtf_producer = mmtfDecoder.get_value(input_data, 'mmtfProducer', required=True)
+        self.unit_cell = mmtfDecoder.get_value(input_data, 'unitCell')
+        self.space_group = mmtfDecoder.get_value(input_data, 'spaceGroup')
+        self.structure_id = mmtfDecoder.get_value(input_data, 'structureId')
+        self.title = mmtfDecoder.get_value(input_data, 'title')
+        self.deposition_date = mmtfDecoder.get_value(input_data, 'depositionDate')
+        self.release_date = mmtfDecoder.get_value(input_data, 'releaseDate')
+        self.experimental_methods = mmtfDecoder.get_value(input_data, 'experimentalMethods')
+        self.resolution = mmtfDecoder.get_value(input_data, 'resolution')
+        self.r_free = mmtfDecoder.get_value(input_data, 'rFree')
+        self.r_work = mmtfDecoder.get_value(input_data, 'rWork')
+        self.num_bonds = mmtfDecoder.get_value(input_data, 'numBonds', required=True)
+        self.num_atoms = mmtfDecoder.get_value(input_data, 'numAtoms', required=True)
+        self.num_groups = mmtfDecoder.get_value(input_data, 'numGroups', required=True)
+        self.num_chains = mmtfDecoder.get_value(input_data, 'numChains', required=True)
+        self.num_models = mmtfDecoder.get_value(input_data, 'numModels', required=True)
+
+    def to_structure(self, first_model=None):
+        '''Decodes the full structure
+
+        Parameters
+        ----------
+        first_model : bool, optional
+           use only the first model, defaults to the value given in the constructor
+
+        Returns
+        -------
+        MmtfStructure
+           decoded structure
+        '''
+        if first_model is None:
+            first_model = self.first_model
+        return MmtfStructure(self.input_data, first_model)
@@ -9,15 +9,19 @@ __maintainer__ = "Peter Rose"
 __version__ = "0.4.0"
 __status__ = "Experimental"
 
-import numpy as np
 import pandas as pd
+from mmtfPyspark.utils.arrayCache import CachedAttribute, register
 from mmtfPyspark.utils import MmtfChain
 
 
 class MmtfModel(object):
 
+    # the dataframe is kept in the per-process array cache (see arrayCache)
+    df = CachedAttribute()
+
     def __init__(self, structure, model_number):
         """Extracts the specified model from a structure"""
+        register(self)
         self.structure = structure
         self.model_number = model_number
         self.start = None
@@ -72,6 +76,10 @@ class MmtfModel(object):
         # dataframes
         self.df = None
 
+    def __reduce__(self):
+        # the model is extracted again from the (compactly pickled) structure
+        return MmtfModel, (self.structure, self.model_number)
+
     @property
     def atom_id_list(self):
         """Return atom id list"""
@@ -80,22 +88,22 @@ class MmtfModel(object):
     @property
     def x_coord_list(self):
         """Return x coordinates"""
-        return self.structure.x_coord_list[self.start:self.end]
+        return self.coords[:, 0]
 
     @property
     def y_coord_list(self):
         """Return y coordinates"""
-        return self.structure.y_coord_list[self.start:self.end]
+        return self.coords[:, 1]
 
     @property
     def z_coord_list(self):
         """Return z coordinates"""
-        return self.structure.z_coord_list[self.start:self.end]
+        return self.coords[:, 2]
 
     @property
     def coords(self):
-        """Return 3xn coordinate array"""
-        return np.column_stack((self.x_coord_list, self.y_coord_list, self.z_coord_list))
+        """Return nx3 coordinate array (a view of the structure coordinates)"""
+        return self.structure.coords[self.start:self.end]
 
     @property
     def b_factor_list(self):
@@ -182,27 +190,30 @@ class MmtfModel(object):
         return chains
 
     def to_pandas(self, multi_index=False):
-        if self.df is None:
-            self.df = pd.DataFrame({'chain_name': self.chain_names,
-                                    'chain_id': self.chain_ids,
-                                    'group_number': self.group_numbers,
-                                    'group_name': self.group_names,
-                                    'atom_name': self.atom_names,
-                                    'altloc': self.alt_loc_list,
-                                    'x': self.x_coord_list,
-                                    'y': self.y_coord_list,
-                                    'z': self.z_coord_list,
-                                    'o': self.occupancy_list,
-                                    'b': self.b_factor_list,
-                                    'element': self.elements,
-                                    'polymer': self.polymer,
-                                    #                               'entity': self.get_entity_indices(),
-                                    #                                   'seq_index': self.get_sequence_positions()
-                                    })
+        df = self.df
+        if df is None:
+            df = pd.DataFrame({'chain_name': self.chain_names,
+                               'chain_id': self.chain_ids,
+                               'group_number': self.group_numbers,
+                               'group_name': self.group_names,
+                               'atom_name': self.atom_names,
+                               'altloc': self.alt_loc_list,
+                               'x': self.x_coord_list,
+                               'y': self.y_coord_list,
+                               'z': self.z_coord_list,
+                               'o': self.occupancy_list,
+                               'b': self.b_factor_list,
+                               'element': self.elements,
+                               'polymer': self.polymer,
+                               #                               'entity': self.get_entity_indices(),
+                               #                                   'seq_index': self.get_sequence_positions()
+                               })
             if multi_index:
-                self.df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+                df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+
+            self.df = df
 
-        return self.df
+        return df
 
 
 
@@ -10,17 +10,171 @@ __email__ = "marshuang80@gmail.com"
 __version__ = "0.2.0"
 __status__ = "Done"
 
+import gzip
+import os
+import msgpack
 import numpy as np
 import pandas as pd
 import re
-from mmtfPyspark.utils import mmtfDecoder, MmtfChain, MmtfModel, Codec, AbstractStructure
+from mmtfPyspark.utils import mmtfDecoder, MmtfChain, MmtfModel, MmtfBuffer, Codec, AbstractStructure
+from mmtfPyspark.utils.arrayCache import CachedAttribute, register, get_cached, set_cached, get_cache, get_nbytes
+
+COORD_FIELDS = ('xCoordList', 'yCoordList', 'zCoordList')
+
+# Serialization of structures, e.g., when an RDD is cached, shuffled or joined:
+# * "raw": the msgpack encoded MMTF data, decoded lazily after unpickling (default)
+# * "gzip": gzip compressed msgpack data, smallest payload
+# * "arrays": the decoded arrays, no decoding after unpickling
+# Spark executors read the mode from the environment variable MMTF_PICKLE_MODE,
+# e.g., spark.executorEnv.MMTF_PICKLE_MODE=gzip.
+PICKLE_MODES = ('raw', 'gzip', 'arrays')
+_pickle_mode = os.environ.get('MMTF_PICKLE_MODE', 'raw')
+
+# per-atom arrays that are derived from the decoded lists, they are not pickled
+_DERIVED_ATTRIBUTES = ('_chain_names', '_chain_ids', '_group_ids', '_group_numbers', '_group_names',
+                       '_atom_names', '_elements', '_chem_comp_types', '_codes', '_polymer', '_entity_type',
+                       '_entity_indices', '_sequence_positions', '_group_serial', '_chain_serial')
+
+# decoded lists that are pickled in "arrays" mode
+_LIST_PROPERTIES = ('b_factor_list', 'occupancy_list', 'atom_id_list', 'alt_loc_list', 'group_id_list',
+                    'group_type_list', 'sec_struct_list', 'ins_code_list', 'sequence_index_list',
+                    'chain_id_list', 'chain_name_list', 'bond_atom_list', 'bond_order_list')
+
+
+def get_pickle_mode():
+    '''Returns the serialization mode of structures ("raw", "gzip", or "arrays")'''
+    return _pickle_mode
+
+
+def set_pickle_mode(mode):
+    '''Sets the serialization mode of structures in this Python process
+
+    Parameters
+    ----------
+    mode : str
+       "raw": pickle the msgpack encoded data and decode lazily after unpickling,
+       "gzip": pickle the gzip compressed msgpack encoded data,
+       "arrays": pickle the decoded arrays
+    '''
+    global _pickle_mode
+    if mode not in PICKLE_MODES:
+        raise ValueError("Unknown pickle mode: " + str(mode))
+    _pickle_mode = mode
 
 
 #class MmtfStructure(AbstractStructure):
 class MmtfStructure:
 
+    # atom column name -> name of the per-atom property
+    atom_cols = {'chain_name': 'chain_names',
+                 'chain_id': 'chain_ids',
+                 'group_number': 'group_numbers',
+                 'group_name': 'group_names',
+                 'atom_name': 'atom_names',
+                 'altloc': 'alt_loc_list',
+                 'x': 'x_coord_list',
+                 'y': 'y_coord_list',
+                 'z': 'z_coord_list',
+                 'o': 'occupancy_list',
+                 'b': 'b_factor_list',
+                 'element': 'elements',
+                 'polymer': 'polymer',
+                 'atom_id': 'atom_id_list',
+                 'group_id': 'group_ids',
+                 'chem_comp_type': 'chem_comp_types',
+                 'code': 'codes',
+                 'group_serial': 'group_serial',
+                 'entity_type': 'entity_types',
+                 'entity_index': 'entity_indices',
+                 'sequence_position': 'sequence_positions'}
+
+    # numpy data types of the atom columns
+    atom_col_dtypes = {'chain_name': np.object_,
+                       'chain_id': np.object_,
+                       'group_number': np.object_,
+                       'group_name': np.object_,
+                       'atom_name': np.object_,
+                       'altloc': np.str_,
+                       'x': np.float32,
+                       'y': np.float32,
+                       'z': np.float32,
+                       'o': np.float32,
+                       'b': np.float32,
+                       'element': np.object_,
+                       'polymer': np.bool_,
+                       'atom_id': np.int32,
+                       'group_id': np.int32,
+                       'chem_comp_type': np.object_,
+                       'code': np.object_,
+                       'group_serial': np.int32,
+                       'entity_type': np.object_,
+                       'entity_index': np.int32,
+                       'sequence_position': np.int32}
+
+    # atom columns that are available as dictionary-encoded arrays, see get_encoded()
+    encoded_cols = ['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name',
+                    'element', 'chem_comp_type', 'code', 'entity_type']
+
+    # group columns, see get_group_column() and to_group_pandas()
+    group_cols = ['chain_name', 'chain_id', 'chain_index', 'entity_index', 'entity_type', 'polymer',
+                  'group_number', 'group_name', 'group_id', 'ins_code', 'chem_comp_type', 'code',
+                  'sec_struct', 'sequence_position', 'atom_start', 'atom_end']
+
+    # group coordinate columns -> atom name, see get_group_coords(), None: centroid
+    group_coord_cols = {'ca': 'CA', 'p': 'P', 'centroid': None}
+
+    _chain_level_cols = ['chain_name', 'chain_id', 'entity_type']
+    _group_level_cols = {'group_name': 'groupName',
+                         'chem_comp_type': 'chemCompType',
+                         'code': 'singleLetterCode'}
+    _atom_level_cols = {'atom_name': 'atomNameList',
+                        'element': 'elementList'}
+
+    # decoded arrays and dataframes are kept in the per-process array cache
+    # (see arrayCache) and decoded again if they have been evicted
+    _x_coord_list = CachedAttribute()
+    _y_coord_list = CachedAttribute()
+    _z_coord_list = CachedAttribute()
+    _coords = CachedAttribute()
+    _b_factor_list = CachedAttribute()
+    _atom_id_list = CachedAttribute()
+    _alt_loc_list = CachedAttribute()
+    _occupancy_list = CachedAttribute()
+    _sec_struct_list = CachedAttribute()
+    _group_id_list = CachedAttribute()
+    _ins_code_list = CachedAttribute()
+    _sequence_index_list = CachedAttribute()
+    _chain_id_list = CachedAttribute()
+    _chain_name_list = CachedAttribute()
+    _bond_atom_list = CachedAttribute()
+    _bond_order_list = CachedAttribute()
+    _chain_names = CachedAttribute()
+    _chain_ids = CachedAttribute()
+    _group_ids = CachedAttribute()
+    _group_numbers = CachedAttribute()
+    _group_names = CachedAttribute()
+    _atom_names = CachedAttribute()
+    _elements = CachedAttribute()
+    _chem_comp_types = CachedAttribute()
+    _codes = CachedAttribute()
+    _polymer = CachedAttribute()
+    _entity_type = CachedAttribute()
+    _entity_indices = CachedAttribute()
+    _sequence_positions = CachedAttribute()
+    _group_serial = CachedAttribute()
+    _chain_serial = CachedAttribute()
+    df = CachedAttribute()
+
     def __init__(self, input_data, first_model=False):
-        """Decodes a msgpack unpacked data to mmtf structure"""
+        """Decodes a msgpack unpacked data to mmtf structure.
+
+        The input data can either be a dictionary of unpacked msgpack data or
+        the raw msgpack encoded bytes. In the latter case, fields are located
+        with a single scan of the buffer and only decoded on first access.
+        """
+        if isinstance(input_data, (bytes, bytearray, memoryview)):
+            input_data = MmtfBuffer(input_data)
+        register(self)
         self.input_data = input_data
 
         self.mmtf_version = mmtfDecoder.get_value(input_data, 'mmtfVersion', required=True)
@@ -32,8 +186,8 @@ class MmtfStructure:
         self.deposition_date = mmtfDecoder.get_value(input_data, 'depositionDate')
         self.release_date = mmtfDecoder.get_value(input_data, 'releaseDate')
         self.ncs_operator_list = mmtfDecoder.get_value(input_data, 'ncsOperatorList')
-        self.bio_assembly = mmtfDecoder.get_value(input_data, 'bioAssemblyList')  # TODO naming inconsistency
-        self.entity_list = mmtfDecoder.get_value(input_data, 'entityList')
+        self._bio_assembly = None
+        self._entity_list = None
         self.experimental_methods = mmtfDecoder.get_value(input_data, 'experimentalMethods')
         self.resolution = mmtfDecoder.get_value(input_data, 'resolution')
         self.r_free = mmtfDecoder.get_value(input_data, 'rFree')
@@ -43,53 +197,22 @@ class MmtfStructure:
         self.num_groups = mmtfDecoder.get_value(input_data, 'numGroups', required=True)
         self.num_chains = mmtfDecoder.get_value(input_data, 'numChains', required=True)
         self._num_models = mmtfDecoder.get_value(input_data, 'numModels', required=True)
-        self.group_list = mmtfDecoder.get_value(input_data, 'groupList', required=True)
-        self._bond_atom_list = None
-        self._bond_order_list = None
+        self._group_list = None
         self._bondResonanceList = None  # TODO
-        self._x_coord_list = None
-        self._y_coord_list = None
-        self._z_coord_list = None
-        self._b_factor_list = None
-        self._atom_id_list = None
-        self._alt_loc_list = None
-        self._occupancy_list = None
-        self._sec_struct_list = None
-        self._group_id_list = None
+        self._bond_mask = None  # bonds of the first model
         self._group_type_list = None
-        self._ins_code_list = None
-        self._sequence_index_list = None
-        self._chain_id_list = None
-        self._chain_name_list = None
         self.groups_per_chain = mmtfDecoder.get_value(input_data, 'groupsPerChain', required=True)
         self.chains_per_model = mmtfDecoder.get_value(input_data, 'chainsPerModel', required=True)
-        # calculated atom level data
-        self._chain_names = None
-        self._chain_ids = None
-        self._group_ids = None
-        self._group_numbers = None
-        self._group_names = None
-        self._atom_names = None
-        self._elements = None
-        self._chem_comp_types = None
-        self._codes = None
-        self._polymer = None
-        self._entity_type = None
-        self._entity_indices = None
-        self._sequence_positions = None
+        # decoded lists and calculated atom level data are cached attributes (see above)
         # calculated indices
-        self.groupToAtomIndices = None
-        self.chainToAtomIndices = None
-        self.chainToGroupIndices = None
-        self.modelToAtomIndices = None
-        self.modelToGroupIndices = None
-        self.modelToChainIndices = None
-        self._group_serial = None
-        self._chain_serial = None
+        self._groupToAtomIndices = None
+        self._chainToAtomIndices = None
+        self._chainToGroupIndices = None
+        self._modelToAtomIndices = None
+        self._modelToGroupIndices = None
+        self._modelToChainIndices = None
         self._chain_entity_index = None
         self.chainIdToEntityIndices = None
-        # precalculate indices
-        # TODO
         self.truncated = False
         if first_model and self._num_models != 1:
             self.num_models = 1
@@ -98,34 +221,75 @@ class MmtfStructure:
             self.num_models = self._num_models
 
         self.decoder = Codec()
+        self._entityChainIndex = None
+        # indices are calculated on first access, except for truncated
+        # structures, where they are required to update the atom, group and chain counts
+        if self.truncated:
+            self.calc_indices()
+
+    def __reduce__(self):
+        """Pickles the structure in the mode selected with :func:`set_pickle_mode`.
+        Cached dataframes and derived per-atom arrays are never pickled.
+        Structures that were unpickled from decoded arrays no longer have the
+        encoded data and are always pickled with their decoded arrays."""
+        if _pickle_mode == 'arrays' or not self._has_encoded_data():
+            return object.__new__, (MmtfStructure,), self._get_array_state()
+
+        if isinstance(self.input_data, MmtfBuffer):
+            data = self.input_data.data
+        else:
+            data = msgpack.packb(dict(self.input_data), use_bin_type=True)
+        compressed = _pickle_mode == 'gzip'
+        if compressed:
+            data = gzip.compress(data, compresslevel=1)
+        return _from_msgpack, (data, self.truncated, compressed)
+
+    def _has_encoded_data(self):
+        # structures unpickled from the arrays state are not registered with the
+        # array cache, and only keep the fields of the input data that are not binary
+        return '_cache_id' in self.__dict__
+
+    def _get_array_state(self):
+        # decoded lists, so that the encoded fields are no longer needed
         self.calc_indices()
-        self.entityChainIndex = None
         self.chain_to_entity_index()
+        state = {k: v for k, v in self.__dict__.items()
+                 if k not in _DERIVED_ATTRIBUTES and k not in ('df', '_cache_id')
+                 and not k.startswith(('_encoded_', '_group_col_', '_group_coords_'))}
+        for name in _LIST_PROPERTIES:
+            state['_' + name] = getattr(self, name)
+        if all(field_name in self.input_data for field_name in COORD_FIELDS):
+            state['_coords'] = self.coords
+        else:
+            for name in ('x_coord_list', 'y_coord_list', 'z_coord_list'):
+                state['_' + name] = getattr(self, name)
+
+        state['input_data'] = {k: v for k, v in self.input_data.items() if not isinstance(v, (bytes, memoryview))}
+        return state
 
-        # dataframes
-        self.df = None
-
-        self.atom_cols = {'chain_name': 'chain_names',
-                          'chain_id': 'chain_ids',
-                          'group_number': 'group_numbers',
-                          'group_name': 'group_names',
-                          'atom_name': 'atom_names',
-                          'altloc': 'alt_loc_list',
-                          'x': 'x_coord_list',
-                          'y': 'y_coord_list',
-                          'z': 'z_coord_list',
-                          'o': 'occupancy_list',
-                          'b': 'b_factor_list',
-                          'element': 'elements',
-                          'polymer': 'polymer',
-                          'atom_id': 'atom_id_list',
-                          'group_id:': 'group_ids',
-                          'chem_comp_type': 'chem_comp_type',
-                          'code': 'codes',
-                          'group_serial': 'group_serials',
-                          'entity_type': 'entity_type',
-                          'entity_index': 'entity_indices',
-                          'sequence_position': 'sequence_positions'}
+    def nbytes(self):
+        '''Returns the number of bytes of the data of this structure that is
+        resident in memory: the encoded input data, the calculated indices, and
+        the decoded arrays in the array cache.
+
+        Returns
+        -------
+        dict
+           name -> number of bytes
+        '''
+        if isinstance(self.input_data, MmtfBuffer):
+            sizes = {'input_data': len(self.input_data.data)}
+        else:
+            sizes = {'input_data': sum(get_nbytes(v) for v in self.input_data.values())}
+
+        owner = self.__dict__.get('_cache_id')
+        for name, value in self.__dict__.items():
+            size = get_nbytes(value)
+            if size > 0 and name != 'input_data':
+                sizes[name] = size
+        if owner is not None:
+            sizes.update(get_cache().owner_nbytes(owner))
+        return sizes
 
     def atom_column_names(self):
         """ Return names of atom columns for pandas """
@@ -140,15 +304,75 @@ class MmtfStructure:
                     cols.add(col_name)
         return cols
 
+    @property
+    def group_list(self):
+        if self._group_list is None:
+            self._group_list = mmtfDecoder.get_value(self.input_data, 'groupList', required=True)
+        return self._group_list
+
+    @property
+    def entity_list(self):
+        if self._entity_list is None:
+            self._entity_list = mmtfDecoder.get_value(self.input_data, 'entityList')
+            if self.truncated and self._entity_list is not None:
+                self._entity_list = _first_model_entities(self._entity_list, self.num_chains)
+        return self._entity_list
+
+    @property
+    def bio_assembly(self):
+        # TODO naming inconsistency
+        if self._bio_assembly is None:
+            self._bio_assembly = mmtfDecoder.get_value(self.input_data, 'bioAssemblyList')
+        return self._bio_assembly
+
+    # calculated indices
+    @property
+    def groupToAtomIndices(self):
+        self.calc_indices()
+        return self._groupToAtomIndices
+
+    @property
+    def chainToAtomIndices(self):
+        self.calc_indices()
+        return self._chainToAtomIndices
+
+    @property
+    def chainToGroupIndices(self):
+        self.calc_indices()
+        return self._chainToGroupIndices
+
+    @property
+    def modelToAtomIndices(self):
+        self.calc_indices()
+        return self._modelToAtomIndices
+
+    @property
+    def modelToGroupIndices(self):
+        self.calc_indices()
+        return self._modelToGroupIndices
+
+    @property
+    def modelToChainIndices(self):
+        self.calc_indices()
+        return self._modelToChainIndices
+
+    @property
+    def entityChainIndex(self):
+        self.chain_to_entity_index()
+        return self._entityChainIndex
+
     @property
     def bond_atom_list(self):
         if self._bond_atom_list is not None:
             return self._bond_atom_list
         elif 'bondAtomList' in self.input_data:
-            self._bond_atom_list = self.decoder.decode_array(self.input_data['bondAtomList'])
-            # TODO
-            # if self.truncated: # truncate bond list ...
-            return self._bond_atom_list
+            bond_atom_list = self.decoder.decode_array(self.input_data['bondAtomList'])
+            if self.truncated:
+                bond_atoms = bond_atom_list.reshape(-1, 2)
+                self._bond_mask = (bond_atoms < self.num_atoms).all(axis=1)
+                bond_atom_list = bond_atoms[self._bond_mask].ravel()
+            self._bond_atom_list = bond_atom_list
+            return bond_atom_list
         else:
             return None
 
@@ -157,72 +381,78 @@ class MmtfStructure:
         if self._bond_order_list is not None:
             return self._bond_order_list
         elif 'bondOrderList' in self.input_data:
-            self._bond_order_list = self.decoder.decode_array(self.input_data['bondOrderList'])
-            # TODO
-            # if self.truncated: # truncate bond list ...
-            return self._bond_order_list
+            bond_order_list = self.decoder.decode_array(self.input_data['bondOrderList'])
+            if self.truncated and self.bond_atom_list is not None:
+                bond_order_list = bond_order_list[self._bond_mask]
+            self._bond_order_list = bond_order_list
+            return bond_order_list
         else:
             return None
 
+    def _decode(self, field_name, limit):
+        '''Decodes a field. If the structure is truncated to the first model, only
+        the first limit values are decoded.'''
+        return self.decoder.decode_array(self.input_data[field_name], limit if self.truncated else None)
+
     @property
     def occupancy_list(self):
         if self._occupancy_list is not None:
             return self._occupancy_list
         elif 'occupancyList' in self.input_data:
-            self._occupancy_list = self.decoder.decode_array(self.input_data['occupancyList'])
-            if self.truncated:
-                self._occupancy_list = self._occupancy_list[:self.num_atoms]
+            self._occupancy_list = self._decode('occupancyList', self.num_atoms)
 
             return self._occupancy_list
         else:
             return None
     @property
-    def x_coord_list(self):
-        if self._x_coord_list is not None:
-            return self._x_coord_list
-        elif 'xCoordList' in self.input_data:
-            self._x_coord_list = self.decoder.decode_array(self.input_data['xCoordList'])
-            if self.truncated:
-                self._x_coord_list = self._x_coord_list[:self.num_atoms]
+    def coords(self):
+        '''Returns the atom coordinates as a C-contiguous float32 array with
+        shape (num_atoms, 3). The array is decoded once and kept in the array
+        cache, and the x_coord_list, y_coord_list, and z_coord_list are views
+        of its columns.
+        '''
+        coords = self._coords
+        if coords is None:
+            coords = np.empty((self.num_atoms, 3), dtype=np.float32)
+            for i, field_name in enumerate(COORD_FIELDS):
+                self.decoder.decode_array_into(self.input_data[field_name], coords[:, i])
+            self._coords = coords
+
+        return coords
+
+    def _coord_column(self, axis, field_name):
+        coords = self._coords
+        if coords is None and all(f in self.input_data for f in COORD_FIELDS):
+            coords = self.coords
+        if coords is not None:
+            return coords[:, axis]
+
+        # only some coordinates are available, e.g. after column pruning
+        name = '_' + 'xyz'[axis] + '_coord_list'
+        values = getattr(self, name)
+        if values is None and field_name in self.input_data:
+            values = self.decoder.decode_array(self.input_data[field_name], self.num_atoms)
+            setattr(self, name, values)
+        return values
 
-            return self._x_coord_list
-        else:
-            return None
+    @property
+    def x_coord_list(self):
+        return self._coord_column(0, 'xCoordList')
 
     @property
     def y_coord_list(self):
-        if self._y_coord_list is not None:
-            return self._y_coord_list
-        elif 'yCoordList' in self.input_data:
-            self._y_coord_list = self.decoder.decode_array(self.input_data['yCoordList'])
-            if self.truncated:
-                self._y_coord_list = self._y_coord_list[:self.num_atoms]
-
-            return self._y_coord_list
-        else:
-            return None
+        return self._coord_column(1, 'yCoordList')
 
     @property
     def z_coord_list(self):
-        if self._z_coord_list is not None:
-            return self._z_coord_list
-        elif 'zCoordList' in self.input_data:
-            self._z_coord_list = self.decoder.decode_array(self.input_data['zCoordList'])
-            if self.truncated:
-                self._z_coord_list = self._z_coord_list[:self.num_atoms]
-
-            return self._z_coord_list
-        else:
-            return None
+        return self._coord_column(2, 'zCoordList')
 
     @property
     def b_factor_list(self):
         if self._b_factor_list is not None:
             return self._b_factor_list
         elif 'bFactorList' in self.input_data:
-            self._b_factor_list = self.decoder.decode_array(self.input_data['bFactorList'])
-            if self.truncated:
-                self._b_factor_list = self._b_factor_list[:self.num_atoms]
+            self._b_factor_list = self._decode('bFactorList', self.num_atoms)
 
             return self._b_factor_list
         else:
@@ -233,9 +463,7 @@ class MmtfStructure:
         if self._atom_id_list is not None:
             return self._atom_id_list
         elif 'atomIdList' in self.input_data:
-            self._atom_id_list = self.decoder.decode_array(self.input_data['atomIdList'])
-            if self.truncated:
-                self._atom_id_list = self._atom_id_list[:self.num_atoms]
+            self._atom_id_list = self._decode('atomIdList', self.num_atoms)
 
             return self._atom_id_list
         else:
@@ -246,9 +474,7 @@ class MmtfStructure:
         if self._alt_loc_list is not None:
             return self._alt_loc_list
         elif 'altLocList' in self.input_data:
-            self._alt_loc_list = self.decoder.decode_array(self.input_data['altLocList'])
-            if self.truncated:
-                self._alt_loc_list = self._alt_loc_list[:self.num_atoms]
+            self._alt_loc_list = self._decode('altLocList', self.num_atoms)
 
             return self._alt_loc_list
         else:
@@ -259,9 +485,7 @@ class MmtfStructure:
         if self._group_id_list is not None:
             return self._group_id_list
         elif 'groupIdList' in self.input_data:
-            self._group_id_list = self.decoder.decode_array(self.input_data['groupIdList'])
-            if self.truncated:
-                self._group_id_list = self._group_id_list[:self.num_groups]
+            self._group_id_list = self._decode('groupIdList', self.num_groups)
 
             return self._group_id_list
         else:
@@ -272,9 +496,7 @@ class MmtfStructure:
         if self._group_type_list is not None:
             return self._group_type_list
         elif 'groupTypeList' in self.input_data:
-            self._group_type_list = self.decoder.decode_array(self.input_data['groupTypeList'])
-            if self.truncated:
-                self._group_type_list = self._group_type_list[:self.num_groups]
+            self._group_type_list = self._decode('groupTypeList', self.num_groups)
 
             return self._group_type_list
         else:
@@ -285,9 +507,7 @@ class MmtfStructure:
         if self._sec_struct_list is not None:
             return self._sec_struct_list
         elif 'secStructList' in self.input_data:
-            self._sec_struct_list = self.decoder.decode_array(self.input_data['secStructList'])
-            if self.truncated:
-                self._sec_struct_list = self._sec_struct_list[:self.num_groups]
+            self._sec_struct_list = self._decode('secStructList', self.num_groups)
 
             return self._sec_struct_list
         else:
@@ -298,9 +518,7 @@ class MmtfStructure:
         if self._ins_code_list is not None:
             return self._ins_code_list
         elif 'insCodeList' in self.input_data:
-            self._ins_code_list = self.decoder.decode_array(self.input_data['insCodeList'])
-            if self.truncated:
-                self._ins_code_list = self._ins_code_list[:self.num_groups]
+            self._ins_code_list = self._decode('insCodeList', self.num_groups)
 
             return self._ins_code_list
         else:
@@ -311,9 +529,7 @@ class MmtfStructure:
         if self._sequence_index_list is not None:
             return self._sequence_index_list
         elif 'sequenceIndexList' in self.input_data:
-            self._sequence_index_list = self.decoder.decode_array(self.input_data['sequenceIndexList'])
-            if self.truncated:
-                self._sequence_index_list = self._sequence_index_list[:self.num_groups]
+            self._sequence_index_list = self._decode('sequenceIndexList', self.num_groups)
 
             return self._sequence_index_list
         else:
@@ -324,9 +540,7 @@ class MmtfStructure:
         if self._chain_id_list is not None:
             return self._chain_id_list
         elif 'chainIdList' in self.input_data:
-            self._chain_id_list = self.decoder.decode_array(self.input_data['chainIdList'])
-            if self.truncated:
-                self._chain_id_list = self._chain_id_list[:self.num_chains]
+            self._chain_id_list = self._decode('chainIdList', self.num_chains)
 
             return self._chain_id_list
         else:
@@ -337,229 +551,382 @@ class MmtfStructure:
         if self._chain_name_list is not None:
             return self._chain_name_list
         elif 'chainNameList' in self.input_data:
-            self._chain_name_list = self.decoder.decode_array(self.input_data['chainNameList'])
-            if self.truncated:
-                self._chain_name_list = self._chain_name_list[:self.num_chains]
+            self._chain_name_list = self._decode('chainNameList', self.num_chains)
 
             return self._chain_name_list
         else:
             return None
 
     # calculated atom level data
+    def get_encoded(self, col):
+        '''Returns a dictionary-encoded atom column. The values are derived
+        from the group list and group type list, without creating a Python
+        string for each atom.
+
+        Parameters
+        ----------
+        col : str
+           name of the atom column, one of :attr:`encoded_cols`
+
+        Returns
+        -------
+        tuple
+           (codes, vocabulary), where codes is an integer array with the
+           index into the vocabulary for each atom, and vocabulary is an
+           array of the sorted unique values
+
+        Examples
+        --------
+        >>> codes, vocabulary = structure.get_encoded('group_name')
+        >>> is_water = np.isin(vocabulary, ['HOH', 'DOD'])[codes]
+        '''
+        encoded = get_cached(self, '_encoded_' + col)
+        if encoded is None:
+            if col in self._chain_level_cols:
+                values = self._chain_level_values(col)
+                vocabulary, chain_codes = _encode(values)
+                codes = np.repeat(chain_codes, np.diff(self.chainToAtomIndices))
+
+            elif col == 'group_number':
+                vocabulary, group_codes = _encode(np.char.add(self.group_id_list.astype(str),
+                                                              self.ins_code_list.astype(str)))
+                codes = np.repeat(group_codes, np.diff(self.groupToAtomIndices))
+
+            elif col in self._group_level_cols:
+                values = [group[self._group_level_cols[col]] for group in self.group_list]
+                vocabulary, type_codes = _encode(values)
+                codes = np.repeat(type_codes[self.group_type_list], np.diff(self.groupToAtomIndices))
+
+            elif col in self._atom_level_cols:
+                lists = [group[self._atom_level_cols[col]] for group in self.group_list]
+                vocabulary, flat_codes = _encode([value for values in lists for value in values])
+
+                # index of each atom in the concatenated per group type lists
+                atoms_per_group = np.diff(self.groupToAtomIndices)
+                type_offsets = _cumsum_indices([len(values) for values in lists])[:-1]
+                group_starts = np.repeat(self.groupToAtomIndices[:-1], atoms_per_group)
+                atom_group_types = np.repeat(self.group_type_list, atoms_per_group)
+                index = type_offsets[atom_group_types] + np.arange(self.num_atoms) - group_starts
+                codes = flat_codes[index]
+
+            else:
+                raise ValueError("Atom column is not dictionary-encoded: " + col)
+
+            encoded = (codes.astype(np.int32, copy=False), vocabulary)
+            set_cached(self, '_encoded_' + col, encoded)
+
+        return encoded
+
+    def get_categorical(self, col):
+        '''Returns a dictionary-encoded atom column as a pandas Categorical
+
+        Parameters
+        ----------
+        col : str
+           name of the atom column, one of :attr:`encoded_cols`
+
+        Returns
+        -------
+        :obj:`Categorical <pandas.Categorical>`
+           atom column
+        '''
+        codes, vocabulary = self.get_encoded(col)
+        return pd.Categorical.from_codes(codes, categories=vocabulary)
+
+    def atom_mask(self, col, values):
+        '''Returns a boolean array that is True for atoms, where the
+        dictionary-encoded column has one of the specified values
+
+        Parameters
+        ----------
+        col : str
+           name of the atom column, one of :attr:`encoded_cols`
+        values : list
+           selected values
+
+        Returns
+        -------
+        :obj:`array <numpy.ndarray>`
+           mask of selected atoms
+        '''
+        codes, vocabulary = self.get_encoded(col)
+        return np.isin(vocabulary, list(values))[codes]
+
+    def _chain_level_values(self, col):
+        if col == 'chain_name':
+            return self.chain_name_list
+        elif col == 'chain_id':
+            return self.chain_id_list
+        else:
+            return [self.entity_list[index]['type'] for index in self.entityChainIndex]
+
+    def _decode_column(self, col):
+        codes, vocabulary = self.get_encoded(col)
+        return vocabulary[codes]
+
     @property
     def chain_names(self):
         if self._chain_names is None:
-            self._chain_names = np.empty(self.num_atoms, dtype=np.object)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                self._chain_names[start:end] = self.chain_name_list[i]
+            self._chain_names = self._decode_column('chain_name')
 
         return self._chain_names
 
     @property
     def chain_ids(self):
         if self._chain_ids is None:
-            self._chain_ids = np.empty(self.num_atoms, dtype=np.object)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                self._chain_ids[start:end] = self.chain_id_list[i]
+            self._chain_ids = self._decode_column('chain_id')
 
         return self._chain_ids
 
     @property
     def group_ids(self):
         if self._group_ids is None:
-            self._group_ids = np.empty(self.num_atoms, dtype=np.int32)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                self._group_ids[start:end] = self.group_id_list[i]
+            self._group_ids = np.repeat(self.group_id_list, np.diff(self.groupToAtomIndices)).astype(np.int32)
 
         return self._group_ids
 
     @property
     def group_numbers(self):
         if self._group_numbers is None:
-            self._group_numbers = np.empty(self.num_atoms, dtype=np.object)
-            codec, length, param, in_array = self.decoder.parse_header(self.input_data['insCodeList'])
-            if len(in_array) == 8:
-                # default length when there are no insertion codes
-                # self._group_numbers = self.group_ids.astype(str)
-                for i in range(self.num_groups):
-                    start = self.groupToAtomIndices[i]
-                    end = self.groupToAtomIndices[i + 1]
-                    self._group_numbers[start:end] = str(self.group_id_list[i])
-            else:
-                for i in range(self.num_groups):
-                    start = self.groupToAtomIndices[i]
-                    end = self.groupToAtomIndices[i + 1]
-                    self._group_numbers[start:end] = f'{self.group_id_list[i]}{self.ins_code_list[i]}'
+            self._group_numbers = self._decode_column('group_number')
 
         return self._group_numbers
 
     @property
     def group_names(self):
         if self._group_names is None:
-            self._group_names = np.empty(self.num_atoms, dtype=np.object)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                index = self.group_type_list[i]
-                self._group_names[start:end] = self.group_list[index]['groupName']
+            self._group_names = self._decode_column('group_name')
 
         return self._group_names
 
     @property
     def atom_names(self):
         if self._atom_names is None:
-            self._atom_names = np.empty(self.num_atoms, dtype=np.object)
-
-            start = 0
-            for index in self.group_type_list:
-                gl = self.group_list[index]['atomNameList']
-                end = start + len(gl)
-                self._atom_names[start:end] = gl
-                start = end
+            self._atom_names = self._decode_column('atom_name')
 
         return self._atom_names
 
     @property
     def elements(self):
         if self._elements is None:
-            self._elements = np.empty(self.num_atoms, dtype=np.object)
-
-            start = 0
-            for index in self.group_type_list:
-                gl = self.group_list[index]['elementList']
-                end = start + len(gl)
-                self._elements[start:end] = gl
-                start = end
+            self._elements = self._decode_column('element')
 
         return self._elements
 
     @property
     def chem_comp_types(self):
         if self._chem_comp_types is None:
-            self._chem_comp_types = np.empty(self.num_atoms, dtype=np.object_)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                index = self.group_type_list[i]
-                self._chem_comp_types[start:end] = self.group_list[index]['chemCompType']
+            self._chem_comp_types = self._decode_column('chem_comp_type')
 
         return self._chem_comp_types
 
     @property
     def codes(self):
         if self._codes is None:
-            self._codes = np.empty(self.num_atoms, dtype=np.object_)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                index = self.group_type_list[i]
-                self._codes[start:end] = self.group_list[index]['singleLetterCode']
+            self._codes = self._decode_column('code')
 
         return self._codes
 
     @property
     def group_serial(self):
         if self._group_serial is None:
-            self._group_serial = np.empty(self.num_atoms, dtype=np.int32)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                self._group_serial[start:end] = i
+            atoms_per_group = np.diff(self.groupToAtomIndices)
+            self._group_serial = np.repeat(np.arange(self.num_groups, dtype=np.int32), atoms_per_group)
 
         return self._group_serial
 
     @property
     def polymer(self):
         if self._polymer is None:
-            self._polymer = np.empty(self.num_atoms, dtype=np.bool)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                index = self.entityChainIndex[i]
-                self._polymer[start:end] = self.entity_list[index]['type'] == 'polymer'
+            is_polymer = np.array([entity['type'] == 'polymer' for entity in self.entity_list], dtype=bool)
+            self._polymer = np.repeat(is_polymer[self.entityChainIndex], np.diff(self.chainToAtomIndices))
 
         return self._polymer
 
     @property
     def entity_types(self):
         if self._entity_type is None:
-            self._entity_type = np.empty(self.num_atoms, dtype=np.object_)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                index = self.entityChainIndex[i]
-                self._entity_type[start:end] = self.entity_list[index]['type']
+            self._entity_type = self._decode_column('entity_type')
 
         return self._entity_type
 
     @property
     def entity_indices(self):
         if self._entity_indices is None:
-            self._entity_indices = np.empty(self.num_atoms, dtype=np.int32)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                self._entity_indices[start:end] = self.entityChainIndex[i]
+            self._entity_indices = np.repeat(self.entityChainIndex, np.diff(self.chainToAtomIndices))
 
         return self._entity_indices
 
     @property
     def chain_serial(self):
         if self._chain_serial is None:
-            self._chain_serial = np.empty(self.num_atoms, dtype=np.int32)
-
-            for i in range(self.num_chains):
-                start = self.chainToAtomIndices[i]
-                end = self.chainToAtomIndices[i + 1]
-                self._chain_serial[start:end] = i
+            atoms_per_chain = np.diff(self.chainToAtomIndices)
+            self._chain_serial = np.repeat(np.arange(self.num_chains, dtype=np.int32), atoms_per_chain)
 
         return self._chain_serial
 
     @property
     def sequence_positions(self):
         if self._sequence_positions is None:
-            self._sequence_positions = np.empty(self.num_atoms, dtype=np.int32)
-
-            for i in range(self.num_groups):
-                start = self.groupToAtomIndices[i]
-                end = self.groupToAtomIndices[i + 1]
-                self._sequence_positions[start:end] = self.sequence_index_list[i]
+            sequence_index_list = np.asarray(self.sequence_index_list, dtype=np.int32)
+            self._sequence_positions = np.repeat(sequence_index_list, np.diff(self.groupToAtomIndices))
 
         return self._sequence_positions
 
+    # calculated group level data
+    def get_group_column(self, col):
+        '''Returns a group-level column with one value for each group, e.g.,
+        residue. The values are derived from the group type list and the
+        chain and group indices, without expanding them to atoms.
+
+        Parameters
+        ----------
+        col : str
+           name of the group column, one of :attr:`group_cols`
+
+        Returns
+        -------
+        :obj:`array <numpy.ndarray>`
+           group column
+
+        Examples
+        --------
+        >>> start = structure.get_group_column('atom_start')
+        >>> end = structure.get_group_column('atom_end')
+        >>> atoms_per_group = end - start
+        '''
+        values = get_cached(self, '_group_col_' + col)
+        if values is None:
+            if col == 'chain_index':
+                values = np.repeat(np.arange(self.num_chains, dtype=np.int32), np.diff(self.chainToGroupIndices))
+
+            elif col in self._chain_level_cols:
+                vocabulary, chain_codes = _encode(self._chain_level_values(col))
+                values = vocabulary[chain_codes][self.get_group_column('chain_index')]
+
+            elif col == 'entity_index':
+                values = self.entityChainIndex[self.get_group_column('chain_index')]
+
+            elif col == 'polymer':
+                is_polymer = np.array([entity['type'] == 'polymer' for entity in self.entity_list], dtype=bool)
+                values = is_polymer[self.get_group_column('entity_index')]
+
+            elif col == 'group_number':
+                values = np.char.add(self.group_id_list.astype(str), self.ins_code_list.astype(str)).astype(np.object_)
+
+            elif col in self._group_level_cols:
+                key = self._group_level_cols[col]
+                values = np.array([group[key] for group in self.group_list], dtype=np.object_)[self.group_type_list]
+
+            elif col == 'group_id':
+                values = np.asarray(self.group_id_list, dtype=np.int32)
+
+            elif col == 'ins_code':
+                values = self.ins_code_list
+
+            elif col == 'sec_struct':
+                values = np.asarray(self.sec_struct_list, dtype=np.int32)
+
+            elif col == 'sequence_position':
+                values = np.asarray(self.sequence_index_list, dtype=np.int32)
+
+            elif col == 'atom_start':
+                values = self.groupToAtomIndices[:-1]
+
+            elif col == 'atom_end':
+                values = self.groupToAtomIndices[1:]
+
+            else:
+                raise ValueError("Unknown group column: " + col)
+
+            set_cached(self, '_group_col_' + col, values)
+
+        return values
+
+    def get_group_coords(self, atom_name=None, polymer=False):
+        '''Returns the coordinates of an atom in each group, or the centroids
+        of the groups
+
+        Parameters
+        ----------
+        atom_name : str, optional
+           name of the atom, e.g., "CA" or "P", None: centroid of all atoms of a group
+        polymer : bool, optional
+           if True, only polymer groups have coordinates, e.g., to exclude calcium ions
+           for atom name "CA"
+
+        Returns
+        -------
+        :obj:`array <numpy.ndarray>`
+           float32 array with shape (num_groups, 3), NaN for groups without the atom
+        '''
+        key = '_group_coords_' + str(atom_name) + ('_polymer' if polymer else '')
+        group_coords = get_cached(self, key)
+        if group_coords is None:
+            start = self.get_group_column('atom_start')
+            coords = self.coords
+            if atom_name is None:
+                # sums of consecutive atoms from the cumulative sums
+                sums = np.zeros((self.num_atoms + 1, 3), dtype=np.float64)
+                np.cumsum(coords, axis=0, out=sums[1:])
+                counts = np.diff(self.groupToAtomIndices)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    group_coords = ((sums[start + counts] - sums[start]) / counts[:, np.newaxis]).astype(np.float32)
+            else:
+                # offset of the atom within each group type, -1 if it is not present
+                offsets = np.array([group['atomNameList'].index(atom_name) if atom_name in group['atomNameList']
+                                    else -1 for group in self.group_list], dtype=np.int32)[self.group_type_list]
+                found = offsets >= 0
+                if polymer:
+                    found &= self.get_group_column('polymer')
+                group_coords = np.full((self.num_groups, 3), np.nan, dtype=np.float32)
+                group_coords[found] = coords[start[found] + offsets[found]]
+
+            if polymer and atom_name is None:
+                group_coords[~self.get_group_column('polymer')] = np.nan
+
+            set_cached(self, key, group_coords)
+
+        return group_coords
+
+    def to_group_pandas(self, cols=None):
+        '''Returns a dataframe with one row for each group, e.g., residue
+
+        Parameters
+        ----------
+        cols : list, optional
+           names of group columns (:attr:`group_cols`) and coordinate columns
+           (:attr:`group_coord_cols`), None: all columns. A coordinate column,
+           e.g. "ca", adds the columns ca_x, ca_y, and ca_z. The C-alpha and
+           phosphorus coordinates are only set for polymer groups.
+
+        Returns
+        -------
+        :obj:`DataFrame <pandas.DataFrame>`
+           group dataframe
+        '''
+        if cols is None:
+            cols = self.group_cols + list(self.group_coord_cols)
+
+        columns = {}
+        for c in cols:
+            if c in self.group_coord_cols:
+                atom_name = self.group_coord_cols[c]
+                group_coords = self.get_group_coords(atom_name, polymer=atom_name is not None)
+                for axis, name in enumerate(['_x', '_y', '_z']):
+                    columns[c + name] = group_coords[:, axis]
+            else:
+                columns[c] = self.get_group_column(c)
+
+        return pd.DataFrame(columns)
+
     def to_pandas(self, add_cols=None, use_categories=False, multi_index=False):
         if self.df is None:
-            # pre-calculate required group-level data for efficiency
-            self.calc_core_group_data()
-            
             cols = self.atom_column_names()[:13]
             if add_cols is not None:
                 cols += add_cols
-                
-            self.df = self.to_atom_pandas(cols)
 
-            if use_categories:
-                self.df['chain_name'] = self.df['chain_name'].astype('category')
-                self.df['chain_id'] = self.df['chain_id'].astype('category')
-                self.df['group_name'] = self.df['group_name'].astype('category')
-                self.df['atom_name'] = self.df['atom_name'].astype('category')
-                self.df['element'] = self.df['element'].astype('category')
+            self.df = self.to_atom_pandas(cols, use_categories)
 
             if multi_index:
                 self.df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'],
@@ -567,9 +934,16 @@ class MmtfStructure:
 
         return self.df
 
-    def to_atom_pandas(self, cols=None):
-        """ Return a pandas dataframe with the specified atom column names"""
-        columns = {c: getattr(self, self.atom_cols.get(c)) for c in cols}
+    def to_atom_pandas(self, cols=None, use_categories=False):
+        """ Return a pandas dataframe with the specified atom column names.
+        If use_categories is True, the dictionary-encoded columns are
+        returned as categoricals without creating the string arrays."""
+        columns = {}
+        for c in cols:
+            if use_categories and c in self.encoded_cols:
+                columns[c] = self.get_categorical(c)
+            else:
+                columns[c] = getattr(self, self.atom_cols.get(c))
 
         return pd.DataFrame(columns)
 
@@ -610,85 +984,40 @@ class MmtfStructure:
         return pd.DataFrame(cols)
 
     def calc_core_group_data(self):
-        if self._group_numbers is None or self._group_names is None or self._atom_names is None \
-                or self._elements is None:
-            codec, length, param, in_array = self.decoder.parse_header(self.input_data['insCodeList'])
-            no_ins_code = len(in_array) == 8
-            self._group_numbers = np.empty(self.num_atoms, dtype=np.object_)
-            self._group_names = np.empty(self.num_atoms, dtype=np.object_)
-            self._atom_names = np.empty(self.num_atoms, dtype=np.object_)
-            self._elements = np.empty(self.num_atoms, dtype=np.object_)
-
-            start = 0
-            i = 0
-            for index in self.group_type_list:
-                group = self.group_list[index]
-                gl = group['elementList']
-                end = start + len(gl)
-
-                self._elements[start:end] = gl
-                self._group_names[start:end] = group['groupName']
-                self._atom_names[start:end] = group['atomNameList']
-                if no_ins_code:
-                    # default length when there are no insertion codes
-                    self._group_numbers[start:end] = str(self.group_id_list[i])
-                else:
-                    # numba cannot handle the following line
-                    # self._group_numbers[start:end] = f'{self.group_id_list[i]}{self.ins_code_list[i]}'
-                    self._group_numbers[start:end] = str(self.group_id_list[i]) + self.ins_code_list[i]
-
-                start = end
-                i = i + 1
+        for col in ['group_number', 'group_name', 'atom_name', 'element']:
+            getattr(self, self.atom_cols[col])
 
     def calc_indices(self):
 
-        if self.groupToAtomIndices is None:
-
-            self._group_type_list = self.decoder.decode_array(self.input_data['groupTypeList'])
-            self.groupToAtomIndices = np.empty(self.num_groups + 1, dtype=np.int32)
-            self.chainToAtomIndices = np.empty(self.num_chains + 1, dtype=np.int32)
-            self.chainToGroupIndices = np.empty(self.num_chains + 1, dtype=np.int32)
-            self.modelToAtomIndices = np.empty(self.num_models + 1, dtype=np.int32)
-            self.modelToGroupIndices = np.empty(self.num_models + 1, dtype=np.int32)
-            self.modelToChainIndices = np.empty(self.num_models + 1, dtype=np.int32)
-
-            chainCount, groupCount, atomCount = 0, 0, 0
-
-            # Loop over all models
-            for m in range(self.num_models):
-                self.modelToAtomIndices[m] = atomCount
-                self.modelToGroupIndices[m] = groupCount
-                self.modelToChainIndices[m] = chainCount
-
-                # Loop over all chains
-                for i in range(self.chains_per_model[m]):
-                    self.chainToAtomIndices[chainCount] = atomCount
-                    self.chainToGroupIndices[chainCount] = groupCount
-
-                    # Loop over all groups in chain
-                    for _ in range(self.groups_per_chain[chainCount]):
-                        self.groupToAtomIndices[groupCount] = atomCount
-                        group_type = self.group_type_list[groupCount]
-                        atomCount += len(self.group_list[group_type]['elementList'])
-                        groupCount += 1
-
-                    chainCount += 1
-
-            self.groupToAtomIndices[groupCount] = atomCount
-            self.chainToAtomIndices[chainCount] = atomCount
-            self.chainToGroupIndices[chainCount] = groupCount
-            self.modelToAtomIndices[self.num_models] = atomCount
-            self.modelToGroupIndices[self.num_models] = groupCount
-            self.modelToChainIndices[self.num_models] = chainCount
+        if self._groupToAtomIndices is None:
+
+            # number of atoms for each group type
+            atoms_per_group_type = np.fromiter((len(group['elementList']) for group in self.group_list),
+                                               dtype=np.int32, count=len(self.group_list))
+
+            # model -> chain -> group -> atom boundaries as cumulative sums
+            chains_per_model = np.asarray(self.chains_per_model[:self.num_models], dtype=np.int32)
+            self._modelToChainIndices = _cumsum_indices(chains_per_model)
+            chainCount = self._modelToChainIndices[-1]
+
+            groups_per_chain = np.asarray(self.groups_per_chain[:chainCount], dtype=np.int32)
+            self._chainToGroupIndices = _cumsum_indices(groups_per_chain)
+            groupCount = self._chainToGroupIndices[-1]
+
+            # only the group types of the first model are decoded for truncated structures
+            self._group_type_list = self._decode('groupTypeList', int(groupCount))
+            atoms_per_group = atoms_per_group_type[self._group_type_list]
+            self._groupToAtomIndices = _cumsum_indices(atoms_per_group)
+            atomCount = self._groupToAtomIndices[-1]
+
+            self._chainToAtomIndices = self._groupToAtomIndices[self._chainToGroupIndices]
+            self._modelToGroupIndices = self._chainToGroupIndices[self._modelToChainIndices]
+            self._modelToAtomIndices = self._groupToAtomIndices[self._modelToGroupIndices]
 
             if self.truncated:
-                self._group_type_list = self._group_type_list[:groupCount]
-                self.groupToAtomIndices = self.groupToAtomIndices[:groupCount + 1]
-                self.chainToAtomIndices = self.chainToAtomIndices[:chainCount + 1]
-                self.chainToGroupIndices = self.chainToGroupIndices[:chainCount + 1]
-                self.num_atoms = atomCount
-                self.num_groups = groupCount
-                self.num_chains = chainCount
+                self.num_atoms = int(atomCount)
+                self.num_groups = int(groupCount)
+                self.num_chains = int(chainCount)
 
     def chain_to_entity_index(self):
         '''Returns an array that maps a chain index to an entity index
@@ -699,20 +1028,13 @@ class MmtfStructure:
            index that maps chain index to an entity index
         '''
 
-        if self.entityChainIndex is None:
-            self.entityChainIndex = np.empty(self.num_chains, dtype=np.int32)
+        if self._entityChainIndex is None:
+            self._entityChainIndex = np.empty(self.num_chains, dtype=np.int32)
 
             for i, entity in enumerate(self.entity_list):
-
-                #chainIndexList = entity['chainIndexList']
-                # pd.read_msgpack returns tuple, msgpack-python returns list
-                # TODO check this
-                #if type(chainIndexList) is not list:
-                #    chainIndexList = list(chainIndexList)
-                # TODO need to update entity_list when self.truncate
                 for index in entity['chainIndexList']:
                     if index < self.num_chains:
-                        self.entityChainIndex[index] = i
+                        self._entityChainIndex[index] = i
 
     def get_chain(self, chain_name):
         """Return specified polymer chain"""
@@ -739,3 +1061,34 @@ class MmtfStructure:
         return models
 
 
+def _encode(values):
+    '''Returns the sorted unique values as an object array and the index
+    of each value in the unique values'''
+    vocabulary, codes = np.unique(np.asarray(values, dtype=np.object_), return_inverse=True)
+    return vocabulary, codes
+
+
+def _from_msgpack(data, first_model, compressed):
+    '''Returns a structure from pickled msgpack data'''
+    if compressed:
+        data = gzip.decompress(data)
+    return MmtfStructure(MmtfBuffer(data), first_model)
+
+
+def _first_model_entities(entity_list, num_chains):
+    '''Returns copies of the entities with chains in the first model (the
+    first num_chains chains), restricted to these chains'''
+    entities = []
+    for entity in entity_list:
+        chain_indices = [index for index in entity['chainIndexList'] if index < num_chains]
+        if len(chain_indices) > 0:
+            entities.append(dict(entity, chainIndexList=chain_indices))
+    return entities
+
+
+def _cumsum_indices(counts):
+    '''Returns the start indices of consecutive blocks with the given sizes,
+    followed by the total size'''
+    indices = np.zeros(len(counts) + 1, dtype=np.int32)
+    np.cumsum(counts, out=indices[1:])
+    return indices
@@ -7,6 +7,7 @@ __status__ = "Experimental"
 
 import numpy as np
 import pandas as pd
+from mmtfPyspark.utils.arrayCache import CachedAttribute, register
 
 
 class MmtfSubstructure(object):
@@ -38,31 +39,32 @@ class MmtfSubstructure(object):
     >>> chain = MmtfSubstructure(structure, 'A', chain_names=['A'], entity_types=['polymer'])
     """
 
+    # the masked coordinates and the dataframe are kept in the per-process
+    # array cache (see arrayCache), the atom mask is kept with the substructure
+    _coords = CachedAttribute()
+    df = CachedAttribute()
+
     def __init__(self, structure, label, chain_names=None, chain_ids=None, group_names=None,
                  group_numbers=None, chem_comp_types=None, entity_types=None):
+        register(self)
         self.structure = structure
+        self._args = (label, chain_names, chain_ids, group_names, group_numbers, chem_comp_types, entity_types)
 
         # Apply criteria to select atoms
         self.mask = np.full(structure.num_atoms, True)
         if chain_names is not None:
-            self.mask = self.mask & np.in1d(structure.chain_names, list(chain_names))\
-                .reshape(structure.chain_names.shape)
+            self.mask = self.mask & structure.atom_mask('chain_name', chain_names)
         if chain_ids is not None:
-            self.mask = self.mask & np.in1d(structure.chain_ids, list(chain_ids))\
-                .reshape(structure.chain_ids.shape)
+            self.mask = self.mask & structure.atom_mask('chain_id', chain_ids)
         if group_names is not None:
-            self.mask = self.mask & np.in1d(structure.group_names, list(group_names))\
-                .reshape(structure.group_names.shape)
+            self.mask = self.mask & structure.atom_mask('group_name', group_names)
         if group_numbers is not None:
             # TODO this should be a range, e.g. tuple ('1',10),(20,30)
-            self.mask = self.mask & np.in1d(structure.group_numbers, list(group_numbers)) \
-                .reshape(structure.group_numbers.shape)
+            self.mask = self.mask & structure.atom_mask('group_number', group_numbers)
         if chem_comp_types is not None:
-            self.mask = self.mask & np.in1d(structure.chem_comp_types, list(chem_comp_types))\
-                .reshape(structure.chem_comp_types.shape)
+            self.mask = self.mask & structure.atom_mask('chem_comp_type', chem_comp_types)
         if entity_types is not None:
-            self.mask = self.mask & np.in1d(structure.entity_types, list(entity_types))\
-                .reshape(structure.entity_types.shape)
+            self.mask = self.mask & structure.atom_mask('entity_type', entity_types)
 
         # update counts
         self.num_atoms = np.count_nonzero(self.mask)
@@ -88,9 +90,14 @@ class MmtfSubstructure(object):
         self.resolution = structure.resolution
         self.r_free = structure.r_free
         self.r_work = structure.r_work
+        self._coords = None
         # dataframes
         self.df = None
 
+    def __reduce__(self):
+        # the atoms are selected again from the (compactly pickled) structure
+        return MmtfSubstructure, (self.structure,) + self._args
+
     @property
     def atom_id_list(self):
         """ndarray: atom id list."""
@@ -99,22 +106,26 @@ class MmtfSubstructure(object):
     @property
     def x_coord_list(self):
         """ndarray: x coordinates"""
-        return self.structure.x_coord_list[self.mask]
+        return self.coords[:, 0]
 
     @property
     def y_coord_list(self):
         """Return y coordinates"""
-        return self.structure.y_coord_list[self.mask]
+        return self.coords[:, 1]
 
     @property
     def z_coord_list(self):
         """Return z coordinates"""
-        return self.structure.z_coord_list[self.mask]
+        return self.coords[:, 2]
 
     @property
     def coords(self):
-        """Return 3xn coordinate array"""
-        return np.column_stack((self.x_coord_list, self.y_coord_list, self.z_coord_list))
+        """Return nx3 coordinate array"""
+        coords = self._coords
+        if coords is None:
+            coords = self.structure.coords[self.mask]
+            self._coords = coords
+        return coords
 
     @property
     def b_factor_list(self):
@@ -204,36 +215,39 @@ class MmtfSubstructure(object):
         return self.structure.chain_serial[self.mask]
 
     def to_pandas(self, add_cols=None, multi_index=False):
-        if self.df is None:
-            self.df = pd.DataFrame({'chain_name': self.chain_names,
-                                    'chain_id': self.chain_ids,
-                                    'group_number': self.group_numbers,
-                                    'group_name': self.group_names,
-                                    'atom_name': self.atom_names,
-                                    'altloc': self.alt_loc_list,
-                                    'x': self.x_coord_list,
-                                    'y': self.y_coord_list,
-                                    'z': self.z_coord_list,
-                                    'o': self.occupancy_list,
-                                    'b': self.b_factor_list,
-                                    'element': self.elements,
-                                    'polymer': self.polymer,
-                                    })
+        df = self.df
+        if df is None:
+            df = pd.DataFrame({'chain_name': self.chain_names,
+                               'chain_id': self.chain_ids,
+                               'group_number': self.group_numbers,
+                               'group_name': self.group_names,
+                               'atom_name': self.atom_names,
+                               'altloc': self.alt_loc_list,
+                               'x': self.x_coord_list,
+                               'y': self.y_coord_list,
+                               'z': self.z_coord_list,
+                               'o': self.occupancy_list,
+                               'b': self.b_factor_list,
+                               'element': self.elements,
+                               'polymer': self.polymer,
+                               })
 
             if add_cols is not None:
                 if 'sequence_position' in add_cols:
-                    self.df['sequence_position'] = pd.Series(self.sequence_positions, index=self.df.index)
+                    df['sequence_position'] = pd.Series(self.sequence_positions, index=df.index)
                 if 'chem_comp_type' in add_cols:
-                    self.df['chem_comp_type'] = pd.Series(self.chem_comp_types, index=self.df.index)
+                    df['chem_comp_type'] = pd.Series(self.chem_comp_types, index=df.index)
                 if 'entity_index' in add_cols:
-                    self.df['entity_index'] = pd.Series(self.entity_indices, index=self.df.index)
+                    df['entity_index'] = pd.Series(self.entity_indices, index=df.index)
                 if 'entity_type' in add_cols:
-                    self.df['entity_type'] = pd.Series(self.entity_types, index=self.df.index)
+                    df['entity_type'] = pd.Series(self.entity_types, index=df.index)
 
             if multi_index:
-                self.df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+                df.set_index(['chain_name', 'chain_id', 'group_number', 'group_name', 'atom_name', 'altloc'], inplace=True)
+
+            self.df = df
 
-        return self.df
+        return df
 
     def entities_to_pandas(self):
         indices = np.unique(self.entity_indices)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+'''structurePartitioner.py
+
+Repartitions an RDD of structures into partitions of about equal cost.
+
+The size of PDB entries ranges from a few hundred to several million atoms.
+With the default partitioning, a partition with several large entries
+becomes a straggler that delays the entire job. The cost of each structure
+is estimated from header fields (number of atoms and chains, and the chains
+used by the bioassembly operators), without decoding the atom level data,
+and the structures are bin-packed into balanced partitions. Structures that
+are more expensive than the average cost of a partition are placed in their
+own partitions.
+
+Methods that send pickled structures to pandas functions (mapInPandas)
+limit the number of structures per Arrow record batch with
+:func:`limit_structures_per_batch`.
+
+'''
+__author__ = "Peter Rose"
+__maintainer__ = "Peter Rose"
+__version__ = "0.4.0"
+__status__ = "Experimental"
+
+import heapq
+from mmtfPyspark.utils import mmtfDecoder
+
+# cost of a chain in units of atoms, accounts for the per chain overhead
+CHAIN_COST = 100
+
+# maximum number of pickled structures in an Arrow record batch
+STRUCTURES_PER_BATCH = 32
+
+
+def estimate_cost(structure, bio_assembly=True):
+    '''Returns the estimated processing cost of a structure in units of atoms.
+    The cost is derived from header fields only, so it can be calculated for
+    lazily decoded structures and header records (MmtfHeader) without decoding
+    any atom data.
+
+    Parameters
+    ----------
+    structure : MmtfStructure or MmtfHeader
+       structure or header record
+    bio_assembly : bool, optional
+       if True, include the atoms generated by the operators of the largest
+       bioassembly
+
+    Returns
+    -------
+    int
+       estimated cost
+    '''
+    num_atoms = structure.num_atoms
+    num_chains = max(structure.num_chains, 1)
+    atoms = num_atoms
+
+    if bio_assembly:
+        input_data = getattr(structure, 'input_data', None)
+        assemblies = mmtfDecoder.get_value(input_data, 'bioAssemblyList') if input_data is not None else None
+        for assembly in assemblies or []:
+            # number of chain copies, assuming chains of equal size
+            chain_copies = sum(len(transform['chainIndexList']) for transform in assembly['transformList'])
+            atoms = max(atoms, num_atoms * chain_copies // num_chains)
+
+    return int(atoms + CHAIN_COST * num_chains)
+
+
+def balance_partitions(costs, num_partitions):
+    '''Assigns items to partitions with about equal total cost. Items that
+    are more expensive than the average cost of a partition get their own
+    partitions. The remaining items are assigned in order of decreasing cost
+    to the partition with the lowest total cost (longest processing time
+    first).
+
+    Parameters
+    ----------
+    costs : list
+       cost of each item
+    num_partitions : int
+       number of partitions
+
+    Returns
+    -------
+    list
+       partition index of each item
+    '''
+    assignment = [0] * len(costs)
+    if num_partitions < 1 or len(costs) == 0:
+        return assignment
+
+    order = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+    target = sum(costs) / num_partitions
+
+    # expensive items are isolated, but at least one partition is left for the other items
+    isolated = 0
+    while isolated < min(len(order), num_partitions - 1) and costs[order[isolated]] > target:
+        assignment[order[isolated]] = isolated
+        isolated += 1
+
+    # (total cost, partition index) of the remaining partitions
+    loads = [(0, index) for index in range(isolated, num_partitions)]
+    for i in order[isolated:]:
+        load, index = heapq.heappop(loads)
+        assignment[i] = index
+        heapq.heappush(loads, (load + costs[i], index))
+
+    return assignment
+
+
+def repartition_by_cost(structures, num_partitions=None, bio_assembly=True, cost_function=None):
+    '''Repartitions an RDD of (structure id, structure) tuples into
+    partitions of about equal estimated cost.
+
+    The costs are calculated in a first pass over the RDD, and the
+    structures are shuffled into their partitions in a second pass. Persist
+    the input RDD, or repartition an RDD of lazily decoded structures or
+    header records (read with lazy=True or metadata_only=True) to avoid
+    decoding the structures twice.
+
+    Parameters
+    ----------
+    structures : RDD
+       structure id, structure pairs
+    num_partitions : int, optional
+       number of partitions, defaults to the number of partitions of the input RDD
+    bio_assembly : bool, optional
+       if True, include the atoms generated by bioassembly operators in the cost
+    cost_function : function, optional
+       function that returns the cost of a structure, defaults to :func:`estimate_cost`
+
+    Returns
+    -------
+    RDD
+       repartitioned structure id, structure pairs
+
+    Examples
+    --------
+    >>> pdb = mmtfReader.read_sequence_file(path, lazy=True)
+    >>> pdb = structurePartitioner.repartition_by_cost(pdb, 400)
+    '''
+    if num_partitions is None:
+        num_partitions = structures.getNumPartitions()
+
+    if cost_function is None:
+        cost_function = lambda s: estimate_cost(s, bio_assembly)
+
+    # duplicate structure ids are placed in the same partition
+    costs = structures.map(lambda t: (t[0], cost_function(t[1]))) \
+                      .reduceByKey(lambda a, b: a + b) \
+                      .collect()
+
+    assignment = balance_partitions([cost for _, cost in costs], num_partitions)
+    partitions = {structure_id: index for (structure_id, _), index in zip(costs, assignment)}
+    partitions = structures.context.broadcast(partitions)
+
+    return structures.partitionBy(num_partitions, lambda structure_id: partitions.value[structure_id])
+
+
+def limit_structures_per_batch(spark, max_structures=STRUCTURES_PER_BATCH):
+    '''Limits the number of rows per Arrow record batch of the Spark session
+    (spark.sql.execution.arrow.maxRecordsPerBatch, default 10000) to at most
+    max_structures. The batches of a pandas function (mapInPandas) that is
+    applied to a dataframe of pickled structures are decoded at once by a
+    Python worker, so with the default, a worker may hold thousands of
+    structures in memory. The setting is read when a query runs, so it is
+    changed for the session, and is only ever lowered.
+
+    Parameters
+    ----------
+    spark : SparkSession
+       Spark session
+    max_structures : int, optional
+       maximum number of structures per batch
+    '''
+    key = 'spark.sql.execution.arrow.maxRecordsPerBatch'
+    max_records = int(spark.conf.get(key, '10000'))
+    if max_records <= 0 or max_records > max_structures:
+        spark.conf.set(key, str(max_structures))